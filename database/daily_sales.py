@@ -0,0 +1,105 @@
+"""
+Daily sales rollup (daily_sales, migration 007): quantity and revenue per
+(cafe_id, item_id, day), so the analytics dashboards read O(days x items)
+rows instead of re-aggregating every order.
+
+- add_daily_sales() is called by the outbox relay of order_service, in the
+  transaction that consumes the order events: each committed order is
+  counted exactly once.
+- backfill() rebuilds days from orders / order_items (history from before
+  the rollup existed, or a repair). Orders whose event is still waiting in
+  the outbox are left to the relay.
+
+Usage (from the repository root, or /app inside a service container):
+    python -m database.daily_sales backfill [from_date] [to_date]    dates as YYYY-MM-DD, inclusive
+"""
+import sys
+from datetime import datetime, timedelta
+
+from database.db_connection import get_connection, bulk_increment, insert_select
+
+DAILY_SALES_KEY = ("cafe_id", "item_id", "day")
+DAILY_SALES_COUNTERS = ("quantity", "revenue")
+
+
+def add_daily_sales(cursor, events):
+    """
+    Add orders to the rollup: events are [(cafe_id, created_at, lines)] with
+    lines [(item_id, quantity, unit price)]. Does not commit.
+    """
+    counters = {}
+    for cafe_id, created_at, lines in events:
+        day = created_at.date() if isinstance(created_at, datetime) else str(created_at)[:10]
+        for item_id, quantity, price in lines:
+            entry = counters.setdefault((cafe_id, item_id, day), [0, 0.0])
+            entry[0] += quantity
+            entry[1] += quantity * price
+    bulk_increment(
+        cursor, "daily_sales", DAILY_SALES_KEY, DAILY_SALES_COUNTERS,
+        [key + (quantity, round(revenue, 2)) for key, (quantity, revenue) in counters.items()]
+    )
+
+
+def backfill(conn, from_date=None, to_date=None):
+    """
+    Recompute the rollup of the days in [from_date, to_date] (all days when
+    omitted) in one transaction. Returns the number of rollup rows written.
+    """
+    day_filter, order_filter, params = [], [], []
+    if from_date:
+        day_filter.append("day >= %s")
+        order_filter.append("o.created_at >= %s")
+        params.append(datetime.strptime(from_date, "%Y-%m-%d").date())
+    if to_date:
+        day_filter.append("day < %s")
+        order_filter.append("o.created_at < %s")
+        params.append(datetime.strptime(to_date, "%Y-%m-%d").date() + timedelta(days=1))
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM daily_sales" + (" WHERE " + " AND ".join(day_filter) if day_filter else ""),
+            params
+        )
+        written = insert_select(
+            cursor, "daily_sales", DAILY_SALES_KEY + DAILY_SALES_COUNTERS,
+            """
+            SELECT o.cafe_id, oi.item_id, DATE(o.created_at), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.order_id
+            WHERE o.order_id NOT IN (SELECT order_id FROM order_events)
+            """ + "".join(f" AND {condition}" for condition in order_filter) + """
+            GROUP BY o.cafe_id, oi.item_id, DATE(o.created_at)
+            """,
+            params
+        )
+        conn.commit()
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] != "backfill":
+        print(__doc__)
+        return 1
+    from_date = argv[2] if len(argv) > 2 else None
+    to_date = argv[3] if len(argv) > 3 else None
+
+    conn = get_connection()
+    if conn is None:
+        print("❌ Database unavailable")
+        return 1
+    try:
+        written = backfill(conn, from_date, to_date)
+        print(f"✅ daily_sales rebuilt ({written} rows) for {from_date or 'the first day'} .. {to_date or 'today'}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,27 +1,632 @@
 import os
+import sys
 import time
+import random
+import sqlite3
+import threading
+from collections import deque
 import mysql.connector
 from dotenv import load_dotenv
 
+from database import sqlite_backend
+from database import query_cache
+from database.query_stats import InstrumentedCursor, record_checkout, start_reporter
+
 load_dotenv()
 
-def get_connection(retries=5, delay=5):
+# "mysql" (default) or "sqlite" for local benchmarks (see sqlite_backend.py)
+BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+
+# MySQL error "Table ... doesn't exist"
+ER_NO_SUCH_TABLE = 1146
+
+# Pool settings, read per process so each service can size its own pool
+# (see the environment section of each service in docker-compose.yml).
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "300"))
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+
+# Retry / circuit breaker settings for opening new connections.
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+RETRIES = int(os.getenv("DB_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.2"))
+RETRY_MAX_DELAY = float(os.getenv("DB_RETRY_MAX_DELAY", "2"))
+BREAKER_THRESHOLD = int(os.getenv("DB_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("DB_BREAKER_RESET", "10"))
+
+# Optional read replica for read-only work (analytics, reports). Unset means
+# every connection goes to the primary.
+REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(POOL_SIZE)))
+
+# Rows fetched per round trip by stream_rows()
+STREAM_BATCH_SIZE = int(os.getenv("DB_STREAM_BATCH_SIZE", "500"))
+# Rows per multi-row INSERT statement in bulk_insert()
+BULK_CHUNK_SIZE = int(os.getenv("DB_BULK_CHUNK_SIZE", "1000"))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by every caller of one database (primary or replica).
+    - closed: connections are attempted normally
+    - open: after `threshold` consecutive failures, callers fail fast
+      for `reset_timeout` seconds
+    - half-open: a single probe is let through; success closes the
+      breaker, failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if the caller may try the database right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # In the open state, or with a half-open probe that never reported
+            # back, let one caller through once the reset timeout has passed.
+            if time.monotonic() - self._changed_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._changed_at = time.monotonic()
+                print("⚠️ Database circuit half-open, probing...")
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print("✅ Database circuit closed")
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self.state != self.OPEN:
+                    print(f"❌ Database circuit open for {self.reset_timeout}s")
+                self.state = self.OPEN
+                self._changed_at = time.monotonic()
+
+    def is_open(self):
+        with self._lock:
+            return self.state != self.CLOSED
+
+
+def _backoff(attempt, base, cap):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _connect_params(role):
+    """Connection settings for the primary or the read replica."""
+    params = {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME"),
+    }
+    if role == "replica":
+        params["host"] = os.getenv("DB_REPLICA_HOST")
+        params["user"] = os.getenv("DB_REPLICA_USER", params["user"])
+        params["password"] = os.getenv("DB_REPLICA_PASSWORD", params["password"])
+    return params
+
+
+def _open_connection(role, breaker, retries, delay):
     """
-    Connect to MySQL with retry mechanism.
+    Open a new physical MySQL connection, retrying with jittered
+    exponential backoff. Gives up early once the circuit breaker opens.
     Returns a connection or None if all attempts fail.
     """
-    for attempt in range(1, retries + 1):
+    for attempt in range(retries):
+        if attempt and breaker.is_open():
+            break
         try:
-            conn = mysql.connector.connect(
-                host=os.getenv("DB_HOST"),
-                user=os.getenv("DB_USER"),
-                password=os.getenv("DB_PASSWORD"),
-                database=os.getenv("DB_NAME")
-            )
-            print("✅ Connected to database")
+            if BACKEND == "sqlite":
+                conn = sqlite_backend.connect()
+            else:
+                conn = mysql.connector.connect(
+                    **_connect_params(role),
+                    connection_timeout=CONNECT_TIMEOUT
+                )
+            print(f"✅ Connected to database ({role})")
+            breaker.record_success()
             return conn
-        except mysql.connector.Error as e:
-            print(f"❌ Attempt {attempt}/{retries} failed: {e}")
-            time.sleep(delay)
-    print("❌ Could not connect to the database after multiple attempts.")
+        except (mysql.connector.Error, sqlite3.Error) as e:
+            print(f"❌ Attempt {attempt + 1}/{retries} failed ({role}): {e}")
+            breaker.record_failure()
+            if attempt + 1 < retries and not breaker.is_open():
+                time.sleep(_backoff(attempt, delay, RETRY_MAX_DELAY))
+    print(f"❌ Could not connect to the database ({role}) after multiple attempts.")
     return None
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled MySQL connection.
+    Behaves like the underlying connection, except that close() hands it
+    back to the pool instead of tearing down the socket, and cursors are
+    instrumented (see query_stats.py).
+    """
+
+    def __init__(self, pool, raw, label="unknown"):
+        self._pool = pool
+        self._raw = raw
+        self._label = label
+        self._statements = 0
+        self._checked_out_at = time.perf_counter()
+        self._touched = set()
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise AttributeError(f"connection already returned to the pool (accessing '{name}')")
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(
+            self.__getattr__("cursor")(*args, **kwargs),
+            owner=self,
+            explain=self._pool.explain,
+        )
+
+    def commit(self):
+        self.__getattr__("commit")()
+        if self._touched:
+            tables, self._touched = sorted(self._touched), set()
+            _publish_writes(self, tables)
+
+    def rollback(self):
+        self._touched.clear()
+        self.__getattr__("rollback")()
+
+    def close(self):
+        raw, self._raw = self.__dict__.get("_raw"), None
+        if raw is not None:
+            record_checkout(
+                self._label, self._statements,
+                (time.perf_counter() - self._checked_out_at) * 1000
+            )
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Safety net for callers that never call close() (e.g. objects that
+        # keep a connection on self): return the slot instead of leaking it.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections.
+    - at most `size` connections are checked out at once
+    - checkout waits up to `timeout` seconds for a free slot
+    - idle connections older than `recycle` seconds are closed
+    - connections idle for more than `ping_after` seconds are pinged before reuse
+    - `breaker` guards the opening of new connections
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_after=POOL_PING_AFTER, breaker=None,
+                 role="primary"):
+        self.role = role
+        self.size = size
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = deque()  # (connection, returned_at), most recent on the right
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def acquire(self, factory, timeout=None, label="unknown"):
+        """
+        Check out a connection, opening one with `factory()` if none is idle.
+        Returns a PooledConnection, or None if the pool stayed exhausted
+        for `timeout` seconds or no connection could be opened.
+        `label` names the caller in the per-checkout query statistics.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(blocking=False):
+            self._count("waits")
+            if not self._slots.acquire(timeout=timeout):
+                self._count("timeouts")
+                print(f"❌ Connection pool exhausted ({self.size} in use) after {timeout}s")
+                return None
+
+        try:
+            raw = self._take_idle()
+            if raw is None:
+                raw = factory()
+                if raw is None:
+                    self._slots.release()
+                    return None
+                self._count("created")
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._stats["in_use"])
+        return PooledConnection(self, raw, label)
+
+    def _take_idle(self):
+        """Pop the most recently used healthy idle connection, if any."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                raw, returned_at = self._idle.pop()
+            idle_for = time.monotonic() - returned_at
+            if idle_for > self.recycle:
+                self._discard(raw)
+                continue
+            if idle_for > self.ping_after:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    self._discard(raw)
+                    continue
+            self._count("reused")
+            return raw
+
+    def release(self, raw):
+        """Return a connection to the pool, resetting any open transaction."""
+        try:
+            try:
+                raw.consume_results()
+                if raw.in_transaction:
+                    raw.rollback()
+            except Exception:
+                self._discard(raw)
+                return
+            now = time.monotonic()
+            stale = []
+            with self._lock:
+                self._idle.append((raw, now))
+                # LIFO reuse lets the oldest idle connections age out from the left
+                while self._idle and now - self._idle[0][1] > self.recycle:
+                    stale.append(self._idle.popleft()[0])
+            for conn in stale:
+                self._discard(conn)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def explain(self, sql, params=None):
+        """
+        Query plan of a statement, on a spare connection of this pool.
+        Returns None when no connection is free right away.
+        """
+        conn = self.acquire(lambda: _open_connection(self.role, self.breaker, 1, 0), timeout=0)
+        if conn is None:
+            return None
+        try:
+            # Raw cursor: the EXPLAIN itself is not recorded in the statistics
+            cursor = conn._raw.cursor()
+            prefix = "EXPLAIN QUERY PLAN " if BACKEND == "sqlite" else "EXPLAIN "
+            cursor.execute(prefix + sql, params or ())
+            plan = cursor.fetchall()
+            cursor.close()
+            return plan
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            conn.close()
+
+    def clear_idle(self):
+        """Close every idle connection (e.g. once the database is known down)."""
+        with self._lock:
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+        for raw in idle:
+            self._discard(raw)
+
+    def _discard(self, raw):
+        self._count("discarded")
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Snapshot of pool counters (exhaustion shows up as waits/timeouts)."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["idle"] = len(self._idle)
+        snapshot["size"] = self.size
+        return snapshot
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(role="primary"):
+    pool = _pools.get(role)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(role)
+            if pool is None:
+                size = REPLICA_POOL_SIZE if role == "replica" else POOL_SIZE
+                if BACKEND == "sqlite" and sqlite_backend.is_memory():
+                    # One connection: a shared in-memory database cannot wait on locks
+                    size = 1
+                pool = _pools[role] = ConnectionPool(size=size, role=role)
+    return pool
+
+
+def _checkout(role, retries, delay, label):
+    pool = _get_pool(role)
+    breaker = pool.breaker
+    if not breaker.allow():
+        return None
+    conn = pool.acquire(lambda: _open_connection(role, breaker, retries, delay), label=label)
+    if conn is not None:
+        breaker.record_success()
+    elif breaker.is_open():
+        # Idle sockets to a database that just went away are not worth keeping
+        pool.clear_idle()
+    return conn
+
+
+def get_connection(retries=RETRIES, delay=RETRY_BASE_DELAY, read_only=False):
+    """
+    Check out a connection from the process-wide pool.
+    Calling conn.close() returns it to the pool.
+    Returns None if the pool is exhausted or the database is unreachable;
+    while the circuit breaker is open this happens immediately, so callers
+    answer UNAVAILABLE instead of parking a worker thread.
+
+    With read_only=True the connection comes from the read replica
+    (DB_REPLICA_HOST) when one is configured, falling back to the primary
+    if the replica is down or its pool is exhausted.
+    """
+    start_reporter()
+    # Statistics are grouped by the calling function, i.e. the RPC handler
+    code = sys._getframe(1).f_code
+    label = getattr(code, "co_qualname", code.co_name)
+    if read_only and BACKEND == "mysql" and os.getenv("DB_REPLICA_HOST"):
+        # Single attempt: a struggling replica should fall back quickly
+        conn = _checkout("replica", 1, delay, label)
+        if conn is not None:
+            return conn
+    return _checkout("primary", retries, delay, label)
+
+
+def stream_rows(conn, query, params=None, batch_size=STREAM_BATCH_SIZE, dictionary=True):
+    """
+    Run `query` on an unbuffered cursor and yield its rows, fetched from the
+    server `batch_size` at a time, so large result sets never sit in memory
+    as a whole. The connection cannot run other statements until the
+    generator is exhausted or closed; any unread rows are then discarded.
+    """
+    cursor = conn.cursor(dictionary=dictionary, buffered=False)
+    try:
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        try:
+            # An unbuffered cursor cannot be closed with rows left unread
+            conn.consume_results()
+        except Exception:
+            pass
+        cursor.close()
+
+
+def bulk_insert(cursor, table, columns, rows, chunk_size=BULK_CHUNK_SIZE, ignore=False):
+    """
+    Insert `rows` (sequences ordered like `columns`) with multi-row
+    INSERT ... VALUES (...), (...) statements of at most `chunk_size` rows,
+    i.e. one round trip per chunk instead of one per row.
+    Table and column names are trusted identifiers from the code, never
+    request data. Does not commit. Returns the number of rows inserted.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    verb = "INSERT IGNORE INTO" if ignore else "INSERT INTO"
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute(
+            f"{verb} {table} ({', '.join(columns)}) VALUES "
+            + ", ".join([placeholders] * len(chunk)),
+            [value for row in chunk for value in row]
+        )
+        inserted += max(cursor.rowcount or 0, 0)
+    return inserted
+
+
+def bulk_increment(cursor, table, key_columns, counter_columns, rows, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Add counters to rows identified by a unique key, creating the missing ones:
+    multi-row INSERT ... ON DUPLICATE KEY UPDATE c = c + VALUES(c).
+    `rows` are sequences ordered like key_columns + counter_columns; they are
+    written in key order, so concurrent writers lock the rows in the same order.
+    Does not commit.
+    """
+    rows = sorted(rows, key=lambda row: tuple(row[:len(key_columns)]))
+    if not rows:
+        return
+    columns = tuple(key_columns) + tuple(counter_columns)
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    updates = ", ".join(f"{column} = {column} + VALUES({column})" for column in counter_columns)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+            + ", ".join([placeholders] * len(chunk))
+            + f" ON DUPLICATE KEY UPDATE {updates}",
+            [value for row in chunk for value in row]
+        )
+
+
+def insert_select(cursor, table, columns, select_query, params=None, ignore=False):
+    """
+    INSERT INTO table (columns) SELECT ...: copy rows computed by the database
+    in a single statement, without pulling them into Python.
+    Does not commit. Returns the number of rows inserted.
+    """
+    verb = "INSERT IGNORE INTO" if ignore else "INSERT INTO"
+    cursor.execute(f"{verb} {table} ({', '.join(columns)}) {select_query}", params or ())
+    return max(cursor.rowcount or 0, 0)
+
+
+def touch_tables(conn, *tables):
+    """
+    Declare that the current transaction of `conn` writes to `tables`.
+    When it commits, the cached results built on them are invalidated
+    (in this process right away, in the other services through table_versions).
+    """
+    conn._touched.update(tables)
+
+
+def _publish_writes(conn, tables):
+    """Bump table_versions after a commit: a short transaction of its own, so
+    concurrent writers never queue on the counter rows."""
+    query_cache.cache.tables_changed(tables)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE table_versions SET version = version + 1 WHERE table_name IN ("
+            + ", ".join(["%s"] * len(tables)) + ")",
+            tables
+        )
+        conn.__getattr__("commit")()
+    except Exception as e:
+        print(f"⚠️ Could not bump table versions {tables}: {e}")
+        try:
+            conn.__getattr__("rollback")()
+        except Exception:
+            pass
+    finally:
+        cursor.close()
+
+
+def _fetch_table_versions(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT table_name, version FROM table_versions")
+        return {table: version for table, version in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def table_versions(conn, *tables):
+    """
+    Current versions of `tables` as seen by the query cache (refreshed from
+    table_versions at most every DB_CACHE_VERSION_TTL seconds), for callers
+    that keep their own data derived from those tables: rebuild it when the
+    value changes. None when versions are unavailable (cache disabled).
+    """
+    if not query_cache.CACHE_ENABLED:
+        return None
+    try:
+        return query_cache.cache.versions(tables, lambda: _fetch_table_versions(conn))
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            # Dead connection: the pool drops it, keep reporting the original error
+            pass
+        if _missing_table(e):
+            # No table_versions table (migration 002 not applied): no caching
+            print(f"⚠️ Query cache disabled: {e}")
+            query_cache.CACHE_ENABLED = False
+        else:
+            # Lost connection, network blip...: this call only goes uncached
+            print(f"⚠️ Table versions unavailable, query not cached: {e}")
+        return None
+
+
+def _missing_table(error):
+    if isinstance(error, sqlite3.OperationalError):
+        return "no such table" in str(error)
+    return isinstance(error, mysql.connector.Error) and error.errno == ER_NO_SUCH_TABLE
+
+
+def cached_rows(conn, query, params=None, tables=(), dictionary=True):
+    """
+    Rows of a read-mostly query, served from the process-wide query cache
+    (query_cache.py) while none of `tables` has been written to.
+    On a miss the rows are streamed from `conn` (see stream_rows) and kept
+    if the result fits in the cache. Cached rows are shared: do not mutate them.
+    """
+    versions = table_versions(conn, *tables)
+    if versions is None:
+        yield from stream_rows(conn, query, params, dictionary=dictionary)
+        return
+
+    cache = query_cache.cache
+    key = cache.key(query, params) + (dictionary,)
+    rows = cache.get(key, versions)
+    if rows is not None:
+        yield from rows
+        return
+
+    rows, size = [], 0
+    limit = cache.max_bytes * query_cache.MAX_ENTRY_SHARE
+    for row in stream_rows(conn, query, params, dictionary=dictionary):
+        if rows is not None:
+            rows.append(row)
+            size += query_cache.row_size(row)
+            if size > limit:
+                # Too large to cache: keep streaming without holding the rows
+                rows = None
+        yield row
+    if rows is not None:
+        cache.put(key, versions, rows, size)
+
+
+def cache_stats():
+    return query_cache.cache.stats()
+
+
+def pool_stats():
+    """Counters of the process-wide connection pools, keyed by role."""
+    stats = {}
+    for role, pool in list(_pools.items()):
+        stats[role] = pool.stats()
+        stats[role]["breaker"] = pool.breaker.state
+    return stats
@@ -0,0 +1,251 @@
+"""
+Versioned schema migrations for the coffee management database.
+
+Migrations live in database/migrations as NNN_name.up.sql / NNN_name.down.sql.
+Applied versions are recorded in the schema_migrations table.
+
+Usage (from the repository root, or /app inside a service container):
+    python -m database.migrate status
+    python -m database.migrate up [version]      apply pending migrations
+    python -m database.migrate down [version]    revert down to `version` (default: the latest one)
+    python -m database.migrate explain           EXPLAIN the service queries, report full scans
+"""
+import os
+import re
+import sys
+from datetime import datetime
+
+import mysql.connector
+
+from database.db_connection import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# MySQL errors meaning the change is already in place (up) or already gone (down):
+# duplicate column, duplicate key name, table exists, can't drop missing key/column,
+# duplicate foreign key name
+# Data statements are not covered: write them so a rerun succeeds (INSERT IGNORE,
+# or clear the table first).
+ALREADY_DONE = {1060, 1061, 1050, 1091, 1826}
+
+# Representative queries of every service with sample parameters.
+# full_scan_ok marks listings that read a whole (small) table on purpose.
+SERVICE_QUERIES = [
+    ("order_service.GetOrdersByCafe",
+     """SELECT order_id, cafe_id, total_price, created_at
+        FROM orders
+        WHERE cafe_id = %s AND (created_at < %s OR (created_at = %s AND order_id < %s))
+        ORDER BY created_at DESC, order_id DESC
+        LIMIT %s""",
+     (1, "2030-01-01 00:00:00", "2030-01-01 00:00:00", 1000000, 51), False),
+    ("order_service.GetOrdersByCafe (items)",
+     """SELECT order_id, item_id, quantity, price FROM order_items
+        WHERE order_id IN (%s, %s, %s) ORDER BY order_id""",
+     (1, 2, 3), False),
+    ("inventory_service.GetInventoryByCafe",
+     """SELECT i.inventory_id, i.item_id, i.cafe_id, m.name, c.name, i.stock, i.restock_date
+        FROM inventory i
+        JOIN menu_items m ON i.item_id = m.item_id
+        JOIN cafes c ON i.cafe_id = c.cafe_id
+        ORDER BY c.name, m.name""",
+     (), True),
+    ("inventory_service.UpdateInventoryAfterOrder",
+     "UPDATE inventory SET stock = stock - %s WHERE item_id = %s AND cafe_id = %s AND stock >= %s",
+     (1, 1, 1, 1), False),
+    ("inventory_service.RestockItem",
+     "UPDATE inventory SET stock = stock + %s, restock_date = %s WHERE item_id = %s AND cafe_id = %s",
+     (1, "2025-01-01", 1, 1), False),
+    ("cafe_service.GetAllCafes",
+     "SELECT cafe_id, name, location, access_code FROM cafes",
+     (), True),
+    ("cafe_service.VerifyCafeCode",
+     "SELECT cafe_id, name, location FROM cafes WHERE access_code=%s",
+     ("DK456",), False),
+    ("cafe_service.DeleteCafe (order_items)",
+     "DELETE oi FROM order_items oi JOIN orders o ON oi.order_id = o.order_id WHERE o.cafe_id = %s",
+     (0,), False),
+    ("login_service.AuthenticateCafe",
+     "SELECT cafe_id, name, location FROM cafes WHERE cafe_id = %s AND access_code = %s",
+     (1, "DK456"), False),
+    ("login_service.GetAllCafes",
+     "SELECT cafe_id, name, location FROM cafes ORDER BY name",
+     (), True),
+    ("adminlogin.Login",
+     "SELECT admin_id, password_hash FROM admins WHERE username=%s",
+     ("admin",), False),
+    ("menu_service.GetMenuItems",
+     "SELECT * FROM menu_items",
+     (), True),
+    ("menu_service.UpdateMenuItem",
+     "UPDATE menu_items SET name=%s, category=%s, price=%s WHERE item_id=%s",
+     ("x", "x", 1, 1), False),
+    ("analytics.total_sales_this_month",
+     "SELECT SUM(revenue) AS total_sales FROM daily_sales WHERE day >= %s AND day < %s",
+     ("2025-10-01", "2025-11-01"), False),
+    ("analytics.cafe_comparison",
+     """SELECT c.name AS cafe, SUM(s.revenue) AS total_sales
+        FROM daily_sales s JOIN cafes c ON s.cafe_id = c.cafe_id
+        WHERE s.day >= %s AND s.day < %s
+        GROUP BY c.name""",
+     ("2025-10-01", "2025-11-01"), True),
+    ("analytics.products_overview",
+     """SELECT c.name AS cafe, m.name AS product, SUM(s.quantity) AS qty
+        FROM daily_sales s
+        JOIN menu_items m ON s.item_id = m.item_id
+        JOIN cafes c ON s.cafe_id = c.cafe_id
+        WHERE s.day >= %s AND s.day < %s
+        GROUP BY c.name, m.name""",
+     ("2025-10-01", "2025-11-01"), True),
+    ("predictions.get_monthly_sales_per_cafe",
+     """SELECT c.name, YEAR(s.day), MONTH(s.day), SUM(s.revenue)
+        FROM daily_sales s JOIN cafes c ON s.cafe_id = c.cafe_id
+        GROUP BY c.name, YEAR(s.day), MONTH(s.day)""",
+     (), True),
+]
+
+
+def load_migrations():
+    """Return [(version, name, up_path, down_path)] sorted by version."""
+    migrations = {}
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = re.match(r"^(\d+)_(\w+)\.(up|down)\.sql$", filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        entry = migrations.setdefault(version, {"name": name})
+        entry[direction] = os.path.join(MIGRATIONS_DIR, filename)
+    return [
+        (version, entry["name"], entry.get("up"), entry.get("down"))
+        for version, entry in sorted(migrations.items())
+    ]
+
+
+def split_statements(sql):
+    """Split a migration script on ';', dropping -- comments and blank statements."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_script(cursor, path):
+    """Execute every statement of a script, skipping the ones already in effect."""
+    with open(path, encoding="utf-8") as f:
+        statements = split_statements(f.read())
+    for stmt in statements:
+        try:
+            cursor.execute(stmt)
+        except mysql.connector.Error as e:
+            if e.errno not in ALREADY_DONE:
+                raise
+            print(f"   (skipped, already in effect: {e.msg})")
+
+
+def up(conn, target=None):
+    cursor = conn.cursor()
+    ensure_table(cursor)
+    done = applied_versions(cursor)
+    for version, name, up_path, _ in load_migrations():
+        if version in done or (target is not None and version > target):
+            continue
+        print(f"⬆️  {version:03d} {name}")
+        run_script(cursor, up_path)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+            (version, name, datetime.now())
+        )
+        conn.commit()
+    cursor.close()
+
+
+def down(conn, target=None):
+    cursor = conn.cursor()
+    ensure_table(cursor)
+    done = applied_versions(cursor)
+    if target is None:
+        target = max(done) - 1 if done else 0
+    for version, name, _, down_path in reversed(load_migrations()):
+        if version not in done or version <= target:
+            continue
+        if down_path is None:
+            raise RuntimeError(f"Migration {version:03d} {name} has no down script")
+        print(f"⬇️  {version:03d} {name}")
+        run_script(cursor, down_path)
+        cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (version,))
+        conn.commit()
+    cursor.close()
+
+
+def status(conn):
+    cursor = conn.cursor()
+    ensure_table(cursor)
+    done = applied_versions(cursor)
+    cursor.close()
+    for version, name, _, _ in load_migrations():
+        mark = "applied" if version in done else "pending"
+        print(f"{version:03d} {name:<40} {mark}")
+
+
+def explain(conn):
+    """
+    EXPLAIN every known service query and report the ones reading a whole table.
+    Returns the number of unexpected full scans.
+    """
+    cursor = conn.cursor(dictionary=True)
+    unexpected = 0
+    for label, sql, params, full_scan_ok in SERVICE_QUERIES:
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = cursor.fetchall()
+        scans = [row["table"] for row in plan if row.get("type") == "ALL"]
+        if not scans:
+            print(f"✅ {label}")
+        elif full_scan_ok:
+            print(f"ℹ️  {label}: full scan of {', '.join(scans)} (expected)")
+        else:
+            unexpected += 1
+            print(f"❌ {label}: full scan of {', '.join(scans)}")
+    cursor.close()
+    conn.rollback()
+    return unexpected
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "status"
+    target = int(argv[2]) if len(argv) > 2 else None
+
+    conn = get_connection()
+    if conn is None:
+        print("❌ Database unavailable")
+        return 1
+    try:
+        if command == "up":
+            up(conn, target)
+        elif command == "down":
+            down(conn, target)
+        elif command == "status":
+            status(conn)
+        elif command == "explain":
+            return 1 if explain(conn) else 0
+        else:
+            print(__doc__)
+            return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,12 @@
+ALTER TABLE `analytics_logs` ADD KEY `cafe_id` (`cafe_id`);
+ALTER TABLE `analytics_logs` DROP KEY `idx_analytics_logs_cafe_item_qty`;
+
+ALTER TABLE `inventory` ADD KEY `cafe_id` (`cafe_id`);
+ALTER TABLE `inventory` DROP KEY `uq_inventory_cafe_item`;
+
+ALTER TABLE `order_items` ADD KEY `order_id` (`order_id`);
+ALTER TABLE `order_items` DROP KEY `idx_order_items_order_item_qty`;
+
+ALTER TABLE `orders` DROP KEY `idx_orders_created_cafe_total`;
+ALTER TABLE `orders` ADD KEY `cafe_id` (`cafe_id`);
+ALTER TABLE `orders` DROP KEY `idx_orders_cafe_created`;
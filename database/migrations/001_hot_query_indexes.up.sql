@@ -0,0 +1,22 @@
+-- Index the columns the services actually filter, join and sort on.
+
+-- GetOrdersByCafe: WHERE cafe_id = ? ORDER BY created_at DESC
+-- (also serves the cafe_id foreign key, replacing the single-column key)
+ALTER TABLE `orders` ADD KEY `idx_orders_cafe_created` (`cafe_id`, `created_at`);
+ALTER TABLE `orders` DROP KEY `cafe_id`;
+
+-- Analytics monthly ranges: WHERE created_at >= ? AND created_at < ?,
+-- covering cafe_id / total_price so the aggregates never touch the rows
+ALTER TABLE `orders` ADD KEY `idx_orders_created_cafe_total` (`created_at`, `cafe_id`, `total_price`);
+
+-- Order items per order (GetOrdersByCafe, analytics joins), covering
+ALTER TABLE `order_items` ADD KEY `idx_order_items_order_item_qty` (`order_id`, `item_id`, `quantity`, `price`);
+ALTER TABLE `order_items` DROP KEY `order_id`;
+
+-- UpdateInventoryAfterOrder / RestockItem: WHERE cafe_id = ? AND item_id = ?
+ALTER TABLE `inventory` ADD UNIQUE KEY `uq_inventory_cafe_item` (`cafe_id`, `item_id`);
+ALTER TABLE `inventory` DROP KEY `cafe_id`;
+
+-- Best-selling items per cafe from analytics_logs
+ALTER TABLE `analytics_logs` ADD KEY `idx_analytics_logs_cafe_item_qty` (`cafe_id`, `item_id`, `quantity`);
+ALTER TABLE `analytics_logs` DROP KEY `cafe_id`;
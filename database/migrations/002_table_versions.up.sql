@@ -0,0 +1,14 @@
+-- Version counters of the tables behind the query cache (database/query_cache.py).
+-- Bumped after every committed write to the table, so each service can tell
+-- whether its cached results are still current.
+
+CREATE TABLE `table_versions` (
+  `table_name` varchar(64) NOT NULL,
+  `version` bigint NOT NULL DEFAULT 0,
+  PRIMARY KEY (`table_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO `table_versions` (`table_name`, `version`) VALUES
+('cafes', 0),
+('menu_items', 0),
+('inventory', 0);
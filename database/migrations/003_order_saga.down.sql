@@ -0,0 +1,2 @@
+DROP TABLE IF EXISTS `pending_compensations`;
+DROP TABLE IF EXISTS `inventory_reservations`;
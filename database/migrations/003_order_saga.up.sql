@@ -0,0 +1,29 @@
+-- Saga of CreateOrder: stock reserved in inventory_service is released again
+-- when the order itself cannot be written.
+
+-- Reservations applied by InventoryService.ReserveItems (makes ReserveItems
+-- idempotent and lets ReleaseItems undo a reservation exactly once)
+CREATE TABLE `inventory_reservations` (
+  `reservation_id` varchar(36) NOT NULL,
+  `cafe_id` int NOT NULL,
+  `created_at` datetime NOT NULL,
+  `released_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`reservation_id`),
+  KEY `idx_inventory_reservations_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Written by order_service before reserving stock and deleted in the same
+-- transaction as the order; whatever is left over is compensated
+-- (ReleaseItems) by the background worker of order_service.
+CREATE TABLE `pending_compensations` (
+  `reservation_id` varchar(36) NOT NULL,
+  `cafe_id` int NOT NULL,
+  `items` text NOT NULL,
+  `status` varchar(16) NOT NULL DEFAULT 'pending',
+  `attempts` int NOT NULL DEFAULT 0,
+  `last_error` varchar(255) DEFAULT NULL,
+  `created_at` datetime NOT NULL,
+  `next_attempt_at` datetime NOT NULL,
+  PRIMARY KEY (`reservation_id`),
+  KEY `idx_pending_compensations_next` (`next_attempt_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
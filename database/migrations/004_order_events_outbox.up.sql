@@ -0,0 +1,11 @@
+-- Transactional outbox of order_service: CreateOrder writes one event per
+-- order in its own transaction, a background relay turns the events into
+-- analytics_logs rows in batches and deletes them.
+CREATE TABLE `order_events` (
+  `event_id` bigint NOT NULL AUTO_INCREMENT,
+  `order_id` int NOT NULL,
+  `cafe_id` int NOT NULL,
+  `items` text NOT NULL,
+  `created_at` datetime NOT NULL,
+  PRIMARY KEY (`event_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
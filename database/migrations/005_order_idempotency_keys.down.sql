@@ -0,0 +1,2 @@
+ALTER TABLE `orders` DROP KEY `uq_orders_cafe_idempotency`;
+ALTER TABLE `orders` DROP COLUMN `idempotency_key`;
@@ -0,0 +1,5 @@
+-- Idempotency key sent by the gateway / POS with CreateOrder: a retried
+-- request finds the order created by the first attempt instead of creating
+-- a second one. Unique per cafe; NULL (no key) never conflicts.
+ALTER TABLE `orders` ADD COLUMN `idempotency_key` varchar(64) DEFAULT NULL;
+ALTER TABLE `orders` ADD UNIQUE KEY `uq_orders_cafe_idempotency` (`cafe_id`, `idempotency_key`);
@@ -0,0 +1,12 @@
+-- Only possible while no generated (64-bit) id has been written yet.
+ALTER TABLE `analytics_logs` DROP FOREIGN KEY `analytics_logs_ibfk_1`;
+ALTER TABLE `order_items` DROP FOREIGN KEY `order_items_ibfk_1`;
+
+ALTER TABLE `order_events` MODIFY `order_id` int NOT NULL;
+ALTER TABLE `analytics_logs` MODIFY `order_id` int NOT NULL;
+ALTER TABLE `order_items` MODIFY `order_id` int NOT NULL;
+ALTER TABLE `order_items` MODIFY `order_item_id` int NOT NULL AUTO_INCREMENT;
+ALTER TABLE `orders` MODIFY `order_id` int NOT NULL AUTO_INCREMENT;
+
+ALTER TABLE `order_items` ADD CONSTRAINT `order_items_ibfk_1` FOREIGN KEY (`order_id`) REFERENCES `orders` (`order_id`);
+ALTER TABLE `analytics_logs` ADD CONSTRAINT `analytics_logs_ibfk_1` FOREIGN KEY (`order_id`) REFERENCES `orders` (`order_id`);
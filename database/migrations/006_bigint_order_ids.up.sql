@@ -0,0 +1,17 @@
+-- order_service generates 64-bit, time-ordered ids for orders and order_items
+-- (services/order_service/snowflake.py) instead of relying on AUTO_INCREMENT:
+-- inserts no longer contend on the auto-inc lock and several writers can
+-- insert orders without asking the database for the new ids.
+-- The columns referencing orders.order_id are widened too, so the foreign
+-- keys are dropped while the types change.
+ALTER TABLE `analytics_logs` DROP FOREIGN KEY `analytics_logs_ibfk_1`;
+ALTER TABLE `order_items` DROP FOREIGN KEY `order_items_ibfk_1`;
+
+ALTER TABLE `orders` MODIFY `order_id` bigint NOT NULL;
+ALTER TABLE `order_items` MODIFY `order_item_id` bigint NOT NULL;
+ALTER TABLE `order_items` MODIFY `order_id` bigint NOT NULL;
+ALTER TABLE `analytics_logs` MODIFY `order_id` bigint NOT NULL;
+ALTER TABLE `order_events` MODIFY `order_id` bigint NOT NULL;
+
+ALTER TABLE `order_items` ADD CONSTRAINT `order_items_ibfk_1` FOREIGN KEY (`order_id`) REFERENCES `orders` (`order_id`);
+ALTER TABLE `analytics_logs` ADD CONSTRAINT `analytics_logs_ibfk_1` FOREIGN KEY (`order_id`) REFERENCES `orders` (`order_id`);
@@ -0,0 +1,25 @@
+-- Daily sales rollup: quantity and revenue per (cafe, menu item, day).
+-- Maintained by the outbox relay of order_service as orders are committed
+-- and rebuilt for past days with `python -m database.daily_sales backfill`;
+-- the analytics dashboards read it instead of re-aggregating orders.
+CREATE TABLE `daily_sales` (
+  `cafe_id` int NOT NULL,
+  `item_id` int NOT NULL,
+  `day` date NOT NULL,
+  `quantity` bigint NOT NULL DEFAULT 0,
+  `revenue` decimal(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`cafe_id`, `item_id`, `day`),
+  KEY `idx_daily_sales_day` (`day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- History (same query as database/daily_sales.py backfill); orders whose
+-- event is still in the outbox are added by the relay. Cleared first so a
+-- partially applied run can be re-applied.
+DELETE FROM `daily_sales`;
+
+INSERT INTO `daily_sales` (`cafe_id`, `item_id`, `day`, `quantity`, `revenue`)
+SELECT o.cafe_id, oi.item_id, DATE(o.created_at), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.order_id
+WHERE o.order_id NOT IN (SELECT order_id FROM order_events)
+GROUP BY o.cafe_id, oi.item_id, DATE(o.created_at);
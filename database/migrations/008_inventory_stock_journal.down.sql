@@ -0,0 +1 @@
+DROP TABLE IF EXISTS `inventory_journal_checkpoint`;
@@ -0,0 +1,12 @@
+-- In-memory stock counters of inventory_service (INVENTORY_STOCK_MODE=counters):
+-- last journal record whose stock deltas are in `inventory`. It is written in
+-- the same transaction as the deltas, so journal replay after a crash applies
+-- each record exactly once.
+CREATE TABLE `inventory_journal_checkpoint` (
+  `id` tinyint NOT NULL,
+  `seq` bigint NOT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO `inventory_journal_checkpoint` (`id`, `seq`, `updated_at`) VALUES (1, 0, NOW());
@@ -0,0 +1,139 @@
+"""
+Process-wide result-set cache for read-mostly queries (menu, cafe list,
+inventory listing), used through db_connection.cached_rows().
+
+Entries are keyed by (exact statement text, params) and remember the
+version of every table the query reads. The key is never the query_stats
+fingerprint: statements that differ only in an inlined literal
+(LIMIT 50 / LIMIT 100) must not share an entry. Write paths call
+db_connection.touch_tables(conn, ...) before committing; once the commit
+succeeds the versions of those tables are bumped in the table_versions table
+(see migrations/002_table_versions) and locally, which invalidates the
+entries built on the old versions.
+
+- writes made by this process are visible immediately
+- writes made by another service are seen once the local copy of
+  table_versions is refreshed, at most DB_CACHE_VERSION_TTL seconds later
+- entries older than DB_CACHE_TTL seconds are dropped whatever the versions
+
+Eviction is LRU, bounded by DB_CACHE_MAX_ENTRIES and DB_CACHE_MAX_BYTES
+(approximate size of the cached rows). DB_CACHE_ENABLED=0 turns it off.
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+CACHE_ENABLED = os.getenv("DB_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.getenv("DB_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("DB_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("DB_CACHE_TTL", "60"))
+CACHE_VERSION_TTL = float(os.getenv("DB_CACHE_VERSION_TTL", "1"))
+
+# A single result may use at most this share of the memory cap
+MAX_ENTRY_SHARE = 0.25
+
+
+def row_size(row):
+    """Approximate memory footprint of a tuple or dict row, in bytes."""
+    values = row.values() if isinstance(row, dict) else row
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+
+
+class QueryCache:
+    """LRU of result sets validated against per-table version counters."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 ttl=CACHE_TTL, version_ttl=CACHE_VERSION_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self._entries = OrderedDict()  # key -> (versions, rows, size, stored_at)
+        self._bytes = 0
+        self._versions = {}  # table -> counter read from table_versions
+        self._local = {}  # table -> writes committed by this process
+        self._versions_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                       "invalidations": 0, "too_large": 0, "version_refreshes": 0}
+
+    @staticmethod
+    def key(sql, params):
+        return sql, tuple(params or ())
+
+    # ---------- table versions ----------
+    def versions(self, tables, fetch_versions):
+        """
+        Current versions of `tables`, refreshing the local copy with
+        fetch_versions() -> {table: version} when it is older than version_ttl.
+        """
+        now = time.monotonic()
+        if now - self._versions_at > self.version_ttl:
+            fresh = fetch_versions()
+            with self._lock:
+                self._versions.update(fresh)
+                self._versions_at = now
+                self._stats["version_refreshes"] += 1
+        with self._lock:
+            return tuple((self._versions.get(table, 0), self._local.get(table, 0)) for table in tables)
+
+    def tables_changed(self, tables):
+        """Called after this process committed writes to `tables`."""
+        with self._lock:
+            for table in tables:
+                self._local[table] = self._local.get(table, 0) + 1
+            # Also pick up the shared counters on the next lookup
+            self._versions_at = 0.0
+
+    # ---------- entries ----------
+    def get(self, key, versions):
+        """Cached rows for `key` built on `versions`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_versions, rows, size, stored_at = entry
+                if stored_versions == versions and time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return rows
+                self._remove(key)
+                self._stats["invalidations"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key, versions, rows, size):
+        if size > self.max_bytes * MAX_ENTRY_SHARE:
+            with self._lock:
+                self._stats["too_large"] += 1
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (versions, rows, size, time.monotonic())
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, key):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._versions_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["bytes"] = self._bytes
+        return snapshot
+
+
+cache = QueryCache()
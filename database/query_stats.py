@@ -0,0 +1,233 @@
+"""
+Per-query instrumentation for db_connection.
+
+Every cursor handed out by the pool is an InstrumentedCursor: each execute()
+is timed and recorded under the statement fingerprint (literals and
+placeholders replaced by ?), together with the rows it returned or touched.
+Statements slower than DB_SLOW_QUERY_MS are printed with their EXPLAIN plan.
+
+Each connection checkout is also recorded under the name of the function that
+called get_connection (the RPC handler), so an N+1 pattern shows up as a high
+"statements per call" figure for that handler.
+
+Call query_stats() for the raw aggregates or query_report() for a summary;
+DB_STATS_INTERVAL=<seconds> prints the summary periodically.
+"""
+import os
+import re
+import time
+import threading
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+STATS_INTERVAL = float(os.getenv("DB_STATS_INTERVAL", "0"))
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf"))
+
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+_lock = threading.Lock()
+_queries = {}
+_checkouts = {}
+_reporter = None
+
+
+def fingerprint(sql):
+    """Normalize a statement so that calls differing only by values share one entry."""
+    text = re.sub(r"'(?:[^'\\]|\\.)*'", "?", sql)
+    text = text.replace("%s", "?")
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = " ".join(text.split())
+    # IN (?, ?, ?) and multi-row VALUES (?, ?), (?, ?) collapse to one shape
+    text = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?+)", text)
+    text = re.sub(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+", "(?+), ...", text)
+    return text
+
+
+def _bucket_index(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS) - 1
+
+
+def record_query(fp, elapsed_ms, rows=0, error=False):
+    with _lock:
+        entry = _queries.get(fp)
+        if entry is None:
+            entry = _queries[fp] = {
+                "calls": 0, "errors": 0, "rows": 0,
+                "total_ms": 0.0, "max_ms": 0.0,
+                "histogram": [0] * len(BUCKETS_MS),
+            }
+        entry["calls"] += 1
+        entry["errors"] += int(error)
+        entry["rows"] += rows
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["histogram"][_bucket_index(elapsed_ms)] += 1
+
+
+def record_rows(fp, rows):
+    with _lock:
+        entry = _queries.get(fp)
+        if entry is not None:
+            entry["rows"] += rows
+
+
+def record_checkout(label, statements, held_ms):
+    with _lock:
+        entry = _checkouts.get(label)
+        if entry is None:
+            entry = _checkouts[label] = {
+                "calls": 0, "statements": 0, "max_statements": 0, "held_ms": 0.0,
+            }
+        entry["calls"] += 1
+        entry["statements"] += statements
+        entry["max_statements"] = max(entry["max_statements"], statements)
+        entry["held_ms"] += held_ms
+
+
+def _percentile_bound(histogram, fraction):
+    """Upper bound of the bucket holding the given fraction of calls."""
+    total = sum(histogram)
+    seen = 0
+    for count, bound in zip(histogram, BUCKETS_MS):
+        seen += count
+        if total and seen >= fraction * total:
+            return bound
+    return BUCKETS_MS[-1]
+
+
+def query_stats():
+    """Snapshot: {"queries": {fingerprint: {...}}, "checkouts": {caller: {...}}}."""
+    with _lock:
+        queries = {fp: dict(entry, histogram=list(entry["histogram"])) for fp, entry in _queries.items()}
+        checkouts = {label: dict(entry) for label, entry in _checkouts.items()}
+    for entry in queries.values():
+        entry["avg_ms"] = entry["total_ms"] / entry["calls"]
+        entry["p95_ms_bound"] = _percentile_bound(entry["histogram"], 0.95)
+    for entry in checkouts.values():
+        entry["avg_statements"] = entry["statements"] / entry["calls"]
+    return {"queries": queries, "checkouts": checkouts}
+
+
+def reset_stats():
+    with _lock:
+        _queries.clear()
+        _checkouts.clear()
+
+
+def query_report(limit=15):
+    """Human readable summary: slowest statements by total time, statements per caller."""
+    stats = query_stats()
+    lines = ["=== Queries by total time ==="]
+    ranked = sorted(stats["queries"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+    for fp, entry in ranked[:limit]:
+        lines.append(
+            f"{entry['calls']:>7} calls  {entry['total_ms']:>9.1f} ms total  "
+            f"{entry['avg_ms']:>7.2f} avg  {entry['max_ms']:>7.1f} max  "
+            f"{entry['rows']:>8} rows  {fp[:120]}"
+        )
+    lines.append("=== Statements per connection checkout ===")
+    ranked = sorted(stats["checkouts"].items(), key=lambda kv: kv[1]["avg_statements"], reverse=True)
+    for label, entry in ranked:
+        lines.append(
+            f"{label:<48} {entry['calls']:>7} calls  "
+            f"{entry['avg_statements']:>7.1f} avg  {entry['max_statements']:>5} max statements"
+        )
+    return "\n".join(lines)
+
+
+def _report_forever(interval):
+    while True:
+        time.sleep(interval)
+        print(query_report())
+
+
+def start_reporter():
+    """Print query_report() every DB_STATS_INTERVAL seconds (once per process)."""
+    global _reporter
+    if STATS_INTERVAL <= 0 or _reporter is not None:
+        return
+    with _lock:
+        if _reporter is None:
+            _reporter = threading.Thread(target=_report_forever, args=(STATS_INTERVAL,), daemon=True)
+            _reporter.start()
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times every statement.
+    `owner` is the PooledConnection (statement counter), `explain` a callable
+    returning the plan of a slow statement, or None.
+    """
+
+    def __init__(self, cursor, owner=None, explain=None):
+        self._cursor = cursor
+        self._owner = owner
+        self._explain = explain
+        self._fp = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _run(self, method, sql, params):
+        fp = fingerprint(sql)
+        self._fp = fp
+        if self._owner is not None:
+            self._owner._statements += 1
+        start = time.perf_counter()
+        try:
+            result = method(sql, params)
+        except Exception:
+            record_query(fp, (time.perf_counter() - start) * 1000, error=True)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # Result sets are counted as they are fetched, writes by rowcount
+        rows = 0 if self._cursor.description is not None else max(self._cursor.rowcount or 0, 0)
+        record_query(fp, elapsed_ms, rows)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            self._log_slow(sql, params, fp, elapsed_ms)
+        return result
+
+    def _log_slow(self, sql, params, fp, elapsed_ms):
+        print(f"🐢 Slow query ({elapsed_ms:.1f} ms): {fp}")
+        if self._explain is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return
+        plan = self._explain(sql, params)
+        for row in plan or []:
+            print(f"   EXPLAIN {row}")
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        return self._run(lambda s, p: self._cursor.execute(s, p, *args, **kwargs), sql, params)
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        return self._run(lambda s, p: self._cursor.executemany(s, p, *args, **kwargs), sql, seq_params)
+
+    def _count(self, rows):
+        if self._fp is not None and rows:
+            record_rows(self._fp, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count(1)
+            yield row
+
+    def close(self):
+        return self._cursor.close()
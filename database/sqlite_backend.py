@@ -0,0 +1,220 @@
+"""
+SQLite backend for db_connection, for local benchmarks and integration tests
+without the MySQL container (DB_BACKEND=sqlite).
+
+- DB_SQLITE_PATH=/tmp/coffee.db   file database, shared by every service process
+- DB_SQLITE_PATH=:memory:         in-memory database, private to one process
+
+The schema comes from sqlite_schema.sql and the rows from the INSERT statements
+of init.sql. Connections mimic the parts of mysql.connector the services use,
+and a small dialect shim rewrites the MySQL-only constructs they rely on.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(BASE_DIR, "sqlite_schema.sql")
+SEED_FILE = os.path.join(BASE_DIR, "init.sql")
+
+MEMORY_URI = "file:coffee_management_system?mode=memory&cache=shared"
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" ", "seconds"))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(Decimal, float)
+
+_DELETE_JOIN = re.compile(
+    r"^\s*DELETE\s+(\w+)\s+FROM\s+(\w+)\s+(\w+)\s+(JOIN\s.*)$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_seed_lock = threading.Lock()
+_memory_anchor = None
+
+
+def sqlite_path():
+    return os.getenv("DB_SQLITE_PATH", ":memory:")
+
+
+def is_memory():
+    return sqlite_path() == ":memory:"
+
+
+def translate(sql):
+    """Rewrite the MySQL constructs used by the services into SQLite."""
+    sql = sql.replace("%s", "?")
+    match = _DELETE_JOIN.match(sql)
+    if match:
+        # DELETE al FROM analytics_logs al JOIN ... WHERE ...
+        alias, table, table_alias, rest = match.groups()
+        if alias == table_alias:
+            sql = (f"DELETE FROM {table} WHERE rowid IN "
+                   f"(SELECT {alias}.rowid FROM {table} {alias} {rest})")
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bFOR\s+UPDATE(\s+SKIP\s+LOCKED|\s+NOWAIT)?\b", "", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bNOW\(\)", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+    if re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, flags=re.IGNORECASE):
+        # Upsert on the primary key / unique index: VALUES(col) is excluded.col
+        sql = re.sub(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", "ON CONFLICT DO UPDATE SET", sql, flags=re.IGNORECASE)
+        sql = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", sql, flags=re.IGNORECASE)
+    return sql
+
+
+def _year(value):
+    return int(str(value)[:4]) if value is not None else None
+
+
+def _month(value):
+    return int(str(value)[5:7]) if value is not None else None
+
+
+class SQLiteCursor:
+    """Cursor with the mysql.connector calling conventions (%s params, dictionary rows)."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(translate(sql), tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(translate(sql), [tuple(p) for p in seq_of_params])
+        return self
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._convert(row) for row in self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection exposing the mysql.connector methods the pool and services call."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=None):
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def start_transaction(self):
+        # Explicit BEGIN, so that a SAVEPOINT does not open (and RELEASE commit) its own transaction
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def is_connected(self):
+        try:
+            self.ping()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._conn.close()
+
+
+def _raw_connect():
+    if is_memory():
+        conn = sqlite3.connect(MEMORY_URI, uri=True, timeout=30, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(sqlite_path(), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.create_function("YEAR", 1, _year, deterministic=True)
+    conn.create_function("MONTH", 1, _month, deterministic=True)
+    return conn
+
+
+def seed_statements():
+    """INSERT statements of init.sql, in file order."""
+    with open(SEED_FILE, encoding="utf-8") as f:
+        lines = [line for line in f.read().splitlines() if not line.startswith("--")]
+    script = "\n".join(lines)
+    return [
+        stmt.strip() for stmt in script.split(";\n")
+        if stmt.strip().upper().startswith("INSERT INTO")
+    ]
+
+
+def _has_schema(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='orders'"
+    ).fetchone() is not None
+
+
+def _ensure_schema(conn):
+    """Create and seed the database on first use (once per file / process)."""
+    if _has_schema(conn):
+        return
+    with _seed_lock:
+        conn.execute("BEGIN EXCLUSIVE")
+        try:
+            if not _has_schema(conn):
+                with open(SCHEMA_FILE, encoding="utf-8") as f:
+                    for stmt in f.read().split(";"):
+                        if stmt.strip():
+                            conn.execute(stmt)
+                for stmt in seed_statements():
+                    conn.execute(stmt)
+                print("✅ SQLite database created and seeded from init.sql")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def connect():
+    """Open a new SQLite connection (seeding the database if needed)."""
+    global _memory_anchor
+    conn = _raw_connect()
+    if is_memory() and _memory_anchor is None:
+        # The shared in-memory database lives as long as one connection is open
+        _memory_anchor = _raw_connect()
+    _ensure_schema(conn)
+    return SQLiteConnection(conn)
@@ -0,0 +1,122 @@
+-- SQLite version of the schema in init.sql (with the changes of database/migrations),
+-- used by the sqlite backend of db_connection. Rows are seeded from init.sql.
+
+CREATE TABLE `cafes` (
+  `cafe_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `name` VARCHAR(100) NOT NULL,
+  `location` VARCHAR(100) NOT NULL,
+  `access_code` VARCHAR(20) NOT NULL UNIQUE
+);
+
+CREATE TABLE `menu_items` (
+  `item_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `name` VARCHAR(100) NOT NULL,
+  `category` VARCHAR(50) NOT NULL,
+  `price` DECIMAL(10,2) NOT NULL
+);
+
+CREATE TABLE `inventory` (
+  `inventory_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `item_id` INTEGER NOT NULL REFERENCES `menu_items` (`item_id`),
+  `cafe_id` INTEGER NOT NULL REFERENCES `cafes` (`cafe_id`),
+  `stock` INTEGER NOT NULL,
+  `restock_date` DATE NOT NULL
+);
+CREATE INDEX `inventory_item_id` ON `inventory` (`item_id`);
+CREATE UNIQUE INDEX `uq_inventory_cafe_item` ON `inventory` (`cafe_id`, `item_id`);
+
+CREATE TABLE `orders` (
+  `order_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `cafe_id` INTEGER NOT NULL REFERENCES `cafes` (`cafe_id`),
+  `total_price` DECIMAL(10,2) NOT NULL,
+  `created_at` DATETIME NOT NULL
+);
+CREATE INDEX `idx_orders_cafe_created` ON `orders` (`cafe_id`, `created_at`);
+CREATE INDEX `idx_orders_created_cafe_total` ON `orders` (`created_at`, `cafe_id`, `total_price`);
+
+CREATE TABLE `order_items` (
+  `order_item_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `order_id` INTEGER NOT NULL REFERENCES `orders` (`order_id`),
+  `item_id` INTEGER NOT NULL REFERENCES `menu_items` (`item_id`),
+  `quantity` INTEGER NOT NULL,
+  `price` DECIMAL(10,2) NOT NULL
+);
+CREATE INDEX `idx_order_items_order_item_qty` ON `order_items` (`order_id`, `item_id`, `quantity`, `price`);
+CREATE INDEX `order_items_item_id` ON `order_items` (`item_id`);
+
+CREATE TABLE `analytics_logs` (
+  `log_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `order_id` INTEGER NOT NULL REFERENCES `orders` (`order_id`),
+  `cafe_id` INTEGER NOT NULL REFERENCES `cafes` (`cafe_id`),
+  `item_id` INTEGER NOT NULL REFERENCES `menu_items` (`item_id`),
+  `quantity` INTEGER NOT NULL,
+  `total_price` DECIMAL(10,2) NOT NULL,
+  `timestamp` DATETIME NOT NULL
+);
+CREATE INDEX `analytics_logs_order_id` ON `analytics_logs` (`order_id`);
+CREATE INDEX `analytics_logs_item_id` ON `analytics_logs` (`item_id`);
+CREATE INDEX `idx_analytics_logs_cafe_item_qty` ON `analytics_logs` (`cafe_id`, `item_id`, `quantity`);
+
+CREATE TABLE `admins` (
+  `admin_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `username` VARCHAR(50) NOT NULL UNIQUE,
+  `password_hash` VARCHAR(255) NOT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE `table_versions` (
+  `table_name` VARCHAR(64) PRIMARY KEY,
+  `version` BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO `table_versions` (`table_name`, `version`) VALUES ('cafes', 0), ('menu_items', 0), ('inventory', 0);
+
+CREATE TABLE `inventory_reservations` (
+  `reservation_id` VARCHAR(36) PRIMARY KEY,
+  `cafe_id` INTEGER NOT NULL,
+  `created_at` DATETIME NOT NULL,
+  `released_at` DATETIME DEFAULT NULL
+);
+CREATE INDEX `idx_inventory_reservations_created` ON `inventory_reservations` (`created_at`);
+
+CREATE TABLE `pending_compensations` (
+  `reservation_id` VARCHAR(36) PRIMARY KEY,
+  `cafe_id` INTEGER NOT NULL,
+  `items` TEXT NOT NULL,
+  `status` VARCHAR(16) NOT NULL DEFAULT 'pending',
+  `attempts` INTEGER NOT NULL DEFAULT 0,
+  `last_error` VARCHAR(255) DEFAULT NULL,
+  `created_at` DATETIME NOT NULL,
+  `next_attempt_at` DATETIME NOT NULL
+);
+CREATE INDEX `idx_pending_compensations_next` ON `pending_compensations` (`next_attempt_at`);
+
+CREATE TABLE `order_events` (
+  `event_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `order_id` INTEGER NOT NULL,
+  `cafe_id` INTEGER NOT NULL,
+  `items` TEXT NOT NULL,
+  `created_at` DATETIME NOT NULL
+);
+
+ALTER TABLE `orders` ADD COLUMN `idempotency_key` VARCHAR(64) DEFAULT NULL;
+CREATE UNIQUE INDEX `uq_orders_cafe_idempotency` ON `orders` (`cafe_id`, `idempotency_key`);
+
+-- Migration 006 (bigint order ids): INTEGER columns are already 64-bit in SQLite,
+-- order_service now supplies order_id / order_item_id itself.
+
+CREATE TABLE `daily_sales` (
+  `cafe_id` INTEGER NOT NULL,
+  `item_id` INTEGER NOT NULL,
+  `day` DATE NOT NULL,
+  `quantity` INTEGER NOT NULL DEFAULT 0,
+  `revenue` DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`cafe_id`, `item_id`, `day`)
+);
+CREATE INDEX `idx_daily_sales_day` ON `daily_sales` (`day`);
+
+CREATE TABLE `inventory_journal_checkpoint` (
+  `id` INTEGER PRIMARY KEY,
+  `seq` INTEGER NOT NULL,
+  `updated_at` DATETIME NOT NULL
+);
+INSERT INTO `inventory_journal_checkpoint` (`id`, `seq`, `updated_at`) VALUES (1, 0, CURRENT_TIMESTAMP);
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request, session, redirect
+from flask import Flask, jsonify, request, session, redirect, Response, stream_with_context
 from grpc_clients import analytics_client, inventory_client, cafe_client
 from grpc_clients.adminlogin import AdminLoginClient
 from grpc_clients.login_client import LoginClient
@@ -6,8 +6,12 @@ from flask_cors import CORS  # import CORS
 from collections import defaultdict
 import bcrypt
 import math
+import io
+import csv
+import json
+import itertools
 from grpc_clients.menu_client import get_menu_items, add_menu_item, update_menu_item, delete_menu_item
-from grpc_clients.order_client import create_order, get_orders_by_cafe
+from grpc_clients.order_client import create_order, create_orders, get_orders_by_cafe, export_orders
 from database.db_connection import get_connection
 from dotenv import load_dotenv
 import os
@@ -418,19 +422,97 @@ def api_create_order():
         if not data or 'cafe_id' not in data or 'items' not in data:
             return jsonify({"success": False, "message": "Missing cafe_id or items"}), 400
         
-        result = create_order(data['cafe_id'], data['items'])
+        # Retries of the same order (timeouts) must send the same key
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        result = create_order(data['cafe_id'], data['items'], idempotency_key)
+        if result.get('retry_after_ms'):
+            # Order service shedding load: retry later with the same key
+            response = jsonify(result)
+            response.headers['Retry-After'] = str(math.ceil(result['retry_after_ms'] / 1000))
+            return response, 429
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@app.route('/orders/bulk', methods=['POST'])
+def api_create_orders():
+    """Offline POS sync: {"orders": [{"cafe_id", "items"}, ...]} -> one result per order"""
+    try:
+        data = request.json
+        orders = data.get('orders') if data else None
+        if not isinstance(orders, list) or not orders:
+            return jsonify({"success": False, "message": "Missing orders"}), 400
+        if any(not isinstance(order, dict) or 'cafe_id' not in order or 'items' not in order
+               for order in orders):
+            return jsonify({"success": False, "message": "Each order needs cafe_id and items"}), 400
+
+        result = create_orders(orders)
         return jsonify(result)
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
 @app.route('/orders/<cafe_id>', methods=['GET'])
 def api_get_orders(cafe_id):
+    """Paginated: ?page_size=&cursor=<next_cursor>&from=YYYY-MM-DD&to=YYYY-MM-DD"""
     try:
-        orders = get_orders_by_cafe(cafe_id)
-        return jsonify({"orders": orders})
+        orders, next_cursor = get_orders_by_cafe(
+            cafe_id,
+            cursor=request.args.get('cursor', ''),
+            page_size=request.args.get('page_size', 0, type=int),
+            from_date=request.args.get('from', ''),
+            to_date=request.args.get('to', '')
+        )
+        return jsonify({"orders": orders, "next_cursor": next_cursor or None})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+EXPORT_CSV_COLUMNS = ["order_id", "cafe_id", "created_at", "total_price", "item_id", "quantity", "price"]
+
+def _orders_as_ndjson(orders):
+    for order in orders:
+        yield json.dumps(order) + "\n"
+
+def _orders_as_csv(orders):
+    """One line per order item (an order without items gets one line with empty item columns)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    for order in orders:
+        head = [order["order_id"], order["cafe_id"], order["created_at"], order["total_price"]]
+        for item in order["items"] or [{"item_id": "", "quantity": "", "price": ""}]:
+            writer.writerow(head + [item["item_id"], item["quantity"], item["price"]])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+@app.route('/orders/<cafe_id>/export', methods=['GET'])
+def api_export_orders(cafe_id):
+    """
+    Full order history of a cafe, streamed (chunked transfer encoding)
+    ?format=ndjson (default) or csv, optional from / to (YYYY-MM-DD)
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    orders = export_orders(cafe_id, request.args.get('from', ''), request.args.get('to', ''))
+    try:
+        # Errors before the first order (bad cafe_id or dates, service down) get a proper status
+        first = next(orders, None)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 502
+    orders = itertools.chain([first] if first is not None else [], orders)
+
+    if export_format == 'csv':
+        body, mimetype = _orders_as_csv(orders), 'text/csv'
+    else:
+        body, mimetype = _orders_as_ndjson(orders), 'application/x-ndjson'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=orders_{cafe_id}.{export_format}"}
+    )
+
 # -------- MENU API (for orders page) --------
 @app.route('/menu/items', methods=['GET'])
 def api_menu_items():
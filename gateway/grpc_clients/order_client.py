@@ -1,3 +1,5 @@
+import os
+import uuid
 import grpc
 from shared_proto import order_pb2, order_pb2_grpc
 
@@ -5,38 +7,122 @@ from shared_proto import order_pb2, order_pb2_grpc
 channel = grpc.insecure_channel('order_service:5002')
 stub = order_pb2_grpc.OrderServiceStub(channel)
 
-def create_order(cafe_id, items):
+# Order creation carries an idempotency key, so it can be retried safely
+ORDER_RPC_TIMEOUT = float(os.getenv("ORDER_RPC_TIMEOUT", "5"))
+ORDER_BULK_TIMEOUT = float(os.getenv("ORDER_BULK_TIMEOUT", "30"))
+ORDER_RETRIES = int(os.getenv("ORDER_RETRIES", "2"))
+RETRYABLE_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+
+
+def _call_with_retries(method, request, timeout=ORDER_RPC_TIMEOUT):
+    """Call an idempotent RPC, retrying on timeouts and unavailability"""
+    for attempt in range(ORDER_RETRIES + 1):
+        try:
+            return method(request, timeout=timeout)
+        except grpc.RpcError as e:
+            if e.code() not in RETRYABLE_CODES or attempt == ORDER_RETRIES:
+                raise
+            print(f"gRPC {e.code()} on order call, retrying ({attempt + 1}/{ORDER_RETRIES})")
+
+
+def _retry_after_ms(error):
+    """Delay suggested by an overloaded order service (RESOURCE_EXHAUSTED), else None"""
+    if error.code() != grpc.StatusCode.RESOURCE_EXHAUSTED:
+        return None
+    for key, value in error.trailing_metadata() or ():
+        if key == "grpc-retry-pushback-ms":
+            return int(value)
+    return 1000
+
+def create_order(cafe_id, items, idempotency_key=None):
     """
     Create an order with items
-    items: list of dicts with item_id, quantity, price
+    items: list of dicts with item_id and quantity (prices come from the menu)
+    idempotency_key: sent again by the caller when it retries; generated if missing
     """
+    idempotency_key = idempotency_key or uuid.uuid4().hex
     try:
-        request = order_pb2.CreateOrderRequest(cafe_id=str(cafe_id))
+        request = order_pb2.CreateOrderRequest(cafe_id=str(cafe_id), idempotency_key=idempotency_key)
         
         for item in items:
             order_item = request.items.add()
             order_item.item_id = str(item['item_id'])
             order_item.quantity = item['quantity']
-            order_item.price = float(item['price'])
         
-        response = stub.CreateOrder(request)
+        response = _call_with_retries(stub.CreateOrder, request)
         return {
             "success": response.success,
             "message": response.message,
             "order_id": response.order_id,
-            "total_price": response.total_price
+            "total_price": response.total_price,
+            "idempotency_key": idempotency_key
         }
     except grpc.RpcError as e:
         print(f"gRPC Error in create_order: {e.code()} - {e.details()}")
+        return {
+            "success": False,
+            "message": f"gRPC Error: {e.details()}",
+            "retry_after_ms": _retry_after_ms(e)
+        }
+
+def create_orders(orders):
+    """
+    Create a batch of orders in one call (offline POS sync)
+    orders: list of dicts with cafe_id, items and an optional idempotency_key
+    (generated when missing, so that the whole batch can be retried)
+    Returns one result per order, in the same order
+    """
+    try:
+        request = order_pb2.CreateOrdersRequest()
+
+        for order in orders:
+            order_request = request.orders.add(
+                cafe_id=str(order['cafe_id']),
+                idempotency_key=order.get('idempotency_key') or uuid.uuid4().hex
+            )
+            for item in order['items']:
+                order_item = order_request.items.add()
+                order_item.item_id = str(item['item_id'])
+                order_item.quantity = item['quantity']
+
+        response = _call_with_retries(stub.CreateOrders, request, timeout=ORDER_BULK_TIMEOUT)
+        return {
+            "success": True,
+            "created": response.created,
+            "failed": response.failed,
+            "results": [
+                {
+                    "success": result.success,
+                    "message": result.message,
+                    "order_id": result.order_id,
+                    "total_price": result.total_price,
+                    "idempotency_key": order.idempotency_key
+                }
+                for result, order in zip(response.results, request.orders)
+            ]
+        }
+    except grpc.RpcError as e:
+        print(f"gRPC Error in create_orders: {e.code()} - {e.details()}")
         return {
             "success": False,
             "message": f"gRPC Error: {e.details()}"
         }
 
-def get_orders_by_cafe(cafe_id):
-    """Get all orders for a cafe"""
+def get_orders_by_cafe(cafe_id, cursor="", page_size=0, from_date="", to_date=""):
+    """
+    Get one page of a cafe's orders, most recent first
+    cursor: next_cursor of the previous page ("" for the first one)
+    from_date / to_date: optional YYYY-MM-DD bounds (inclusive)
+    Returns (orders, next_cursor), next_cursor is "" on the last page
+    """
     try:
-        request = order_pb2.GetOrdersRequest(cafe_id=str(cafe_id))
+        request = order_pb2.GetOrdersRequest(
+            cafe_id=str(cafe_id),
+            cursor=cursor or "",
+            page_size=int(page_size or 0),
+            from_date=from_date or "",
+            to_date=to_date or ""
+        )
         response = stub.GetOrdersByCafe(request)
         
         orders = []
@@ -57,7 +143,36 @@ def get_orders_by_cafe(cafe_id):
                 "items": items
             })
         
-        return orders
+        return orders, response.next_cursor
     except grpc.RpcError as e:
         print(f"gRPC Error in get_orders_by_cafe: {e.code()} - {e.details()}")
-        return []
\ No newline at end of file
+        return [], ""
+
+def export_orders(cafe_id, from_date="", to_date=""):
+    """
+    Stream a cafe's whole order history, oldest first (generator of order dicts)
+    Orders arrive in chunks from ExportOrders and are yielded one by one,
+    so the history never sits in memory as a whole
+    """
+    request = order_pb2.ExportOrdersRequest(
+        cafe_id=str(cafe_id),
+        from_date=from_date or "",
+        to_date=to_date or ""
+    )
+    try:
+        for chunk in stub.ExportOrders(request):
+            for order in chunk.orders:
+                yield {
+                    "order_id": order.order_id,
+                    "cafe_id": order.cafe_id,
+                    "total_price": order.total_price,
+                    "created_at": order.created_at,
+                    "items": [
+                        {"item_id": item.item_id, "quantity": item.quantity, "price": item.price}
+                        for item in order.items
+                    ]
+                }
+    except grpc.RpcError as e:
+        # An export cut short must not look complete: the error reaches the caller
+        print(f"gRPC Error in export_orders: {e.code()} - {e.details()}")
+        raise
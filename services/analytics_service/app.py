@@ -5,10 +5,6 @@ from models.analytics import Analytics
 from models.predictions import SalesPredictor
 
 class AnalyticsServiceServicer(analytics_pb2_grpc.AnalyticsServiceServicer):
-    def __init__(self):
-        # Create new Analytics instance for every call to ensure fresh connection
-        self.predictor = SalesPredictor()
-
     def GetCardMetrics(self, request, context):
         analytics = Analytics()  # fresh instance
         month, year = request.month, request.year
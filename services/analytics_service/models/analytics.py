@@ -1,54 +1,73 @@
+from datetime import datetime
 from database.db_connection import get_connection
 
+
+def month_bounds(month, year):
+    """[start, end) datetimes of a month, so filters can use the created_at indexes."""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def month_days(month, year):
+    """[start, end) dates of a month, for the day column of daily_sales."""
+    start, end = month_bounds(month, year)
+    return start.date(), end.date()
+
+
 class Analytics:
-    def __init__(self):
-        self.conn = get_connection()
-        if not self.conn:
-            raise Exception("Database connection not available")
-    
+    """
+    Tableaux de bord lus dans le cumul journalier daily_sales (par café,
+    article et jour, voir database/daily_sales.py) plutôt que dans les
+    commandes : O(jours x articles) lignes par requête au lieu de O(commandes).
+    Chaque requête prend une connexion du pool et la rend aussitôt.
+    """
+
     def query(self, sql, params=None):
-        if not self.conn:
-            return None
-        cursor = self.conn.cursor(dictionary=True)
-        cursor.execute(sql, params or ())
-        result = cursor.fetchall()
-        cursor.close()
-        return result
+        conn = get_connection(read_only=True)
+        if conn is None:
+            raise Exception("Database connection not available")
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(sql, params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
 
     def top_product_this_month(self, month, year):
         sql = """
-            SELECT m.name, SUM(oi.quantity) AS total
-            FROM order_items oi
-            JOIN menu_items m ON oi.item_id = m.item_id
-            JOIN orders o ON oi.order_id = o.order_id
-            WHERE MONTH(o.created_at)=%s AND YEAR(o.created_at)=%s
+            SELECT m.name, SUM(s.quantity) AS total
+            FROM daily_sales s
+            JOIN menu_items m ON s.item_id = m.item_id
+            WHERE s.day >= %s AND s.day < %s
             GROUP BY m.name
             ORDER BY total DESC
             LIMIT 1
         """
-        result = self.query(sql, (month, year))
+        result = self.query(sql, month_days(month, year))
         return result[0] if result else None
 
     def top_cafe_this_month(self, month, year):
         sql = """
-            SELECT c.name, SUM(o.total_price) AS total
-            FROM orders o
-            JOIN cafes c ON o.cafe_id = c.cafe_id
-            WHERE MONTH(o.created_at)=%s AND YEAR(o.created_at)=%s
+            SELECT c.name, SUM(s.revenue) AS total
+            FROM daily_sales s
+            JOIN cafes c ON s.cafe_id = c.cafe_id
+            WHERE s.day >= %s AND s.day < %s
             GROUP BY c.name
             ORDER BY total DESC
             LIMIT 1
         """
-        result = self.query(sql, (month, year))
+        result = self.query(sql, month_days(month, year))
         return result[0] if result else None
 
     def total_sales_this_month(self, month, year):
         sql = """
-            SELECT SUM(total_price) AS total_sales
-            FROM orders
-            WHERE MONTH(created_at)=%s AND YEAR(created_at)=%s
+            SELECT SUM(revenue) AS total_sales
+            FROM daily_sales
+            WHERE day >= %s AND day < %s
         """
-        result = self.query(sql, (month, year))
+        result = self.query(sql, month_days(month, year))
         if result and result[0]['total_sales'] is not None:
             return result[0]
         return {"total_sales": 0}  # default to 0
@@ -67,40 +86,39 @@ class Analytics:
 
     def cafe_comparison(self, month, year):
         sql = """
-            SELECT c.name AS cafe, SUM(o.total_price) AS total_sales
-            FROM orders o
-            JOIN cafes c ON o.cafe_id = c.cafe_id
-            WHERE MONTH(o.created_at)=%s AND YEAR(o.created_at)=%s
+            SELECT c.name AS cafe, SUM(s.revenue) AS total_sales
+            FROM daily_sales s
+            JOIN cafes c ON s.cafe_id = c.cafe_id
+            WHERE s.day >= %s AND s.day < %s
             GROUP BY c.name
             ORDER BY total_sales DESC
         """
-        return self.query(sql, (month, year))
+        return self.query(sql, month_days(month, year))
 
 
     def sales_over_time(self, month, year):
         sql = """
-            SELECT c.name AS cafe, DATE(o.created_at) AS date, SUM(o.total_price) AS daily_total
-            FROM orders o
-            JOIN cafes c ON o.cafe_id = c.cafe_id
-            WHERE MONTH(o.created_at)=%s AND YEAR(o.created_at)=%s
-            GROUP BY c.name, DATE(o.created_at)
-            ORDER BY DATE(o.created_at)
+            SELECT c.name AS cafe, s.day AS date, SUM(s.revenue) AS daily_total
+            FROM daily_sales s
+            JOIN cafes c ON s.cafe_id = c.cafe_id
+            WHERE s.day >= %s AND s.day < %s
+            GROUP BY c.name, s.day
+            ORDER BY s.day
         """
-        return self.query(sql, (month, year))
+        return self.query(sql, month_days(month, year))
 
 
     def products_overview(self, month, year):
         sql = """
-            SELECT c.name AS cafe, m.name AS product, SUM(oi.quantity) AS qty
-            FROM order_items oi
-            JOIN menu_items m ON oi.item_id = m.item_id
-            JOIN orders o ON oi.order_id = o.order_id
-            JOIN cafes c ON o.cafe_id = c.cafe_id
-            WHERE MONTH(o.created_at)=%s AND YEAR(o.created_at)=%s
+            SELECT c.name AS cafe, m.name AS product, SUM(s.quantity) AS qty
+            FROM daily_sales s
+            JOIN menu_items m ON s.item_id = m.item_id
+            JOIN cafes c ON s.cafe_id = c.cafe_id
+            WHERE s.day >= %s AND s.day < %s
             GROUP BY c.name, m.name
             ORDER BY qty DESC
         """
-        rows = self.query(sql, (month, year))
+        rows = self.query(sql, month_days(month, year))
     
         cafes = {}
         for r in rows:
@@ -123,14 +141,13 @@ class Analytics:
     
     def category_distribution(self, month, year):
         sql = """
-            SELECT m.category, SUM(oi.quantity * m.price) AS total
-            FROM order_items oi
-            JOIN menu_items m ON oi.item_id = m.item_id
-            JOIN orders o ON oi.order_id = o.order_id
-            WHERE MONTH(o.created_at)=%s AND YEAR(o.created_at)=%s
+            SELECT m.category, SUM(s.revenue) AS total
+            FROM daily_sales s
+            JOIN menu_items m ON s.item_id = m.item_id
+            WHERE s.day >= %s AND s.day < %s
             GROUP BY m.category
         """
-        rows = self.query(sql, (month, year))
+        rows = self.query(sql, month_days(month, year))
     
         # Convert Decimal to float
         for row in rows:
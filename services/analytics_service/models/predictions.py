@@ -1,30 +1,47 @@
-from database.db_connection import get_connection
+from database.db_connection import get_connection, stream_rows
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 from datetime import datetime
 
 
+def read_connection():
+    """Connexion du pool (réplique si configurée), à rendre avec close()."""
+    conn = get_connection(read_only=True)
+    if conn is None:
+        raise Exception("Database connection not available")
+    return conn
+
+
 class SalesPredictor:
-    def __init__(self):
-        self.conn = get_connection()
 
     # -------------------------------
     # Monthly sales per café
     # -------------------------------
     def get_monthly_sales_per_cafe(self):
-        """Fetch total monthly sales for each cafe from orders table."""
+        """
+        Fetch total monthly sales for each cafe from the daily_sales rollup.
+        Rows are streamed into the DataFrame in batches (no intermediate list).
+        """
         query = """
             SELECT 
                 c.name AS cafe_name,
-                YEAR(o.created_at) AS year,
-                MONTH(o.created_at) AS month,
-                SUM(o.total_price) AS total_sales
-            FROM orders o
-            JOIN cafes c ON o.cafe_id = c.cafe_id
-            GROUP BY c.name, YEAR(o.created_at), MONTH(o.created_at)
-            ORDER BY c.name, year, month;
+                YEAR(s.day) AS year,
+                MONTH(s.day) AS month,
+                SUM(s.revenue) AS total_sales
+            FROM daily_sales s
+            JOIN cafes c ON s.cafe_id = c.cafe_id
+            GROUP BY c.name, YEAR(s.day), MONTH(s.day)
+            ORDER BY c.name, year, month
         """
-        df = pd.read_sql(query, self.conn)
+        conn = read_connection()
+        try:
+            df = pd.DataFrame.from_records(
+                stream_rows(conn, query, dictionary=False),
+                columns=["cafe_name", "year", "month", "total_sales"],
+                coerce_float=True,
+            )
+        finally:
+            conn.close()
         return df
 
     # -------------------------------
@@ -88,7 +105,11 @@ class SalesPredictor:
             GROUP BY c.name, i.name
             ORDER BY c.name, total_sold DESC;
         """
-        df = pd.read_sql(query, self.conn)
+        conn = read_connection()
+        try:
+            df = pd.read_sql(query, conn)
+        finally:
+            conn.close()
         return df
 
     # -------------------------------
@@ -1,5 +1,5 @@
 # services/cafe_service/app.py
-from database.db_connection import get_connection
+from database.db_connection import get_connection, insert_select, cached_rows, touch_tables
 import grpc
 from concurrent import futures
 import time
@@ -68,16 +68,16 @@ class CafeService(cafe_pb2_grpc.CafeServiceServicer):
             
             current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-            # Initialize inventory for all menu items
-            cursor.execute("SELECT item_id FROM menu_items")
-            menu_items = cursor.fetchall()
-            for item in menu_items:
-                cursor.execute(
-                    "INSERT INTO inventory (cafe_id, item_id, stock, restock_date) VALUES (%s, %s, %s, %s)",
-                    (cafe_id, item[0], 1, current_date)
-                )
+            # Initialize inventory for all menu items, in a single statement
+            # (INSERT ... SELECT) whatever the size of the menu
+            insert_select(
+                cursor, "inventory", ("cafe_id", "item_id", "stock", "restock_date"),
+                "SELECT %s, item_id, %s, %s FROM menu_items",
+                (cafe_id, 1, current_date)
+            )
     
             # Commit both cafe and inventory together
+            touch_tables(conn, "cafes", "inventory")
             conn.commit()
     
             # Return successful response
@@ -116,8 +116,10 @@ class CafeService(cafe_pb2_grpc.CafeServiceServicer):
 
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT cafe_id, name, location, access_code FROM cafes")
-            rows = cursor.fetchall()
+            rows = list(cached_rows(
+                conn, "SELECT cafe_id, name, location, access_code FROM cafes",
+                tables=("cafes",), dictionary=False
+            ))
         except Exception as e:
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
@@ -152,6 +154,7 @@ class CafeService(cafe_pb2_grpc.CafeServiceServicer):
                 "UPDATE cafes SET name=%s, location=%s, access_code=%s WHERE cafe_id=%s",
                 (request.nom, request.localisation, request.code_acces, request.id)
             )
+            touch_tables(conn, "cafes")
             conn.commit()
             updated = cursor.rowcount
         except Exception as e:
@@ -190,6 +193,8 @@ class CafeService(cafe_pb2_grpc.CafeServiceServicer):
 
         cursor = conn.cursor()
         try:
+            # Événements pas encore relayés vers analytics_logs (outbox d'order_service)
+            cursor.execute("DELETE FROM order_events WHERE cafe_id=%s", (request.id,))
             cursor.execute("""DELETE al 
                            FROM analytics_logs al
                            JOIN orders o ON al.order_id = o.order_id
@@ -202,8 +207,13 @@ class CafeService(cafe_pb2_grpc.CafeServiceServicer):
                            WHERE o.cafe_id = %s
                            """, (request.id,))
             cursor.execute("DELETE FROM orders WHERE cafe_id=%s", (request.id,))
+            cursor.execute("DELETE FROM daily_sales WHERE cafe_id=%s", (request.id,))
+            # Saga des commandes (migration 003) : plus de stock à rendre pour ce café
+            cursor.execute("DELETE FROM pending_compensations WHERE cafe_id=%s", (request.id,))
+            cursor.execute("DELETE FROM inventory_reservations WHERE cafe_id=%s", (request.id,))
             cursor.execute("DELETE FROM inventory WHERE cafe_id=%s", (request.id,))
             cursor.execute("DELETE FROM cafes WHERE cafe_id=%s", (request.id,))
+            touch_tables(conn, "cafes", "inventory")
             conn.commit()
             deleted = cursor.rowcount
         except Exception as e:
@@ -1,8 +1,13 @@
 from concurrent import futures
+from datetime import datetime
 import grpc
 from dotenv import load_dotenv
 
-from database.db_connection import get_connection
+from database.db_connection import get_connection, cached_rows, touch_tables
+from stock_counters import (
+    StockCounters, INVENTORY_STOCK_MODE,
+    RESERVED, REPLAYED, RELEASED, SHORT, ALREADY_RELEASED, NOT_RESERVED
+)
 
 # Import proto files
 from shared_proto import inventory_pb2, inventory_pb2_grpc
@@ -10,20 +15,139 @@ from shared_proto import inventory_pb2, inventory_pb2_grpc
 load_dotenv()
 
 
+def parse_lines(request):
+    """
+    (cafe_id, {item_id: quantité}) d'une requête ReserveItems / ReleaseItems.
+    Plusieurs lignes du même article sont additionnées.
+    Lève ValueError sur un identifiant ou une quantité invalide.
+    """
+    cafe_id = int(request.cafe_id)
+    quantities = {}
+    for line in request.items:
+        item_id = int(line.item_id)
+        if line.quantity <= 0:
+            raise ValueError(f"invalid quantity {line.quantity} for item {item_id}")
+        quantities[item_id] = quantities.get(item_id, 0) + line.quantity
+    return cafe_id, quantities
+
+
+def stock_case(quantities):
+    """
+    Fragment `CASE item_id WHEN ... END` donnant la quantité de chaque article,
+    ses paramètres, et la liste IN (...) des articles (triés, pour verrouiller
+    les lignes toujours dans le même ordre).
+    """
+    item_ids = sorted(quantities)
+    case = "CASE item_id " + " ".join(["WHEN %s THEN %s"] * len(item_ids)) + " END"
+    case_params = [value for item_id in item_ids for value in (item_id, quantities[item_id])]
+    in_list = ", ".join(["%s"] * len(item_ids))
+    return item_ids, case, case_params, in_list
+
+
+def reserve_lines(cursor, cafe_id, quantities, reservation_id=""):
+    """
+    Applique une réservation dans la transaction en cours, sans la valider.
+    Un seul UPDATE décrémente toutes les lignes à condition que chacune ait
+    assez de stock. Retourne RESERVED ; sinon REPLAYED (déjà appliquée),
+    RELEASED (déjà annulée) ou SHORT, et l'appelant doit annuler ses écritures.
+    """
+    if reservation_id:
+        # Réservation rejouée (retry de l'appelant) : déjà appliquée
+        cursor.execute(
+            "INSERT IGNORE INTO inventory_reservations (reservation_id, cafe_id, created_at) "
+            "VALUES (%s, %s, %s)",
+            (reservation_id, cafe_id, datetime.now())
+        )
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "SELECT released_at FROM inventory_reservations WHERE reservation_id = %s",
+                (reservation_id,)
+            )
+            row = cursor.fetchone()
+            return RELEASED if row is not None and row[0] is not None else REPLAYED
+
+    item_ids, case, case_params, in_list = stock_case(quantities)
+    query = f"""
+        UPDATE inventory
+        SET stock = stock - {case}
+        WHERE cafe_id = %s
+          AND item_id IN ({in_list})
+          AND stock >= {case}
+    """
+    cursor.execute(query, case_params + [cafe_id] + item_ids + case_params)
+    return RESERVED if cursor.rowcount == len(item_ids) else SHORT
+
+
+def reserve_failure(cursor, status, cafe_id, quantities):
+    """
+    Réponse d'une réservation non appliquée (après annulation de ses écritures) :
+    succès pour un rejeu, sinon échec avec les articles en rupture.
+    """
+    if status != SHORT:
+        return reserve_response(status, quantities)
+
+    item_ids, _, _, in_list = stock_case(quantities)
+    cursor.execute(
+        f"SELECT item_id, stock FROM inventory WHERE cafe_id = %s AND item_id IN ({in_list})",
+        [cafe_id] + item_ids
+    )
+    return reserve_response(SHORT, quantities, {row[0]: row[1] for row in cursor.fetchall()})
+
+
+def reserve_response(status, quantities, available=None):
+    """
+    Réponse ReserveItems d'une issue de reserve_lines() / StockCounters.reserve() ;
+    `available` : stock de chaque article, pour SHORT.
+    """
+    if status == RESERVED:
+        return inventory_pb2.ReserveItemsResponse(success=True, message="Items reserved successfully")
+    if status == REPLAYED:
+        return inventory_pb2.ReserveItemsResponse(success=True, message="Items already reserved")
+    if status == RELEASED:
+        return inventory_pb2.ReserveItemsResponse(success=False, message="Reservation already released")
+
+    response = inventory_pb2.ReserveItemsResponse(success=False)
+    for item_id in sorted(quantities):
+        stock = available.get(item_id, 0)
+        if stock < quantities[item_id]:
+            response.short_items.add(
+                item_id=str(item_id), requested=quantities[item_id], available=stock
+            )
+    short_ids = [short.item_id for short in response.short_items]
+    # Liste vide : le stock a été réapprovisionné entre-temps
+    response.message = (
+        f"Insufficient stock for item(s) {', '.join(short_ids)}" if short_ids
+        else "Insufficient stock, please retry"
+    )
+    return response
+
+
+RELEASE_RESPONSES = {
+    RELEASED: (True, "Items released", inventory_pb2.RELEASED),
+    ALREADY_RELEASED: (True, "Reservation already released", inventory_pb2.ALREADY_RELEASED),
+    NOT_RESERVED: (False, "Unknown reservation", inventory_pb2.NOT_RESERVED),
+}
+
+
 class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
-    def __init__(self):
-        self.conn = get_connection()
-        if not self.conn:
-            raise Exception("Database connection not available")
+    def __init__(self, counters=None):
+        # Compteurs de stock en mémoire (INVENTORY_STOCK_MODE=counters, voir stock_counters.py) ;
+        # None : chaque réservation écrit directement dans inventory
+        self.counters = counters
 
     def GetInventoryByCafe(self, request, context):
         """
         Récupère la liste d'inventaire pour affichage dans le Frontend (Admin)
+        Les lignes sont lues par lots (stream_rows) au lieu d'un fetchall(),
+        et servies depuis le cache tant qu'aucune table lue n'a changé.
         """
-        try:
-            conn = get_connection()
-            cursor = conn.cursor(dictionary=True)
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.InventoryListResponse()
 
+        try:
             query = """
                 SELECT 
                     i.inventory_id,
@@ -40,14 +164,9 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
                 ORDER BY c.name, m.name
             """
 
-            cursor.execute(query)
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
             response = inventory_pb2.InventoryListResponse()
 
-            for row in results:
+            for row in cached_rows(conn, query, tables=("inventory", "menu_items", "cafes")):
                 item = response.items.add()
                 item.item_id = str(row["item_id"])
                 item.cafe_id = str(row["cafe_id"])
@@ -56,6 +175,11 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
                 item.stock_quantity = int(row["stock_quantity"])
                 item.restock_date = str(row["restock_date"])
                 item.is_low_stock = bool(row["is_low_stock"])
+                stock = self.counters and self.counters.stock_of(row["cafe_id"], row["item_id"])
+                if stock is not None:
+                    # Le compteur en mémoire est en avance sur la base
+                    item.stock_quantity = stock
+                    item.is_low_stock = stock < 20
 
             return response
 
@@ -63,14 +187,25 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error fetching inventory: {str(e)}")
             return inventory_pb2.InventoryListResponse()
+        finally:
+            conn.close()
 
     def UpdateInventoryAfterOrder(self, request, context):
         """
         Met à jour le stock après une commande
         (Appel interne par Order Service)
         """
+        if self.counters is not None:
+            return self._update_counters(request, context)
+
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.UpdateInventoryResponse(success=False, message="Database unavailable")
+
+        cursor = conn.cursor()
         try:
-            cursor = self.conn.cursor()
 
             query = """
                 UPDATE inventory
@@ -90,9 +225,10 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
                 ),
             )
 
-            self.conn.commit()
             success = cursor.rowcount > 0
-            cursor.close()
+            if success:
+                touch_tables(conn, "inventory")
+            conn.commit()
 
             if success:
                 return inventory_pb2.UpdateInventoryResponse(
@@ -106,21 +242,33 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
                 )
 
         except Exception as e:
-            self.conn.rollback()
+            conn.rollback()
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error updating inventory: {str(e)}")
             return inventory_pb2.UpdateInventoryResponse(
                 success=False,
                 message=f"Error: {str(e)}",
             )
+        finally:
+            cursor.close()
+            conn.close()
 
     def RestockItem(self, request, context):
         """
         Gère le réapprovisionnement
         (Appel par la Gateway suite à une action Admin)
         """
+        if self.counters is not None:
+            return self._restock_counters(request, context)
+
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.RestockItemResponse(success=False, message="Database unavailable")
+
+        cursor = conn.cursor()
         try:
-            cursor = self.conn.cursor()
 
             query = """
                 UPDATE inventory
@@ -140,9 +288,10 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
                 ),
             )
 
-            self.conn.commit()
             success = cursor.rowcount > 0
-            cursor.close()
+            if success:
+                touch_tables(conn, "inventory")
+            conn.commit()
 
             if success:
                 return inventory_pb2.RestockItemResponse(
@@ -156,20 +305,337 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
                 )
 
         except Exception as e:
-            self.conn.rollback()
+            conn.rollback()
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error restocking item: {str(e)}")
             return inventory_pb2.RestockItemResponse(
                 success=False,
                 message=f"Error: {str(e)}",
             )
+        finally:
+            cursor.close()
+            conn.close()
+
+    def ReserveItems(self, request, context):
+        """
+        Réserve le stock de toutes les lignes d'une commande
+        (Appel interne par Order Service, un seul aller-retour par commande)
+        Un seul UPDATE décrémente toutes les lignes à condition que chacune
+        ait assez de stock : sinon rollback et rien n'est réservé.
+        Avec un reservation_id, la réservation est enregistrée dans la même
+        transaction : l'appel devient idempotent et ReleaseItems peut l'annuler.
+        """
+        try:
+            cafe_id, quantities = parse_lines(request)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return inventory_pb2.ReserveItemsResponse(success=False, message=str(e))
+
+        if not quantities:
+            return inventory_pb2.ReserveItemsResponse(success=True, message="Nothing to reserve")
+
+        if self.counters is not None:
+            try:
+                status, available = self.counters.reserve(
+                    cafe_id, quantities, request.reservation_id, new=request.new_reservation
+                )
+                return reserve_response(status, quantities, available)
+            except Exception as e:
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details(f"Error reserving items: {str(e)}")
+                return inventory_pb2.ReserveItemsResponse(success=False, message=f"Error: {str(e)}")
+
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.ReserveItemsResponse(success=False, message="Database unavailable")
+
+        cursor = conn.cursor()
+        try:
+            status = reserve_lines(cursor, cafe_id, quantities, request.reservation_id)
+            if status == RESERVED:
+                touch_tables(conn, "inventory")
+                conn.commit()
+                return inventory_pb2.ReserveItemsResponse(
+                    success=True,
+                    message="Items reserved successfully",
+                )
+
+            # Rien n'est gardé : on annule tout avant de lire le stock disponible
+            conn.rollback()
+            return reserve_failure(cursor, status, cafe_id, quantities)
+
+        except Exception as e:
+            conn.rollback()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error reserving items: {str(e)}")
+            return inventory_pb2.ReserveItemsResponse(
+                success=False,
+                message=f"Error: {str(e)}",
+            )
+        finally:
+            cursor.close()
+            conn.close()
+
+    def ReserveItemsBatch(self, request, context):
+        """
+        Réserve le stock de plusieurs commandes en un appel et une transaction
+        (synchronisation en masse des caisses, Order Service CreateOrders).
+        Chaque réservation reste tout ou rien (SAVEPOINT) et les commandes sont
+        servies dans l'ordre de la requête ; une réponse par réservation.
+        """
+        response = inventory_pb2.ReserveItemsBatchResponse()
+        parsed = []
+        for reservation in request.reservations:
+            result = response.results.add()
+            try:
+                parsed.append(parse_lines(reservation))
+            except ValueError as e:
+                parsed.append(None)
+                result.success, result.message = False, f"Invalid reservation: {e}"
+
+        if self.counters is not None:
+            return self._reserve_batch_counters(request, parsed, response, context)
+
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.ReserveItemsBatchResponse()
+
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            reserved = 0
+            for reservation, lines, result in zip(request.reservations, parsed, response.results):
+                if lines is None:
+                    continue
+                cafe_id, quantities = lines
+                if not quantities:
+                    result.success, result.message = True, "Nothing to reserve"
+                    continue
+                cursor.execute("SAVEPOINT reservation")
+                status = reserve_lines(cursor, cafe_id, quantities, reservation.reservation_id)
+                if status == RESERVED:
+                    cursor.execute("RELEASE SAVEPOINT reservation")
+                    result.success, result.message = True, "Items reserved successfully"
+                    reserved += 1
+                    continue
+                # Seule cette réservation est annulée, les précédentes restent acquises
+                cursor.execute("ROLLBACK TO SAVEPOINT reservation")
+                cursor.execute("RELEASE SAVEPOINT reservation")
+                result.CopyFrom(reserve_failure(cursor, status, cafe_id, quantities))
+
+            if reserved:
+                touch_tables(conn, "inventory")
+            conn.commit()
+            return response
+
+        except Exception as e:
+            conn.rollback()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error reserving items: {str(e)}")
+            return inventory_pb2.ReserveItemsBatchResponse()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def ReleaseItems(self, request, context):
+        """
+        Annule une réservation faite par ReserveItems (compensation d'une
+        commande qui n'a pas pu être enregistrée). Le stock n'est rendu
+        qu'une fois par reservation_id : les appels rejoués répondent
+        ALREADY_RELEASED, et NOT_RESERVED si la réservation n'a jamais eu lieu.
+        Dans ce dernier cas la réservation est enregistrée comme déjà annulée :
+        un ReserveItems encore en route (l'appelant a abandonné sur un délai
+        dépassé) arrivera après et ne réservera rien.
+        """
+        try:
+            if not request.reservation_id:
+                raise ValueError("reservation_id is required")
+            cafe_id, quantities = parse_lines(request)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return inventory_pb2.ReleaseItemsResponse(success=False, message=str(e))
+
+        if self.counters is not None:
+            try:
+                success, message, status = RELEASE_RESPONSES[
+                    self.counters.release(cafe_id, quantities, request.reservation_id)
+                ]
+                return inventory_pb2.ReleaseItemsResponse(success=success, message=message, status=status)
+            except Exception as e:
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details(f"Error releasing items: {str(e)}")
+                return inventory_pb2.ReleaseItemsResponse(success=False, message=f"Error: {str(e)}")
+
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.ReleaseItemsResponse(success=False, message="Database unavailable")
+
+        cursor = conn.cursor()
+        release = (
+            "UPDATE inventory_reservations SET released_at = %s "
+            "WHERE reservation_id = %s AND released_at IS NULL"
+        )
+        try:
+            now = datetime.now()
+            cursor.execute(release, (now, request.reservation_id))
+            if cursor.rowcount == 0:
+                # Réservation inconnue : ligne déjà annulée, un ReserveItems en retard répondra RELEASED
+                cursor.execute(
+                    "INSERT IGNORE INTO inventory_reservations "
+                    "(reservation_id, cafe_id, created_at, released_at) VALUES (%s, %s, %s, %s)",
+                    (request.reservation_id, cafe_id, now, now)
+                )
+                if cursor.rowcount == 1:
+                    conn.commit()
+                    return inventory_pb2.ReleaseItemsResponse(
+                        success=False,
+                        message="Unknown reservation",
+                        status=inventory_pb2.NOT_RESERVED,
+                    )
+                # Réservée entre-temps par un ReserveItems concurrent
+                cursor.execute(release, (now, request.reservation_id))
+            if cursor.rowcount == 1:
+                if quantities:
+                    item_ids, case, case_params, in_list = stock_case(quantities)
+                    cursor.execute(
+                        f"UPDATE inventory SET stock = stock + {case} "
+                        f"WHERE cafe_id = %s AND item_id IN ({in_list})",
+                        case_params + [cafe_id] + item_ids
+                    )
+                    touch_tables(conn, "inventory")
+                conn.commit()
+                return inventory_pb2.ReleaseItemsResponse(
+                    success=True,
+                    message="Items released",
+                    status=inventory_pb2.RELEASED,
+                )
+
+            conn.rollback()
+            return inventory_pb2.ReleaseItemsResponse(
+                success=True,
+                message="Reservation already released",
+                status=inventory_pb2.ALREADY_RELEASED,
+            )
+
+        except Exception as e:
+            conn.rollback()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error releasing items: {str(e)}")
+            return inventory_pb2.ReleaseItemsResponse(
+                success=False,
+                message=f"Error: {str(e)}",
+            )
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _update_counters(self, request, context):
+        """UpdateInventoryAfterOrder sur les compteurs en mémoire."""
+        try:
+            if request.quantity_ordered <= 0:
+                raise ValueError(f"invalid quantity {request.quantity_ordered}")
+            status, _ = self.counters.reserve(
+                int(request.cafe_id), {int(request.item_id): request.quantity_ordered}
+            )
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return inventory_pb2.UpdateInventoryResponse(success=False, message=str(e))
+        except Exception as e:
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error updating inventory: {str(e)}")
+            return inventory_pb2.UpdateInventoryResponse(success=False, message=f"Error: {str(e)}")
+
+        if status == RESERVED:
+            return inventory_pb2.UpdateInventoryResponse(success=True, message="Inventory updated successfully")
+        return inventory_pb2.UpdateInventoryResponse(success=False, message="Insufficient stock or item not found")
+
+    def _restock_counters(self, request, context):
+        """
+        RestockItem sur les compteurs en mémoire : le stock passe par le
+        compteur (et le journal), seule restock_date est écrite ici.
+        """
+        try:
+            cafe_id, item_id = int(request.cafe_id), int(request.item_id)
+            if not self.counters.adjust(cafe_id, item_id, request.quantity_added):
+                return inventory_pb2.RestockItemResponse(success=False, message="Item not found")
+        except Exception as e:
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error restocking item: {str(e)}")
+            return inventory_pb2.RestockItemResponse(success=False, message=f"Error: {str(e)}")
+
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return inventory_pb2.RestockItemResponse(
+                success=False, message="Stock added, restock date not saved: database unavailable"
+            )
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE inventory SET restock_date = %s WHERE item_id = %s AND cafe_id = %s",
+                (request.restock_date, item_id, cafe_id)
+            )
+            touch_tables(conn, "inventory")
+            conn.commit()
+            return inventory_pb2.RestockItemResponse(success=True, message="Item restocked successfully")
+        except Exception as e:
+            conn.rollback()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error saving restock date: {str(e)}")
+            return inventory_pb2.RestockItemResponse(
+                success=False, message=f"Stock added, restock date not saved: {str(e)}"
+            )
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _reserve_batch_counters(self, request, parsed, response, context):
+        """ReserveItemsBatch sur les compteurs en mémoire : un seul fsync du journal pour le lot."""
+        try:
+            for reservation, lines, result in zip(request.reservations, parsed, response.results):
+                if lines is None:
+                    continue
+                cafe_id, quantities = lines
+                if not quantities:
+                    result.success, result.message = True, "Nothing to reserve"
+                    continue
+                status, available = self.counters.reserve(
+                    cafe_id, quantities, reservation.reservation_id, sync=False,
+                    new=reservation.new_reservation
+                )
+                result.CopyFrom(reserve_response(status, quantities, available))
+            self.counters.journal.sync(self.counters.journal.seq)
+            return response
+        except Exception as e:
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error reserving items: {str(e)}")
+            return inventory_pb2.ReserveItemsBatchResponse()
+
+
+# Accepte les pings keepalive des canaux longue durée d'Order Service
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 10000),
+]
 
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), options=SERVER_OPTIONS)
 
+    # Le journal est rejoué avant d'accepter la moindre réservation
+    counters = StockCounters().start() if INVENTORY_STOCK_MODE == "counters" else None
     inventory_pb2_grpc.add_InventoryServiceServicer_to_server(
-        InventoryServiceServicer(),
+        InventoryServiceServicer(counters),
         server,
     )
 
@@ -177,7 +643,11 @@ def serve():
     print("Inventory gRPC server running on port 5006...")
 
     server.start()
-    server.wait_for_termination()
+    try:
+        server.wait_for_termination()
+    finally:
+        if counters is not None:
+            counters.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,479 @@
+"""
+Compteurs de stock en mémoire de l'Inventory Service (INVENTORY_STOCK_MODE=counters).
+
+En mode "db" (défaut) chaque réservation est un UPDATE ... AND stock >= ... :
+toutes les commandes d'un article populaire attendent le verrou de la même
+ligne d'inventaire. En mode "counters", le stock de chaque (cafe_id, item_id)
+est gardé en mémoire et c'est ce compteur qui fait foi :
+- une réservation vérifie et décrémente les compteurs en mémoire, sans aucun
+  verrou de ligne en base
+- chaque changement est écrit dans un journal (lignes JSON dans
+  INVENTORY_JOURNAL_DIR) avant la réponse ; avec INVENTORY_JOURNAL_FSYNC=1 la
+  réponse attend aussi le fsync, partagé entre les requêtes concurrentes
+- toutes les INVENTORY_FLUSH_INTERVAL_MS, un thread reporte en base les deltas
+  nets par article, les inventory_reservations et le numéro du dernier
+  enregistrement reporté (inventory_journal_checkpoint, migration 008) dans
+  une seule transaction
+- au démarrage, les enregistrements du journal postérieurs au checkpoint sont
+  rejoués en base : après un crash rien n'est perdu ni appliqué deux fois
+- une réservation dont l'appelant vient de créer le reservation_id
+  (new_reservation) n'est cherchée qu'en mémoire, sans lecture en base ; les
+  annulations de réservations inconnues restent en mémoire
+  INVENTORY_TOMBSTONE_TTL secondes après leur report pour qu'une telle
+  réservation arrivée en retard les trouve
+
+Limites :
+- une seule instance du service doit tourner dans ce mode (les compteurs ne
+  sont pas partagés entre processus)
+- inventory.stock a jusqu'à un intervalle de retard sur les compteurs
+  (GetInventoryByCafe affiche les compteurs des articles chargés)
+- un compteur est chargé depuis la base au premier accès à l'article ; un
+  changement de stock écrit en base par un autre service ensuite n'est pas vu
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+from database.db_connection import get_connection, bulk_insert, touch_tables
+
+INVENTORY_STOCK_MODE = os.getenv("INVENTORY_STOCK_MODE", "db")
+INVENTORY_JOURNAL_DIR = os.getenv("INVENTORY_JOURNAL_DIR", "inventory_journal")
+INVENTORY_JOURNAL_FSYNC = os.getenv("INVENTORY_JOURNAL_FSYNC", "1") == "1"
+INVENTORY_FLUSH_INTERVAL_MS = int(os.getenv("INVENTORY_FLUSH_INTERVAL_MS", "200"))
+INVENTORY_TOMBSTONE_TTL = float(os.getenv("INVENTORY_TOMBSTONE_TTL", "600"))
+
+RESERVATION_COLUMNS = ("reservation_id", "cafe_id", "created_at", "released_at")
+
+# Issues de reserve_lines() (app.py) et de StockCounters.reserve()
+RESERVED, REPLAYED, RELEASED, SHORT = "reserved", "replayed", "released", "short"
+# Issues de StockCounters.release() (en plus de RELEASED)
+ALREADY_RELEASED, NOT_RESERVED = "already_released", "not_reserved"
+
+
+class StockJournal:
+    """
+    Journal des changements de stock en segments journal-<n>.log, une ligne
+    JSON par enregistrement numéroté (`seq`). Un segment est fermé à chaque
+    report en base et supprimé une fois ce report validé.
+    append() et rotate() sont appelés sous le verrou de StockCounters.
+    """
+
+    def __init__(self, directory=INVENTORY_JOURNAL_DIR, fsync=INVENTORY_JOURNAL_FSYNC):
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self.seq = 0
+        self._written = 0
+        self._synced = 0
+        self._closed = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith("journal-") and name.endswith(".log")
+        )
+        self._number = int(os.path.basename(self._closed[-1])[8:-4]) if self._closed else 0
+        self._file = None
+        self._sync_lock = threading.Lock()
+
+    def replay(self):
+        """Enregistrements des segments laissés par le processus précédent."""
+        records = []
+        for path in self._closed:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Ligne coupée par un arrêt en pleine écriture : jamais confirmée
+                        break
+        return records
+
+    def open(self, seq):
+        """Ouvre un nouveau segment ; la numérotation reprend après `seq`."""
+        self.seq = self._written = self._synced = seq
+        self._open_segment()
+
+    def _open_segment(self):
+        self._number += 1
+        self._path = os.path.join(self.directory, f"journal-{self._number:010d}.log")
+        self._file = open(self._path, "a", encoding="utf-8")
+
+    def append(self, record):
+        self.seq += 1
+        record["seq"] = self.seq
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self._written = self.seq
+        return self.seq
+
+    def sync(self, seq):
+        """Attend que l'enregistrement `seq` soit sur disque (un fsync pour tous ceux en attente)."""
+        if not self.fsync or self._synced >= seq:
+            return
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            written = self._written
+            os.fsync(self._file.fileno())
+            self._synced = written
+
+    def rotate(self):
+        """Ferme le segment courant et en ouvre un autre ; retourne les segments fermés."""
+        with self._sync_lock:
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._synced = self._written
+            self._file.close()
+            self._closed.append(self._path)
+            self._open_segment()
+        return self.segments()
+
+    def segments(self):
+        """Segments fermés, pas encore supprimés."""
+        return list(self._closed)
+
+    def discard(self, segments):
+        """Supprime des segments dont tous les enregistrements sont en base."""
+        for path in segments:
+            os.remove(path)
+            self._closed.remove(path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def replay_records(records):
+    """
+    (deltas par (cafe_id, item_id), lignes inventory_reservations à insérer,
+    {reservation_id: released_at} à marquer) d'enregistrements du journal.
+    """
+    deltas, rows, releases = {}, {}, {}
+    for record in records:
+        cafe_id = record["cafe"]
+        for item_id, delta in record["deltas"].items():
+            key = (cafe_id, int(item_id))
+            deltas[key] = deltas.get(key, 0) + delta
+        reservation_id = record.get("id")
+        if not reservation_id:
+            continue
+        if record["op"] == "reserve":
+            rows[reservation_id] = [reservation_id, cafe_id, record["at"], None]
+        elif record["op"] == "tombstone":
+            rows[reservation_id] = [reservation_id, cafe_id, record["at"], record["at"]]
+        elif reservation_id in rows:
+            rows[reservation_id][3] = record["at"]
+        else:
+            releases[reservation_id] = record["at"]
+    return deltas, list(rows.values()), releases
+
+
+class StockCounters:
+    """Stock en mémoire, journal et report en base, partagés par les threads du service."""
+
+    def __init__(self, journal=None, flush_interval_ms=INVENTORY_FLUSH_INTERVAL_MS,
+                 tombstone_ttl=INVENTORY_TOMBSTONE_TTL):
+        self.journal = journal or StockJournal()
+        self.flush_interval = flush_interval_ms / 1000
+        self.tombstone_ttl = tombstone_ttl
+        self._stock = {}
+        self._pending = {}
+        # Réservations dont l'état n'est pas (encore) entièrement en base,
+        # et annulations récentes de réservations inconnues
+        self._reservations = {}
+        # (instant du report, reservation_id) des annulations gardées en mémoire
+        self._tombstones = deque()
+        self._dirty = set()
+        # Incrémenté à chaque report : des réservations ont pu quitter la mémoire
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.recover()
+        self._thread = threading.Thread(target=self._run, name="stock-flush", daemon=True)
+        self._thread.start()
+        print(f"✅ Inventory stock counters enabled (flush every {self.flush_interval * 1000:.0f} ms, "
+              f"journal in {self.journal.directory})")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self.journal.close()
+
+    def recover(self):
+        """Rejoue en base les enregistrements du journal postérieurs au checkpoint."""
+        conn = _connection()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT seq FROM inventory_journal_checkpoint WHERE id = 1")
+                checkpoint = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+            records = self.journal.replay()
+            last = max([checkpoint] + [record["seq"] for record in records])
+            records = [record for record in records if record["seq"] > checkpoint]
+            if records:
+                self._write(conn, *replay_records(records), last)
+                print(f"♻️ Stock journal replayed: {len(records)} records after #{checkpoint}")
+        finally:
+            conn.close()
+        segments = self.journal.segments()
+        self.journal.open(last)
+        self.journal.discard(segments)
+
+    def stock_of(self, cafe_id, item_id):
+        """Stock en mémoire, ou None si l'article n'est pas chargé."""
+        return self._stock.get((cafe_id, item_id))
+
+    def reserve(self, cafe_id, quantities, reservation_id="", sync=True, new=False):
+        """
+        Réserve toutes les lignes ou aucune. Retourne (statut, stock disponible
+        par article pour SHORT), avec les statuts de reserve_lines().
+        sync=False : l'appelant appelle journal.sync(journal.seq) avant de répondre.
+        new=True : reservation_id vient d'être créé par l'appelant, il n'est
+        cherché qu'en mémoire.
+        """
+        while True:
+            generation, stored = self._lookup(reservation_id, new)
+            if stored is not None:
+                return stored, {}
+            self._load(cafe_id, quantities)
+            with self._lock:
+                entry = self._reservations.get(reservation_id) if reservation_id else None
+                if entry is None and reservation_id and self._generation != generation:
+                    continue
+                if entry is not None:
+                    status, seq = (REPLAYED if entry["released_at"] is None else RELEASED), entry["seq"]
+                    break
+                available = {item_id: self._stock.get((cafe_id, item_id), 0) for item_id in quantities}
+                if any(available[item_id] < quantity for item_id, quantity in quantities.items()):
+                    return SHORT, available
+                now = datetime.now()
+                seq = self._apply("reserve", reservation_id, cafe_id,
+                                  {item_id: -quantity for item_id, quantity in quantities.items()}, now)
+                if reservation_id:
+                    self._reservations[reservation_id] = {
+                        "cafe_id": cafe_id, "created_at": now, "released_at": None, "in_db": False, "seq": seq
+                    }
+                    self._dirty.add(reservation_id)
+                status = RESERVED
+                break
+        if sync:
+            self.journal.sync(seq)
+        return status, {}
+
+    def release(self, cafe_id, quantities, reservation_id):
+        """
+        Rend le stock d'une réservation, une seule fois : RELEASED, ALREADY_RELEASED
+        ou NOT_RESERVED. Une réservation inconnue est journalisée comme déjà
+        annulée ("tombstone") : un reserve() arrivé ensuite répond RELEASED.
+        """
+        while True:
+            generation, stored = self._lookup(reservation_id)
+            self._load(cafe_id, quantities)
+            with self._lock:
+                entry = self._reservations.get(reservation_id)
+                if entry is None:
+                    if self._generation != generation:
+                        continue
+                    if stored is None:
+                        now = datetime.now()
+                        seq = self._apply("tombstone", reservation_id, cafe_id, {}, now)
+                        self._reservations[reservation_id] = {
+                            "cafe_id": cafe_id, "created_at": now, "released_at": now, "in_db": False, "seq": seq,
+                            "tombstone": True
+                        }
+                        self._dirty.add(reservation_id)
+                        status = NOT_RESERVED
+                        break
+                    if stored == RELEASED:
+                        return ALREADY_RELEASED
+                    entry = self._reservations[reservation_id] = {
+                        "cafe_id": cafe_id, "created_at": None, "released_at": None, "in_db": True
+                    }
+                if entry["released_at"] is not None:
+                    status, seq = ALREADY_RELEASED, entry["seq"]
+                    break
+                entry["released_at"] = datetime.now()
+                entry["seq"] = seq = self._apply("release", reservation_id, cafe_id, quantities,
+                                                 entry["released_at"])
+                self._dirty.add(reservation_id)
+                status = RELEASED
+                break
+        self.journal.sync(seq)
+        return status
+
+    def adjust(self, cafe_id, item_id, quantity):
+        """Ajoute `quantity` au stock (réapprovisionnement) ; False si l'article n'existe pas."""
+        self._load(cafe_id, (item_id,))
+        with self._lock:
+            if (cafe_id, item_id) not in self._stock:
+                return False
+            seq = self._apply("adjust", "", cafe_id, {item_id: quantity}, datetime.now())
+        self.journal.sync(seq)
+        return True
+
+    def flush(self):
+        """Reporte en base les changements en attente ; retourne le nombre d'articles mis à jour."""
+        with self._lock:
+            if not self._pending and not self._dirty:
+                return 0
+            deltas, self._pending = self._pending, {}
+            flushed, self._dirty = self._dirty, set()
+            rows, releases = [], {}
+            for reservation_id in flushed:
+                entry = self._reservations[reservation_id]
+                if not entry["in_db"]:
+                    rows.append((reservation_id, entry["cafe_id"], entry["created_at"], entry["released_at"]))
+                elif entry["released_at"] is not None:
+                    releases[reservation_id] = entry["released_at"]
+            seq = self.journal.seq
+            segments = self.journal.rotate()
+
+        conn = None
+        try:
+            conn = _connection()
+            self._write(conn, deltas, rows, releases, seq)
+        except Exception:
+            # Gardé pour le prochain report ; le journal n'est pas supprimé
+            with self._lock:
+                for key, delta in deltas.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+                self._dirty |= flushed
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+
+        now = time.monotonic()
+        with self._lock:
+            for reservation_id in flushed:
+                entry = self._reservations[reservation_id]
+                if reservation_id in self._dirty:
+                    entry["in_db"] = True
+                elif entry.get("tombstone"):
+                    # Gardée pour les réservations new_reservation en retard
+                    entry["in_db"] = True
+                    self._tombstones.append((now, reservation_id))
+                else:
+                    del self._reservations[reservation_id]
+            while self._tombstones and now - self._tombstones[0][0] > self.tombstone_ttl:
+                del self._reservations[self._tombstones.popleft()[1]]
+            self._generation += 1
+        self.journal.discard(segments)
+        return len(deltas)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Stock counters flush failed, will retry: {e}")
+
+    def _apply(self, op, reservation_id, cafe_id, deltas, at):
+        """Change les compteurs et journalise, sous self._lock. Retourne le numéro d'enregistrement."""
+        for item_id, delta in deltas.items():
+            key = (cafe_id, item_id)
+            if key in self._stock:
+                self._stock[key] += delta
+            self._pending[key] = self._pending.get(key, 0) + delta
+        return self.journal.append({
+            "op": op, "id": reservation_id, "cafe": cafe_id, "deltas": deltas, "at": str(at)
+        })
+
+    def _lookup(self, reservation_id, new=False):
+        """
+        (génération, REPLAYED / RELEASED si la réservation est en base, sinon None).
+        La base n'est lue que si la réservation n'est ni en mémoire ni nouvelle.
+        """
+        with self._lock:
+            generation = self._generation
+            if not reservation_id or new or reservation_id in self._reservations:
+                return generation, None
+        conn = _connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT released_at FROM inventory_reservations WHERE reservation_id = %s",
+                (reservation_id,)
+            )
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        if row is None:
+            return generation, None
+        return generation, (REPLAYED if row[0] is None else RELEASED)
+
+    def _load(self, cafe_id, item_ids):
+        """Charge depuis la base les compteurs des articles pas encore en mémoire."""
+        missing = [item_id for item_id in item_ids if (cafe_id, item_id) not in self._stock]
+        if not missing:
+            return
+        conn = _connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"SELECT item_id, stock FROM inventory WHERE cafe_id = %s "
+                f"AND item_id IN ({', '.join(['%s'] * len(missing))})",
+                [cafe_id] + missing
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        with self._lock:
+            for item_id, stock in rows:
+                # Chargé entre-temps par un autre thread : le compteur en mémoire fait foi
+                self._stock.setdefault((cafe_id, item_id), int(stock))
+
+    def _write(self, conn, deltas, rows, releases, seq):
+        """Une transaction : deltas de stock, réservations et checkpoint du journal."""
+        by_cafe = {}
+        for (cafe_id, item_id), delta in sorted(deltas.items()):
+            if delta:
+                by_cafe.setdefault(cafe_id, {})[item_id] = delta
+        cursor = conn.cursor()
+        try:
+            for cafe_id, cafe_deltas in by_cafe.items():
+                item_ids = list(cafe_deltas)
+                case = "CASE item_id " + " ".join(["WHEN %s THEN %s"] * len(item_ids)) + " END"
+                cursor.execute(
+                    f"UPDATE inventory SET stock = stock + {case} "
+                    f"WHERE cafe_id = %s AND item_id IN ({', '.join(['%s'] * len(item_ids))})",
+                    [value for item_id in item_ids for value in (item_id, cafe_deltas[item_id])]
+                    + [cafe_id] + item_ids
+                )
+            bulk_insert(cursor, "inventory_reservations", RESERVATION_COLUMNS, rows, ignore=True)
+            for reservation_id, released_at in releases.items():
+                cursor.execute(
+                    "UPDATE inventory_reservations SET released_at = %s "
+                    "WHERE reservation_id = %s AND released_at IS NULL",
+                    (released_at, reservation_id)
+                )
+            cursor.execute(
+                "UPDATE inventory_journal_checkpoint SET seq = %s, updated_at = %s WHERE id = 1",
+                (seq, datetime.now())
+            )
+            if by_cafe:
+                touch_tables(conn, "inventory")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def _connection():
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Database unavailable")
+    return conn
@@ -1,4 +1,4 @@
-from database.db_connection import get_connection
+from database.db_connection import get_connection, cached_rows
 
 import grpc
 from concurrent import futures
@@ -75,14 +75,10 @@ class LoginServicer(login_pb2_grpc.LoginServiceServicer):
             return login_pb2.CafeListResponse(cafes=[])
         
         try:
-            cursor = conn.cursor()
-            
-            # Récupérer tous les cafés
+            # Récupérer tous les cafés (cache invalidé à chaque écriture sur cafes)
             query = "SELECT cafe_id, name, location FROM cafes ORDER BY name"
-            cursor.execute(query)
-            results = cursor.fetchall()
+            results = list(cached_rows(conn, query, tables=("cafes",), dictionary=False))
             
-            cursor.close()
             conn.close()
             
             # Créer la liste des cafés
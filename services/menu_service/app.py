@@ -1,4 +1,4 @@
-from database.db_connection import get_connection  
+from database.db_connection import get_connection, cached_rows, touch_tables
 
 import grpc
 from concurrent import futures
@@ -19,6 +19,7 @@ class MenuService(menu_pb2_grpc.MenuServiceServicer):
             "INSERT INTO menu_items (name, category, price) VALUES (%s, %s, %s)",
             (request.name, request.category, request.price)
         )
+        touch_tables(conn, "menu_items")
         conn.commit()
         item_id = cursor.lastrowid
         cursor.close()
@@ -37,10 +38,7 @@ class MenuService(menu_pb2_grpc.MenuServiceServicer):
             context.set_details("Database connection failed")
             return menu_pb2.MenuItemsResponse(items=[])
         
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM menu_items")
-        rows = cursor.fetchall()
-        cursor.close()
+        rows = list(cached_rows(conn, "SELECT * FROM menu_items", tables=("menu_items",), dictionary=False))
         conn.close()
 
         items = [
@@ -65,6 +63,7 @@ class MenuService(menu_pb2_grpc.MenuServiceServicer):
             "UPDATE menu_items SET name=%s, category=%s, price=%s WHERE item_id=%s",
             (request.name, request.category, request.price, request.id)
         )
+        touch_tables(conn, "menu_items")
         conn.commit()
         cursor.close()
         conn.close()
@@ -84,6 +83,7 @@ class MenuService(menu_pb2_grpc.MenuServiceServicer):
         
         cursor = conn.cursor()
         cursor.execute("DELETE FROM menu_items WHERE item_id=%s", (request.id,))
+        touch_tables(conn, "menu_items")
         conn.commit()
         affected = cursor.rowcount
         cursor.close()
@@ -0,0 +1,237 @@
+"""
+Contrôle d'admission de l'Order Service (délestage en surcharge).
+
+Un café qui inonde le service de nouveaux essais ne doit pas occuper tous les
+threads du serveur au détriment des autres cafés :
+- ORDER_MAX_IN_FLIGHT_PER_CAFE : CreateOrder en cours au plus par café ; au-delà
+  la commande est refusée tout de suite, avant tout accès à la base ou à
+  l'inventaire (AdmissionControl.slot, dans le handler). Même limite sur le
+  serveur synchrone et sur le serveur asyncio
+- ORDER_MAX_QUEUE_DEPTH : RPC en attente d'un thread au plus ; au-delà les
+  nouvelles RPC sont refusées dès leur arrivée (QueueLimit / AioQueueLimit,
+  intercepteurs des deux serveurs). Les RPC en cours et en file sont comptées
+  par le pool de threads lui-même (CountingExecutor)
+
+Les refus sont en RESOURCE_EXHAUSTED avec la métadonnée de fin
+grpc-retry-pushback-ms (délai conseillé avant un nouvel essai, estimé à partir
+de la durée moyenne d'un CreateOrder). Les commandes délestées sont comptées
+et résumées dans les logs au plus toutes les ADMISSION_LOG_INTERVAL secondes.
+"""
+import os
+import time
+import inspect
+import threading
+from concurrent import futures
+from contextlib import contextmanager
+
+import grpc
+
+ORDER_MAX_IN_FLIGHT_PER_CAFE = int(os.getenv("ORDER_MAX_IN_FLIGHT_PER_CAFE", "4"))
+ORDER_MAX_QUEUE_DEPTH = int(os.getenv("ORDER_MAX_QUEUE_DEPTH", "50"))
+ADMISSION_LOG_INTERVAL = float(os.getenv("ADMISSION_LOG_INTERVAL", "10"))
+
+RETRY_PUSHBACK_KEY = "grpc-retry-pushback-ms"
+MIN_RETRY_AFTER_MS = 50
+MAX_RETRY_AFTER_MS = 5000
+
+
+class Overloaded(Exception):
+    """Requête délestée ; retry_after_ms : délai conseillé avant un nouvel essai."""
+
+    def __init__(self, message, retry_after_ms):
+        super().__init__(message)
+        self.retry_after_ms = retry_after_ms
+
+
+def reject(context, error):
+    """Code RESOURCE_EXHAUSTED et délai conseillé sur le contexte de la RPC."""
+    context.set_trailing_metadata(((RETRY_PUSHBACK_KEY, str(error.retry_after_ms)),))
+    context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+    context.set_details(str(error))
+
+
+class AdmissionControl:
+    """Limites d'admission et compteurs de délestage, partagés par les threads du service."""
+
+    def __init__(self, per_cafe=ORDER_MAX_IN_FLIGHT_PER_CAFE, max_in_flight=0,
+                 log_interval=ADMISSION_LOG_INTERVAL):
+        # max_in_flight : CreateOrder en cours au plus, tous cafés confondus (0 = pas de limite)
+        self.per_cafe = per_cafe
+        self.max_in_flight = max_in_flight
+        self.log_interval = log_interval
+        self._in_flight = {}
+        self._total = 0
+        self._latency = 0.02
+        self._stats = {"admitted": 0, "shed_cafe": 0, "shed_total": 0, "shed_queue": 0}
+        self._logged = dict(self._stats)
+        self._last_log = time.monotonic()
+        self._lock = threading.Lock()
+
+    def retry_after_ms(self, waiting=1, workers=1):
+        """Temps estimé pour que `waiting` requêtes passent sur `workers` threads."""
+        estimate = int(self._latency * 1000 * max(waiting, 1) / max(workers, 1))
+        return min(max(estimate, MIN_RETRY_AFTER_MS), MAX_RETRY_AFTER_MS)
+
+    @contextmanager
+    def slot(self, cafe_id):
+        """Place de CreateOrder pour `cafe_id` ; lève Overloaded si le café ou le service est à sa limite."""
+        with self._lock:
+            count = self._in_flight.get(cafe_id, 0)
+            if self.per_cafe > 0 and count >= self.per_cafe:
+                self._stats["shed_cafe"] += 1
+                shed = f"Too many orders in progress for cafe {cafe_id}, retry later"
+            elif self.max_in_flight > 0 and self._total >= self.max_in_flight:
+                self._stats["shed_total"] += 1
+                shed = "Order service overloaded, retry later"
+            else:
+                self._in_flight[cafe_id] = count + 1
+                self._total += 1
+                self._stats["admitted"] += 1
+                shed = None
+        if shed:
+            self._log_shedding()
+            raise Overloaded(shed, self.retry_after_ms())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._latency = 0.9 * self._latency + 0.1 * elapsed
+                self._total -= 1
+                if self._in_flight[cafe_id] <= 1:
+                    del self._in_flight[cafe_id]
+                else:
+                    self._in_flight[cafe_id] -= 1
+
+    def shed_queue(self):
+        with self._lock:
+            self._stats["shed_queue"] += 1
+        self._log_shedding()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=self._total)
+
+    def _log_shedding(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < self.log_interval:
+                return
+            cafe = self._stats["shed_cafe"] - self._logged["shed_cafe"]
+            total = self._stats["shed_total"] - self._logged["shed_total"]
+            queue = self._stats["shed_queue"] - self._logged["shed_queue"]
+            self._logged = dict(self._stats)
+            self._last_log = now
+        print(f"🚦 Order load shed in the last {self.log_interval:.0f}s: "
+              f"{cafe} CreateOrder over the per-cafe limit, {total} over the service limit, "
+              f"{queue} RPCs over the queue limit")
+
+
+class CountingExecutor(futures.ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor qui compte lui-même ses tâches soumises et pas encore
+    terminées. Les deux serveurs gRPC soumettent une tâche par RPC (le
+    serveur asyncio, par run_in_executor, pour ses méthodes synchrones) :
+    au-delà de `workers` tâches, les suivantes attendent un thread.
+    """
+
+    def __init__(self, max_workers, **kwargs):
+        super().__init__(max_workers=max_workers, **kwargs)
+        self.workers = max_workers
+        self._outstanding = 0
+        self._count_lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._count_lock:
+            self._outstanding += 1
+        try:
+            future = super().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        # Appelé aussi pour une tâche annulée (shutdown(cancel_futures=True))
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._count_lock:
+            self._outstanding -= 1
+
+    def queued(self):
+        """Tâches en attente d'un thread."""
+        with self._count_lock:
+            return max(self._outstanding - self.workers, 0)
+
+
+BEHAVIORS = ("unary_unary", "unary_stream", "stream_unary", "stream_stream")
+
+
+class QueueLimit(grpc.ServerInterceptor):
+    """
+    Intercepteur du serveur synchrone : les intercepteurs tournent avant la
+    mise en file des RPC, on y refuse les nouvelles RPC quand plus de
+    `max_depth` RPC attendent un thread de `executor` (un CountingExecutor).
+    """
+
+    def __init__(self, executor, admission, max_depth=ORDER_MAX_QUEUE_DEPTH):
+        self.executor = executor
+        self.admission = admission
+        self.max_depth = max_depth
+
+    def _overloaded(self, handler):
+        """Overloaded si la RPC de `handler` doit être refusée, sinon None."""
+        if handler is None or self.max_depth <= 0:
+            return None
+        depth = self.executor.queued()
+        if depth < self.max_depth:
+            return None
+        self.admission.shed_queue()
+        return Overloaded("Order service overloaded, retry later",
+                          self.admission.retry_after_ms(depth, self.executor.workers))
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        error = self._overloaded(handler)
+        if error is None:
+            return handler
+
+        def refuse(request_or_iterator, context):
+            context.set_trailing_metadata(((RETRY_PUSHBACK_KEY, str(error.retry_after_ms)),))
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(error))
+
+        # Même type de RPC que la méthode appelée, sérialisation incluse
+        return handler._replace(**{
+            name: refuse if getattr(handler, name) is not None else None for name in BEHAVIORS
+        })
+
+
+def _runs_in_loop(behavior):
+    # Coroutine ou générateur asynchrone : exécuté dans la boucle, pas dans le pool
+    return inspect.iscoroutinefunction(behavior) or inspect.isasyncgenfunction(behavior)
+
+
+class AioQueueLimit(QueueLimit, grpc.aio.ServerInterceptor):
+    """
+    QueueLimit pour le serveur asyncio, sur son migration_thread_pool. Les
+    méthodes coroutines (CreateOrder) n'attendent pas de thread : elles sont
+    limitées par AdmissionControl.slot (par café et au total).
+    """
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is not None and any(
+            _runs_in_loop(getattr(handler, name)) for name in BEHAVIORS if getattr(handler, name)
+        ):
+            return handler
+        error = self._overloaded(handler)
+        if error is None:
+            return handler
+
+        async def refuse(request_or_iterator, context):
+            context.set_trailing_metadata(((RETRY_PUSHBACK_KEY, str(error.retry_after_ms)),))
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(error))
+
+        return handler._replace(**{
+            name: refuse if getattr(handler, name) is not None else None for name in BEHAVIORS
+        })
@@ -0,0 +1,133 @@
+"""
+Variante asyncio de l'Order Service (grpc.aio), choisie au démarrage avec
+ORDER_SERVICE_ASYNC=1 (voir app.py).
+
+Le serveur synchrone occupe un thread par commande pendant tout l'appel
+ReserveItems ; ici CreateOrder est une coroutine : des centaines de commandes
+peuvent attendre l'inventaire en même temps dans un seul processus.
+- l'appel ReserveItems passe par des canaux grpc.aio (AsyncInventoryChannelPool)
+- il n'y a pas de driver MySQL asynchrone dans la pile : les deux étapes SQL
+  de CreateOrder (_prepare_order / _commit_order) tournent sur un petit pool
+  de threads (ORDER_AIO_DB_THREADS, de la taille du pool de connexions), et
+  aucune connexion n'est gardée pendant l'attente de l'inventaire
+- les autres RPC (CreateOrders, StreamOrders, GetOrdersByCafe, ExportOrders)
+  restent les méthodes synchrones d'OrderServiceServicer, exécutées par le
+  migration_thread_pool du serveur
+
+Délestage comme sur le serveur synchrone (voir admission.py) : même limite
+ORDER_MAX_IN_FLIGHT_PER_CAFE par café, ORDER_MAX_QUEUE_DEPTH sur le pool des
+RPC synchrones, et refus en RESOURCE_EXHAUSTED avec grpc-retry-pushback-ms.
+- ORDER_AIO_MAX_CONCURRENT : CreateOrder en cours au plus, tous cafés confondus
+  (remplace le nombre de threads qui borne le serveur synchrone)
+- ORDER_AIO_DB_THREADS : threads des étapes SQL de CreateOrder
+- ORDER_AIO_SYNC_THREADS : threads des RPC synchrones
+"""
+import os
+import asyncio
+import itertools
+from concurrent import futures
+
+import grpc
+
+from shared_proto import order_pb2_grpc, inventory_pb2_grpc
+from app import (
+    OrderServiceServicer, INVENTORY_SERVICE_ADDRESS, INVENTORY_CHANNELS,
+    INVENTORY_CHANNEL_OPTIONS, INVENTORY_RPC_TIMEOUT, reserve_request, reply, failure
+)
+from admission import AdmissionControl, AioQueueLimit, CountingExecutor, Overloaded, reject
+
+ORDER_AIO_MAX_CONCURRENT = int(os.getenv("ORDER_AIO_MAX_CONCURRENT", "500"))
+ORDER_AIO_DB_THREADS = int(os.getenv("ORDER_AIO_DB_THREADS", os.getenv("DB_POOL_SIZE", "10")))
+ORDER_AIO_SYNC_THREADS = int(os.getenv("ORDER_AIO_SYNC_THREADS", "10"))
+
+
+class AsyncInventoryChannelPool:
+    """
+    InventoryChannelPool en grpc.aio (à créer dans la boucle asyncio du serveur).
+    Seul ReserveItems est appelé ici : le Compensator et les RPC par lots
+    gardent le pool synchrone.
+    """
+
+    def __init__(self, address=INVENTORY_SERVICE_ADDRESS, size=INVENTORY_CHANNELS,
+                 options=INVENTORY_CHANNEL_OPTIONS):
+        self.address = address
+        self._channels = [
+            grpc.aio.insecure_channel(address, options=options) for _ in range(max(size, 1))
+        ]
+        self._stubs = [inventory_pb2_grpc.InventoryServiceStub(channel) for channel in self._channels]
+        # Une seule boucle : pas besoin de verrou
+        self._next = itertools.cycle(self._stubs)
+
+    async def reserve_items(self, request):
+        return await next(self._next).ReserveItems(
+            request, timeout=INVENTORY_RPC_TIMEOUT, wait_for_ready=True
+        )
+
+    async def close(self):
+        for channel in self._channels:
+            await channel.close()
+
+
+class AsyncOrderServiceServicer(OrderServiceServicer):
+    """OrderServiceServicer dont CreateOrder n'occupe pas de thread pendant l'appel à l'inventaire."""
+
+    def __init__(self, inventory=None, aio_inventory=None, db_threads=ORDER_AIO_DB_THREADS):
+        super().__init__(inventory)
+        self.aio_inventory = aio_inventory or AsyncInventoryChannelPool()
+        self.db_executor = futures.ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="order-db")
+        self.admission = AdmissionControl(max_in_flight=ORDER_AIO_MAX_CONCURRENT)
+
+    async def CreateOrder(self, request, context):
+        """Même saga et mêmes limites que OrderServiceServicer.CreateOrder."""
+        try:
+            with self.admission.slot(request.cafe_id):
+                return await self._create_order_async(request, context)
+        except Overloaded as e:
+            reject(context, e)
+            return failure(str(e))
+
+    async def _create_order_async(self, request, context):
+        loop = asyncio.get_running_loop()
+        prepared, response, code = await loop.run_in_executor(self.db_executor, self._prepare_order, request)
+        if prepared is None:
+            return reply(context, response, code)
+        try:
+            inventory_response = await self.aio_inventory.reserve_items(reserve_request(prepared))
+        except asyncio.CancelledError:
+            # Client parti pendant la réservation : issue inconnue, le stock est rendu
+            self.compensator.trigger(prepared.reservation_id)
+            raise
+        except Exception as e:
+            return reply(context, *self._reservation_failed(prepared, e))
+        return reply(context, *await loop.run_in_executor(
+            self.db_executor, self._commit_order, prepared, inventory_response
+        ))
+
+    async def close(self):
+        self.compensator.stop()
+        self.outbox.stop()
+        self.inventory.close()
+        await self.aio_inventory.close()
+        self.db_executor.shutdown(wait=False)
+
+
+async def serve_aio(address='[::]:5002'):
+    executor = CountingExecutor(max_workers=ORDER_AIO_SYNC_THREADS)
+    servicer = AsyncOrderServiceServicer()
+    server = grpc.aio.server(
+        migration_thread_pool=executor,
+        interceptors=[AioQueueLimit(executor, servicer.admission)]
+    )
+    order_pb2_grpc.add_OrderServiceServicer_to_server(servicer, server)
+    server.add_insecure_port(address)
+    await server.start()
+    print(f"✅ Order Service (asyncio) running on port 5002, "
+          f"up to {ORDER_AIO_MAX_CONCURRENT} concurrent CreateOrder")
+    try:
+        await server.wait_for_termination()
+    finally:
+        await servicer.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(serve_aio())
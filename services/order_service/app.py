@@ -1,177 +1,827 @@
-from concurrent import futures
+import os
+import time
+import base64
+import uuid
+import queue
+import itertools
+import threading
+from collections import namedtuple
 import grpc
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from database.db_connection import get_connection
+from database.db_connection import get_connection, stream_rows, bulk_insert
 import grpc
 from shared_proto import order_pb2, order_pb2_grpc
 from shared_proto import inventory_pb2, inventory_pb2_grpc
+from compensation import Compensator, record_pending, record_pending_many, complete_pending, forget_pending
+from outbox import OutboxRelay, record_order_event, record_order_events
+from idempotency import RecentOrders, check_key, find_orders
+from menu_prices import MenuPrices, price_lines, order_total
+from snowflake import IdGenerator
+from admission import AdmissionControl, CountingExecutor, Overloaded, QueueLimit, reject
 
 load_dotenv()
 
+INVENTORY_SERVICE_ADDRESS = os.getenv("INVENTORY_SERVICE_ADDRESS", "inventory_service:5006")
+# Canaux HTTP/2 ouverts une fois au démarrage et partagés par toutes les commandes
+INVENTORY_CHANNELS = int(os.getenv("INVENTORY_CHANNELS", "2"))
+INVENTORY_RPC_TIMEOUT = float(os.getenv("INVENTORY_RPC_TIMEOUT", "5"))
+INVENTORY_KEEPALIVE_MS = int(os.getenv("INVENTORY_KEEPALIVE_MS", "30000"))
+# Réservation d'un lot de CreateOrders : doit rester sous COMPENSATION_GRACE
+INVENTORY_BATCH_TIMEOUT = float(os.getenv("INVENTORY_BATCH_TIMEOUT", "20"))
+# Nombre max de commandes par appel CreateOrders
+ORDER_BULK_MAX = int(os.getenv("ORDER_BULK_MAX", "1000"))
+# Group commit de StreamOrders : taille max d'un micro-lot et attente max (ms)
+ORDER_STREAM_BATCH = int(os.getenv("ORDER_STREAM_BATCH", "100"))
+ORDER_STREAM_MAX_DELAY_MS = float(os.getenv("ORDER_STREAM_MAX_DELAY_MS", "20"))
+# Pagination de GetOrdersByCafe
+ORDERS_PAGE_SIZE = int(os.getenv("ORDERS_PAGE_SIZE", "50"))
+ORDERS_MAX_PAGE_SIZE = int(os.getenv("ORDERS_MAX_PAGE_SIZE", "500"))
+# Commandes par message de ExportOrders
+ORDERS_EXPORT_CHUNK = int(os.getenv("ORDERS_EXPORT_CHUNK", "200"))
+# Threads du serveur gRPC synchrone
+ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", "10"))
+# Serveur grpc.aio (aio_app.py) au lieu du serveur à pool de threads
+ORDER_SERVICE_ASYNC = os.getenv("ORDER_SERVICE_ASYNC", "0") == "1"
+
+# Identifiants générés par le service (snowflake.py), pas par AUTO_INCREMENT
+ORDER_ITEM_COLUMNS = ("order_item_id", "order_id", "item_id", "quantity", "price")
+
+INVENTORY_CHANNEL_OPTIONS = [
+    # Pings HTTP/2 pour détecter une connexion morte (NAT, redémarrage du conteneur)
+    ("grpc.keepalive_time_ms", INVENTORY_KEEPALIVE_MS),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    # Reconnexion rapide après une panne de l'inventaire
+    ("grpc.initial_reconnect_backoff_ms", 200),
+    ("grpc.max_reconnect_backoff_ms", 5000),
+]
+
+
+class InventoryChannelPool:
+    """
+    Petit pool de canaux gRPC longue durée vers Inventory Service.
+    - les canaux sont créés au démarrage et se reconnectent seuls
+      (backoff gRPC), les appels attendent le retour de la connexion
+      (wait_for_ready) dans la limite de INVENTORY_RPC_TIMEOUT
+    - les appels sont répartis en round-robin sur les canaux
+    """
+
+    def __init__(self, address=INVENTORY_SERVICE_ADDRESS, size=INVENTORY_CHANNELS,
+                 options=INVENTORY_CHANNEL_OPTIONS):
+        self.address = address
+        self._channels = []
+        self._stubs = []
+        for index in range(max(size, 1)):
+            channel = grpc.insecure_channel(address, options=options)
+            channel.subscribe(self._state_logger(index), try_to_connect=True)
+            self._channels.append(channel)
+            self._stubs.append(inventory_pb2_grpc.InventoryServiceStub(channel))
+        self._next = itertools.cycle(range(len(self._stubs)))
+        self._lock = threading.Lock()
+
+    def _state_logger(self, index):
+        previous = {"state": None}
+
+        def log(state):
+            if state in (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.READY) \
+                    and state != previous["state"]:
+                label = "connected" if state == grpc.ChannelConnectivity.READY else "unreachable, reconnecting"
+                print(f"{'✅' if state == grpc.ChannelConnectivity.READY else '⚠️'} "
+                      f"Inventory channel {index} ({self.address}) {label}")
+            previous["state"] = state
+        return log
+
+    def stub(self):
+        with self._lock:
+            return self._stubs[next(self._next)]
+
+    def reserve_items(self, request):
+        return self.stub().ReserveItems(request, timeout=INVENTORY_RPC_TIMEOUT, wait_for_ready=True)
+
+    def reserve_items_batch(self, request):
+        return self.stub().ReserveItemsBatch(request, timeout=INVENTORY_BATCH_TIMEOUT, wait_for_ready=True)
+
+    def release_items(self, request):
+        return self.stub().ReleaseItems(request, timeout=INVENTORY_RPC_TIMEOUT, wait_for_ready=True)
+
+    def close(self):
+        for channel in self._channels:
+            channel.close()
+
+
+def parse_order(order):
+    """
+    (cafe_id, [(item_id, quantité)]) d'une commande de CreateOrders.
+    Lève ValueError sur un identifiant invalide, une quantité négative ou nulle,
+    une clé d'idempotence trop longue.
+    """
+    cafe_id = int(order.cafe_id)
+    check_key(order.idempotency_key)
+    if not order.items:
+        raise ValueError("order has no items")
+    lines = []
+    for item in order.items:
+        item_id = int(item.item_id)
+        if item.quantity <= 0:
+            raise ValueError(f"invalid quantity {item.quantity} for item {item_id}")
+        lines.append((item_id, item.quantity))
+    return cafe_id, lines
+
+
+def micro_batches(iterator, max_size, max_delay):
+    """
+    Regroupe les éléments d'un flux entrant en listes d'au plus max_size
+    éléments ; un lot part au plus max_delay secondes après son premier élément.
+    Le flux est lu par un thread dédié, borné par une file : quand les lots
+    n'avancent pas, la lecture s'arrête et le contrôle de flux HTTP/2 ralentit
+    le client.
+    """
+    buffer = queue.Queue(maxsize=max_size * 2)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            # Flux annulé par le client ou coupé
+            print(f"⚠️ Order stream closed: {e}")
+        finally:
+            put(end)
+
+    threading.Thread(target=read, name="order-stream-reader", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is end:
+                return
+            batch = [item]
+            deadline = time.monotonic() + max_delay
+            while len(batch) < max_size:
+                try:
+                    item = buffer.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is end:
+                    yield batch
+                    return
+                batch.append(item)
+            yield batch
+    finally:
+        stop.set()
+
+
+def date_range(column, from_date, to_date):
+    """
+    Conditions SQL (et paramètres) limitant `column` aux jours from_date..to_date
+    inclus (YYYY-MM-DD, chacun optionnel) ; ValueError sur une date invalide.
+    """
+    conditions, params = [], []
+    if from_date:
+        conditions.append(f"{column} >= %s")
+        params.append(datetime.strptime(from_date, "%Y-%m-%d"))
+    if to_date:
+        conditions.append(f"{column} < %s")
+        params.append(datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1))
+    return conditions, params
+
+
+def encode_cursor(created_at, order_id):
+    """Curseur opaque de pagination : position (created_at, order_id) de la dernière commande lue."""
+    return base64.urlsafe_b64encode(f"{created_at}|{order_id}".encode()).decode()
+
+
+def decode_cursor(value):
+    """(created_at, order_id) d'un curseur ; ValueError s'il est invalide."""
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(value.encode()).decode().rsplit("|", 1)
+        return created_at, int(order_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid cursor {value!r}") from e
+
+
+# Commande validée par _prepare_order, en attente de sa réservation de stock
+PreparedOrder = namedtuple("PreparedOrder", "cafe_id key lines total_price reservation_id")
+
+
+def reserve_request(prepared):
+    """ReserveItemsRequest d'une commande préparée."""
+    request = inventory_pb2.ReserveItemsRequest(
+        cafe_id=str(prepared.cafe_id), reservation_id=prepared.reservation_id, new_reservation=True
+    )
+    for item_id, quantity, _ in prepared.lines:
+        request.items.add(item_id=str(item_id), quantity=quantity)
+    return request
+
+
+def failure(message):
+    return order_pb2.CreateOrderResponse(success=False, message=message)
+
+
+def reply(context, response, code=None):
+    """Renvoie `response`, avec le code d'erreur gRPC `code` s'il y en a un."""
+    if code is not None:
+        context.set_code(code)
+        context.set_details(response.message)
+    return response
+
+
+class OrderBatchError(Exception):
+    """Échec d'un lot entier de commandes, avec le code gRPC à renvoyer."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
 class OrderServiceServicer(order_pb2_grpc.OrderServiceServicer):
-    def __init__(self):
-        self.conn = get_connection()
-        if not self.conn:
-            raise Exception("Database connection not available")
-    
+    def __init__(self, inventory=None):
+        self.inventory = inventory or InventoryChannelPool()
+        self.compensator = Compensator(self.inventory).start()
+        self.outbox = OutboxRelay().start()
+        self.recent = RecentOrders()
+        self.ids = IdGenerator()
+        self.admission = AdmissionControl()
+        self.menu = MenuPrices()
+        self.menu.warm()
+
+    def _recent_order(self, cafe_id, key):
+        """Réponse d'une commande récente avec cette clé (mémoire seulement, sans connexion), ou None."""
+        original = self.recent.get(cafe_id, key)
+        return None if original is None else self._already_created(*original)
+
+    def _original_order(self, cursor, cafe_id, key):
+        """Réponse de la commande déjà créée avec cette clé d'idempotence, ou None."""
+        original = self.recent.get(cafe_id, key)
+        if original is None:
+            original = find_orders(cursor, [(cafe_id, key)]).get((cafe_id, key))
+            if original is None:
+                return None
+            self.recent.put(cafe_id, key, *original)
+        return self._already_created(*original)
+
+    @staticmethod
+    def _already_created(order_id, total_price):
+        return order_pb2.CreateOrderResponse(
+            success=True,
+            message="Order already created",
+            order_id=str(order_id),
+            total_price=total_price
+        )
+
     def CreateOrder(self, request, context):
         """
-        Crée une commande avec ses items
-        1. Crée la commande dans orders
-        2. Crée les order_items
-        3. Met à jour l'inventaire via Inventory Service
-        4. Envoie les logs vers Analytics (insertion dans analytics_logs)
+        Crée une commande avec ses items (saga, voir compensation.py)
+        0. Journalise la réservation à venir (pending_compensations)
+        1. Réserve le stock via Inventory Service (ReserveItems, tout ou rien)
+        2. Crée la commande dans orders
+        3. Crée les order_items
+        4. Écrit un événement dans l'outbox order_events (voir outbox.py)
+        Le stock est décrémenté avant d'ouvrir la transaction locale, pour ne
+        pas garder de verrous en écriture pendant les appels gRPC, et aucune
+        connexion n'est gardée pendant l'appel (_prepare_order / _commit_order,
+        partagés avec le serveur asyncio, voir aio_app.py). Si la commande
+        échoue ensuite, le stock est rendu en tâche de fond.
+        Avec une idempotency_key, un nouvel essai renvoie la commande déjà
+        créée (voir idempotency.py). Les prix viennent du menu (menu_prices.py),
+        pas de la requête. Un café qui a déjà trop de commandes en cours est
+        refusé en RESOURCE_EXHAUSTED (admission.py).
         """
         try:
-            cursor = self.conn.cursor()
-            cafe_id = int(request.cafe_id)
-            total_price = sum(item.price * item.quantity for item in request.items)
-            
-            # 1. Créer la commande
+            with self.admission.slot(request.cafe_id):
+                return self._create_order(request, context)
+        except Overloaded as e:
+            reject(context, e)
+            return failure(str(e))
+
+    def _create_order(self, request, context):
+        prepared, response, code = self._prepare_order(request)
+        if prepared is None:
+            return reply(context, response, code)
+        try:
+            inventory_response = self.inventory.reserve_items(reserve_request(prepared))
+        except Exception as e:
+            return reply(context, *self._reservation_failed(prepared, e))
+        return reply(context, *self._commit_order(prepared, inventory_response))
+
+    def _prepare_order(self, request):
+        """
+        CreateOrder avant l'appel à l'inventaire : validation, clé d'idempotence,
+        prix du menu et journal de saga (étape 0, validé).
+        Retourne (PreparedOrder, None, None), ou (None, réponse, code gRPC)
+        quand la commande s'arrête là.
+        """
+        key = request.idempotency_key
+        try:
+            # Mêmes règles que les commandes de CreateOrders (pas de commande vide)
+            cafe_id, lines = parse_order(request)
+        except ValueError as e:
+            return None, failure(f"Invalid order: {str(e)}"), grpc.StatusCode.INVALID_ARGUMENT
+
+        # Nouvel essai d'une commande récente : réponse sans prendre de connexion au pool
+        if key:
+            original = self._recent_order(cafe_id, key)
+            if original is not None:
+                return None, original, None
+
+        conn = get_connection()
+        if conn is None:
+            return None, failure("Database unavailable"), grpc.StatusCode.UNAVAILABLE
+
+        cursor = conn.cursor()
+        try:
+            # Nouvel essai d'une commande déjà créée : rien à refaire
+            if key:
+                original = self._original_order(cursor, cafe_id, key)
+                if original is not None:
+                    return None, original, None
+
+            # Prix du menu : [(item_id, quantité, prix)]
+            try:
+                lines = price_lines(lines, self.menu.prices(conn))
+            except ValueError as e:
+                return None, failure(f"Invalid order: {str(e)}"), grpc.StatusCode.INVALID_ARGUMENT
+
+            # 0. Journal de saga, validé avant de toucher au stock
+            reservation_id = uuid.uuid4().hex
+            record_pending(conn, reservation_id, cafe_id, [(item_id, quantity) for item_id, quantity, _ in lines])
+            return PreparedOrder(cafe_id, key, lines, order_total(lines), reservation_id), None, None
+
+        except Exception as e:
+            conn.rollback()
+            return None, failure(f"Error creating order: {str(e)}"), grpc.StatusCode.INTERNAL
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _reservation_failed(self, prepared, error):
+        """L'appel ReserveItems a échoué : issue inconnue, la réservation est compensée."""
+        print(f"Error updating inventory: {error}")
+        self.compensator.trigger(prepared.reservation_id)
+        return failure(f"Error updating inventory: {str(error)}"), grpc.StatusCode.INTERNAL
+
+    def _commit_order(self, prepared, inventory_response):
+        """
+        CreateOrder après ReserveItems : étapes 2 à 4 dans une transaction,
+        ou abandon en cas de rupture. Retourne (réponse, code gRPC ou None).
+        """
+        conn = get_connection()
+        if conn is None:
+            self.compensator.trigger(prepared.reservation_id)
+            return failure("Database unavailable"), grpc.StatusCode.UNAVAILABLE
+
+        cursor = conn.cursor()
+        reserved = True
+        try:
+            if not inventory_response.success:
+                reserved = False
+                forget_pending(conn, prepared.reservation_id)
+                return failure(inventory_response.message), grpc.StatusCode.FAILED_PRECONDITION
+
+            # 2. Créer la commande
             insert_order_query = """
-                INSERT INTO orders (cafe_id, total_price, created_at)
-                VALUES (%s, %s, %s)
+                INSERT INTO orders (order_id, cafe_id, total_price, created_at, idempotency_key)
+                VALUES (%s, %s, %s, %s, %s)
             """
+            order_id = self.ids.next_id()
             created_at = datetime.now()
-            cursor.execute(insert_order_query, (cafe_id, total_price, created_at))
-            order_id = cursor.lastrowid
-            
-            # 2. Créer les order_items et mettre à jour l'inventaire
-            inventory_channel = grpc.insecure_channel('inventory_service:5006')
-            inventory_stub = inventory_pb2_grpc.InventoryServiceStub(inventory_channel)
-            
-            for item in request.items:
-                item_id = int(item.item_id)
-                quantity = item.quantity
-                price = item.price
-                
-                # Insérer order_item
-                insert_item_query = """
-                    INSERT INTO order_items (order_id, item_id, quantity, price)
-                    VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(insert_item_query, (order_id, item_id, quantity, price))
-                
-                # 3. Mettre à jour l'inventaire via gRPC
-                try:
-                    update_request = inventory_pb2.UpdateInventoryRequest(
-                        item_id=str(item_id),
-                        cafe_id=str(cafe_id),
-                        quantity_ordered=quantity
-                    )
-                    inventory_response = inventory_stub.UpdateInventoryAfterOrder(update_request)
-                    
-                    if not inventory_response.success:
-                        # Rollback si stock insuffisant
-                        self.conn.rollback()
-                        inventory_channel.close()
-                        context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
-                        context.set_details(f"Insufficient stock for item {item_id}")
-                        return order_pb2.CreateOrderResponse(
-                            success=False,
-                            message=f"Insufficient stock for item {item_id}"
-                        )
-                except Exception as e:
-                    print(f"Error updating inventory: {e}")
-                    self.conn.rollback()
-                    inventory_channel.close()
-                    context.set_code(grpc.StatusCode.INTERNAL)
-                    context.set_details(f"Error updating inventory: {str(e)}")
-                    return order_pb2.CreateOrderResponse(
-                        success=False,
-                        message=f"Error updating inventory: {str(e)}"
-                    )
-                
-                # 4. Envoyer les logs vers Analytics (insertion dans analytics_logs)
-                try:
-                    insert_analytics_query = """
-                        INSERT INTO analytics_logs (order_id, cafe_id, item_id, quantity, total_price, timestamp)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    item_total = price * quantity
-                    cursor.execute(insert_analytics_query, (
-                        order_id, cafe_id, item_id, quantity, item_total, created_at
-                    ))
-                except Exception as e:
-                    print(f"Warning: Could not insert analytics log: {e}")
-                    # Continue even if analytics log fails
-            
-            inventory_channel.close()
-            self.conn.commit()
-            cursor.close()
-            
+            cursor.execute(
+                insert_order_query,
+                (order_id, prepared.cafe_id, prepared.total_price, created_at, prepared.key or None)
+            )
+
+            # 3. Insérer les order_items (un seul INSERT multi-lignes)
+            bulk_insert(
+                cursor, "order_items", ORDER_ITEM_COLUMNS,
+                [(item_id, order_id) + line
+                 for item_id, line in zip(self.ids.next_ids(len(prepared.lines)), prepared.lines)]
+            )
+
+            # 4. Événement pour Analytics (outbox, relayé vers analytics_logs en tâche de fond)
+            record_order_event(cursor, order_id, prepared.cafe_id, created_at, prepared.lines)
+
+            # Fin de la saga, dans la même transaction que la commande
+            if not complete_pending(cursor, prepared.reservation_id):
+                raise RuntimeError("stock reservation was already released")
+            conn.commit()
+            reserved = False
+            self.outbox.notify()
+            if prepared.key:
+                self.recent.put(prepared.cafe_id, prepared.key, order_id, prepared.total_price)
+
             return order_pb2.CreateOrderResponse(
                 success=True,
                 message="Order created successfully",
                 order_id=str(order_id),
-                total_price=total_price
-            )
-            
+                total_price=prepared.total_price
+            ), None
+
         except Exception as e:
-            self.conn.rollback()
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details(f"Error creating order: {str(e)}")
-            return order_pb2.CreateOrderResponse(
-                success=False,
-                message=f"Error creating order: {str(e)}"
+            conn.rollback()
+            if reserved:
+                self.compensator.trigger(prepared.reservation_id)
+                # Essai concurrent avec la même clé (index unique) : la commande de l'autre essai
+                if prepared.key:
+                    try:
+                        original = self._original_order(cursor, prepared.cafe_id, prepared.key)
+                        if original is not None:
+                            return original, None
+                    except Exception:
+                        pass
+            return failure(f"Error creating order: {str(e)}"), grpc.StatusCode.INTERNAL
+        finally:
+            cursor.close()
+            conn.close()
+
+    def CreateOrders(self, request, context):
+        """
+        Crée un lot de commandes (synchronisation d'une caisse hors ligne)
+        Une commande invalide ou en rupture de stock n'empêche pas les autres :
+        chaque commande a son résultat, dans l'ordre de la requête.
+        """
+        if len(request.orders) > ORDER_BULK_MAX:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"At most {ORDER_BULK_MAX} orders per call")
+            return order_pb2.CreateOrdersResponse()
+
+        try:
+            results = self._create_batch(request.orders)
+        except OrderBatchError as e:
+            context.set_code(e.code)
+            context.set_details(str(e))
+            return order_pb2.CreateOrdersResponse()
+
+        response = order_pb2.CreateOrdersResponse(results=results)
+        response.created = sum(1 for result in results if result.success)
+        response.failed = len(results) - response.created
+        return response
+
+    def StreamOrders(self, request_iterator, context):
+        """
+        Flux de commandes d'une caisse (bidirectionnel) : les commandes reçues
+        sont regroupées en micro-lots (ORDER_STREAM_BATCH commandes au plus,
+        ORDER_STREAM_MAX_DELAY_MS d'attente au plus après la première) validés
+        ensemble par _create_batch (group commit). Une réponse par commande,
+        dans l'ordre d'arrivée ; un lot en échec est acquitté en échec sans
+        fermer le flux.
+        """
+        for batch in micro_batches(request_iterator, ORDER_STREAM_BATCH, ORDER_STREAM_MAX_DELAY_MS / 1000):
+            try:
+                results = self._create_batch(batch)
+            except OrderBatchError as e:
+                results = [order_pb2.CreateOrderResponse(success=False, message=str(e)) for _ in batch]
+            for result in results:
+                yield result
+
+    def _create_batch(self, orders):
+        """
+        Crée un lot de commandes, avec la même saga que CreateOrder :
+        0. Un INSERT multi-lignes dans pending_compensations
+        1. Un seul appel ReserveItemsBatch (chaque commande reste tout ou rien)
+        2-4. Une transaction : orders, order_items et order_events en INSERT
+             multi-lignes, quel que soit le nombre de commandes
+        Les commandes dont la clé d'idempotence est connue renvoient la
+        commande déjà créée ; une clé répétée dans le lot reçoit le résultat
+        de sa première occurrence.
+        Retourne un CreateOrderResponse par commande ; lève OrderBatchError si
+        tout le lot échoue (base indisponible, erreur de l'inventaire).
+        """
+        results = []
+        pending = []  # (résultat, reservation_id, cafe_id, lines, commande)
+        first_by_key = {}  # (cafe_id, clé) -> résultat de la première occurrence
+        repeats = []  # (résultat, résultat de la première occurrence)
+        for order in orders:
+            result = order_pb2.CreateOrderResponse()
+            results.append(result)
+            try:
+                cafe_id, lines = parse_order(order)
+            except ValueError as e:
+                result.success, result.message = False, f"Invalid order: {e}"
+                continue
+            if order.idempotency_key:
+                first = first_by_key.setdefault((cafe_id, order.idempotency_key), result)
+                if first is not result:
+                    repeats.append((result, first))
+                    continue
+                original = self.recent.get(cafe_id, order.idempotency_key)
+                if original is not None:
+                    result.success, result.message = True, "Order already created"
+                    result.order_id, result.total_price = str(original[0]), original[1]
+                    continue
+            pending.append((result, uuid.uuid4().hex, cafe_id, lines, order))
+
+        try:
+            return self._create_pending(pending, results)
+        finally:
+            for result, first in repeats:
+                result.CopyFrom(first)
+
+    def _create_pending(self, pending, results):
+        """Saga de _create_batch pour les commandes à créer ; remplit leurs résultats."""
+        if not pending:
+            return results
+
+        conn = get_connection()
+        if conn is None:
+            raise OrderBatchError(grpc.StatusCode.UNAVAILABLE, "Database unavailable")
+
+        cursor = conn.cursor()
+        reserved = []
+        try:
+            # Clés d'idempotence absentes du cache : commandes créées ailleurs ou plus tôt
+            keys = [(cafe_id, order.idempotency_key)
+                    for _, _, cafe_id, _, order in pending if order.idempotency_key]
+            if keys:
+                found = find_orders(cursor, keys)
+                remaining = []
+                for entry in pending:
+                    result, _, cafe_id, _, order = entry
+                    original = found.get((cafe_id, order.idempotency_key)) if order.idempotency_key else None
+                    if original is None:
+                        remaining.append(entry)
+                        continue
+                    self.recent.put(cafe_id, order.idempotency_key, *original)
+                    result.success, result.message = True, "Order already created"
+                    result.order_id, result.total_price = str(original[0]), original[1]
+                pending = remaining
+
+            # Prix du menu : lines devient [(item_id, quantité, prix)]
+            prices = self.menu.prices(conn)
+            priced = []
+            for result, rid, cafe_id, lines, order in pending:
+                try:
+                    priced.append((result, rid, cafe_id, price_lines(lines, prices), order))
+                except ValueError as e:
+                    result.success, result.message = False, f"Invalid order: {e}"
+            pending = priced
+            if not pending:
+                return results
+
+            # 0. Journal de saga de tout le lot, validé avant de toucher au stock
+            record_pending_many(conn, [
+                (rid, cafe_id, [(item_id, quantity) for item_id, quantity, _ in lines])
+                for _, rid, cafe_id, lines, _ in pending
+            ])
+
+            # 1. Réserver le stock de toutes les commandes en un seul appel gRPC
+            batch_request = inventory_pb2.ReserveItemsBatchRequest()
+            for _, rid, cafe_id, lines, _ in pending:
+                reservation = batch_request.reservations.add(
+                    cafe_id=str(cafe_id), reservation_id=rid, new_reservation=True
+                )
+                for item_id, quantity, _ in lines:
+                    reservation.items.add(item_id=str(item_id), quantity=quantity)
+            # Issue inconnue en cas d'erreur : tout le lot est à compenser
+            reserved = pending
+            batch_response = self.inventory.reserve_items_batch(batch_request)
+            if len(batch_response.results) != len(pending):
+                raise RuntimeError("inventory returned an incomplete reservation batch")
+
+            reserved, short = [], []
+            for entry, reservation in zip(pending, batch_response.results):
+                if reservation.success:
+                    reserved.append(entry)
+                else:
+                    entry[0].success, entry[0].message = False, reservation.message
+                    short.append(entry[1])
+            if short:
+                forget_pending(conn, *short)
+
+            if not reserved:
+                return results
+
+            # 2. Créer les commandes
+            created_at = datetime.now()
+            totals = [order_total(lines) for _, _, _, lines, _ in reserved]
+            order_ids = self.ids.next_ids(len(reserved))
+            bulk_insert(
+                cursor, "orders", ("order_id", "cafe_id", "total_price", "created_at", "idempotency_key"),
+                [(order_id, cafe_id, total, created_at, order.idempotency_key or None)
+                 for order_id, (_, _, cafe_id, _, order), total in zip(order_ids, reserved, totals)]
+            )
+
+            # 3. Tous les order_items du lot
+            item_rows = [(order_id,) + line for order_id, (_, _, _, lines, _) in zip(order_ids, reserved) for line in lines]
+            bulk_insert(
+                cursor, "order_items", ORDER_ITEM_COLUMNS,
+                [(item_id,) + row for item_id, row in zip(self.ids.next_ids(len(item_rows)), item_rows)]
             )
-    
+
+            # 4. Un événement par commande pour Analytics (outbox)
+            record_order_events(cursor, [
+                (order_id, cafe_id, created_at, lines)
+                for order_id, (_, _, cafe_id, lines, _) in zip(order_ids, reserved)
+            ])
+
+            # Fin de la saga, dans la même transaction que les commandes
+            if not complete_pending(cursor, *[rid for _, rid, _, _, _ in reserved]):
+                raise RuntimeError("stock reservation was already released")
+            conn.commit()
+            self.outbox.notify(len(reserved))
+
+            for (result, _, cafe_id, _, order), order_id, total in zip(reserved, order_ids, totals):
+                if order.idempotency_key:
+                    self.recent.put(cafe_id, order.idempotency_key, order_id, total)
+                result.success = True
+                result.message = "Order created successfully"
+                result.order_id = str(order_id)
+                result.total_price = total
+            return results
+
+        except Exception as e:
+            conn.rollback()
+            for _, rid, _, _, _ in reserved:
+                self.compensator.trigger(rid)
+            raise OrderBatchError(grpc.StatusCode.INTERNAL, f"Error creating orders: {str(e)}") from e
+        finally:
+            cursor.close()
+            conn.close()
+
     def GetOrdersByCafe(self, request, context):
-        """Récupère toutes les commandes d'un café"""
+        """
+        Récupère une page des commandes d'un café, des plus récentes aux plus
+        anciennes (pagination par clé : après le curseur (created_at, order_id)
+        de la page précédente, index idx_orders_cafe_created).
+        Deux requêtes par page quel que soit le nombre de commandes : la page
+        de commandes, puis tous leurs items en un seul IN (...).
+        """
+        conn = get_connection()
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return order_pb2.OrdersResponse()
+
+        cursor = conn.cursor(dictionary=True)
         try:
-            cursor = self.conn.cursor(dictionary=True)
             cafe_id = int(request.cafe_id)
-            
-            # Récupérer les commandes
-            orders_query = """
+            if request.page_size < 0:
+                raise ValueError(f"invalid page_size {request.page_size}")
+            page_size = min(request.page_size or ORDERS_PAGE_SIZE, ORDERS_MAX_PAGE_SIZE)
+
+            conditions, params = ["cafe_id = %s"], [cafe_id]
+            if request.cursor:
+                after_created_at, after_order_id = decode_cursor(request.cursor)
+                conditions.append("(created_at < %s OR (created_at = %s AND order_id < %s))")
+                params += [after_created_at, after_created_at, after_order_id]
+            range_conditions, range_params = date_range("created_at", request.from_date, request.to_date)
+            conditions += range_conditions
+            params += range_params
+
+            # Une commande de plus que la page : indique s'il reste une page suivante
+            cursor.execute(
+                f"""
                 SELECT order_id, cafe_id, total_price, created_at
                 FROM orders
-                WHERE cafe_id = %s
-                ORDER BY created_at DESC
-            """
-            cursor.execute(orders_query, (cafe_id,))
-            orders = cursor.fetchall()
-            
+                WHERE {' AND '.join(conditions)}
+                ORDER BY created_at DESC, order_id DESC
+                LIMIT %s
+                """,
+                params + [page_size + 1]
+            )
+            rows = cursor.fetchall()
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+
             response = order_pb2.OrdersResponse()
-            
-            for order_row in orders:
+            orders = {}
+            for row in rows:
                 order = response.orders.add()
-                order.order_id = str(order_row['order_id'])
-                order.cafe_id = str(order_row['cafe_id'])
-                order.total_price = float(order_row['total_price'])
-                order.created_at = str(order_row['created_at'])
-                
-                # Récupérer les items de la commande
-                items_query = """
-                    SELECT item_id, quantity, price
-                    FROM order_items
-                    WHERE order_id = %s
-                """
-                cursor.execute(items_query, (order_row['order_id'],))
-                items = cursor.fetchall()
-                
-                for item_row in items:
-                    item = order.items.add()
-                    item.item_id = str(item_row['item_id'])
-                    item.quantity = item_row['quantity']
-                    item.price = float(item_row['price'])
-            
-            cursor.close()
+                order.order_id = str(row['order_id'])
+                order.cafe_id = str(row['cafe_id'])
+                order.total_price = float(row['total_price'])
+                order.created_at = str(row['created_at'])
+                orders[row['order_id']] = order
+
+            if orders:
+                cursor.execute(
+                    "SELECT order_id, item_id, quantity, price FROM order_items "
+                    "WHERE order_id IN (" + ", ".join(["%s"] * len(orders)) + ") "
+                    "ORDER BY order_id",
+                    list(orders)
+                )
+                for row in cursor.fetchall():
+                    item = orders[row['order_id']].items.add()
+                    item.item_id = str(row['item_id'])
+                    item.quantity = row['quantity']
+                    item.price = float(row['price'])
+
+            if has_more:
+                last = rows[-1]
+                response.next_cursor = encode_cursor(last['created_at'], last['order_id'])
             return response
-            
+
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Invalid request: {str(e)}")
+            return order_pb2.OrdersResponse()
         except Exception as e:
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error fetching orders: {str(e)}")
             return order_pb2.OrdersResponse()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def ExportOrders(self, request, context):
+        """
+        Exporte tout l'historique d'un café (du plus ancien au plus récent),
+        en messages de chunk_size commandes. Les lignes sont lues en flux
+        (stream_rows, LEFT JOIN orders / order_items) et chaque tranche est
+        envoyée dès qu'elle est pleine : la mémoire reste bornée quelle que
+        soit la taille de l'historique. Lecture sur le réplica s'il existe.
+        """
+        try:
+            cafe_id = int(request.cafe_id)
+            if request.chunk_size < 0:
+                raise ValueError(f"invalid chunk_size {request.chunk_size}")
+            chunk_size = min(request.chunk_size or ORDERS_EXPORT_CHUNK, ORDERS_MAX_PAGE_SIZE)
+            conditions, params = date_range("o.created_at", request.from_date, request.to_date)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Invalid request: {str(e)}")
+            return
+
+        conn = get_connection(read_only=True)
+        if conn is None:
+            context.set_code(grpc.StatusCode.UNAVAILABLE)
+            context.set_details("Database unavailable")
+            return
+
+        query = f"""
+            SELECT o.order_id, o.cafe_id, o.total_price, o.created_at,
+                   oi.item_id, oi.quantity, oi.price
+            FROM orders o
+            LEFT JOIN order_items oi ON oi.order_id = o.order_id
+            WHERE {' AND '.join(["o.cafe_id = %s"] + conditions)}
+            ORDER BY o.created_at, o.order_id
+        """
+        rows = stream_rows(conn, query, [cafe_id] + params)
+        try:
+            chunk = order_pb2.OrdersResponse()
+            order = None
+            current_order_id = None
+            for row in rows:
+                # Les lignes d'une même commande arrivent consécutivement
+                if row['order_id'] != current_order_id:
+                    current_order_id = row['order_id']
+                    if len(chunk.orders) >= chunk_size:
+                        yield chunk
+                        chunk = order_pb2.OrdersResponse()
+                    order = chunk.orders.add()
+                    order.order_id = str(row['order_id'])
+                    order.cafe_id = str(row['cafe_id'])
+                    order.total_price = float(row['total_price'])
+                    order.created_at = str(row['created_at'])
+
+                # Commande sans items : LEFT JOIN -> colonnes NULL
+                if row['item_id'] is not None:
+                    item = order.items.add()
+                    item.item_id = str(row['item_id'])
+                    item.quantity = row['quantity']
+                    item.price = float(row['price'])
+
+            if chunk.orders:
+                yield chunk
+
+        except Exception as e:
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error exporting orders: {str(e)}")
+        finally:
+            rows.close()
+            conn.close()
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    order_pb2_grpc.add_OrderServiceServicer_to_server(OrderServiceServicer(), server)
+    executor = CountingExecutor(max_workers=ORDER_WORKERS)
+    servicer = OrderServiceServicer()
+    server = grpc.server(executor, interceptors=[QueueLimit(executor, servicer.admission)])
+    order_pb2_grpc.add_OrderServiceServicer_to_server(servicer, server)
     server.add_insecure_port('[::]:5002')
     server.start()
     print("✅ Order Service running on port 5002")
-    server.wait_for_termination()
+    try:
+        server.wait_for_termination()
+    finally:
+        servicer.compensator.stop()
+        servicer.outbox.stop()
+        servicer.inventory.close()
 
 if __name__ == '__main__':
-    serve()
\ No newline at end of file
+    if ORDER_SERVICE_ASYNC:
+        import asyncio
+        from aio_app import serve_aio
+        asyncio.run(serve_aio())
+    else:
+        serve()
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""
+Saga de CreateOrder : compensation des réservations de stock.
+
+1. record_pending() enregistre (et valide) l'intention dans pending_compensations
+   avant l'appel ReserveItems, avec une échéance à COMPENSATION_GRACE secondes.
+2. Si la commande est enregistrée, complete_pending() supprime la ligne dans
+   la même transaction que la commande.
+3. Sinon la ligne reste : le Compensator (thread de fond) appelle ReleaseItems
+   et la supprime une fois le stock rendu. Un échec connu est signalé avec
+   trigger() pour être traité tout de suite ; un crash du service est rattrapé
+   à l'échéance, au redémarrage si besoin.
+
+Le passage de la ligne en 'compensating' (claim) et sa suppression par la
+commande portent sur le même enregistrement : une commande ne peut donc pas
+être validée après que sa réservation a été rendue. ReleaseItems est
+idempotent, plusieurs instances du service peuvent tourner ensemble.
+"""
+import os
+import json
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from database.db_connection import get_connection, bulk_insert
+from shared_proto import inventory_pb2
+
+COMPENSATION_GRACE = float(os.getenv("COMPENSATION_GRACE", "30"))
+COMPENSATION_INTERVAL = float(os.getenv("COMPENSATION_INTERVAL", "5"))
+COMPENSATION_BATCH = int(os.getenv("COMPENSATION_BATCH", "50"))
+COMPENSATION_MAX_BACKOFF = float(os.getenv("COMPENSATION_MAX_BACKOFF", "300"))
+
+# NOT_RESERVED est définitif : l'inventaire enregistre la réservation comme annulée
+DONE_STATUSES = (inventory_pb2.RELEASED, inventory_pb2.ALREADY_RELEASED, inventory_pb2.NOT_RESERVED)
+
+
+def record_pending(conn, reservation_id, cafe_id, lines):
+    """Journalise une réservation à venir (lines : [(item_id, quantité)]) et valide."""
+    record_pending_many(conn, [(reservation_id, cafe_id, lines)])
+
+
+def record_pending_many(conn, reservations):
+    """record_pending() de plusieurs réservations [(reservation_id, cafe_id, lines)], en un INSERT."""
+    now = datetime.now()
+    deadline = now + timedelta(seconds=COMPENSATION_GRACE)
+    cursor = conn.cursor()
+    try:
+        bulk_insert(
+            cursor, "pending_compensations",
+            ("reservation_id", "cafe_id", "items", "status", "attempts", "created_at", "next_attempt_at"),
+            [(reservation_id, cafe_id, json.dumps(lines), "pending", 0, now, deadline)
+             for reservation_id, cafe_id, lines in reservations]
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def _in_list(values):
+    return "(" + ", ".join(["%s"] * len(values)) + ")"
+
+
+def complete_pending(cursor, *reservation_ids):
+    """
+    Dans la transaction de la commande : retire les lignes de saga.
+    False si le Compensator en a déjà pris une en charge (la commande doit échouer).
+    """
+    cursor.execute(
+        f"DELETE FROM pending_compensations WHERE reservation_id IN {_in_list(reservation_ids)} "
+        "AND status = 'pending'",
+        reservation_ids
+    )
+    return cursor.rowcount == len(reservation_ids)
+
+
+def forget_pending(conn, *reservation_ids):
+    """Rien n'a été réservé (rupture de stock) : les lignes de saga sont inutiles."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"DELETE FROM pending_compensations WHERE reservation_id IN {_in_list(reservation_ids)} "
+            "AND status = 'pending'",
+            reservation_ids
+        )
+        conn.commit()
+    except Exception as e:
+        # Sans gravité : le Compensator les traitera (NOT_RESERVED)
+        print(f"⚠️ Could not drop saga record(s) {', '.join(reservation_ids)}: {e}")
+        conn.rollback()
+    finally:
+        cursor.close()
+
+
+class Compensator:
+    """
+    Thread de fond qui rend le stock des réservations orphelines.
+    `inventory` fournit release_items(request) (InventoryChannelPool).
+    """
+
+    def __init__(self, inventory, interval=COMPENSATION_INTERVAL, batch=COMPENSATION_BATCH):
+        self.inventory = inventory
+        self.interval = interval
+        self.batch = batch
+        self._urgent = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="compensator", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self, reservation_id):
+        """Compenser au plus vite (sans bloquer le thread de la requête)."""
+        self._urgent.append(reservation_id)
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Compensation pass failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def run_once(self):
+        """Traite les compensations signalées puis celles arrivées à échéance."""
+        reservation_ids = []
+        while self._urgent:
+            reservation_ids.append(self._urgent.popleft())
+        reservation_ids.extend(self._due(self.batch))
+        for reservation_id in dict.fromkeys(reservation_ids):
+            self.compensate(reservation_id)
+        return len(reservation_ids)
+
+    def _due(self, limit):
+        conn = get_connection()
+        if conn is None:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT reservation_id FROM pending_compensations "
+                "WHERE next_attempt_at <= %s ORDER BY next_attempt_at LIMIT %s",
+                (datetime.now(), limit)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _claim(self, reservation_id):
+        """Passe la ligne en 'compensating' ; None si elle n'existe plus."""
+        conn = get_connection()
+        if conn is None:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE pending_compensations SET status = 'compensating', attempts = attempts + 1 "
+                "WHERE reservation_id = %s",
+                (reservation_id,)
+            )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return None
+            cursor.execute(
+                "SELECT cafe_id, items, attempts FROM pending_compensations WHERE reservation_id = %s",
+                (reservation_id,)
+            )
+            row = cursor.fetchone()
+            conn.commit()
+            return row
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _finish(self, reservation_id, attempts, error=None):
+        """Supprime la ligne, ou programme un nouvel essai avec backoff."""
+        conn = get_connection()
+        if conn is None:
+            return
+        cursor = conn.cursor()
+        try:
+            if error is None:
+                cursor.execute("DELETE FROM pending_compensations WHERE reservation_id = %s", (reservation_id,))
+            else:
+                delay = random.uniform(0, min(COMPENSATION_MAX_BACKOFF, self.interval * 2 ** attempts))
+                cursor.execute(
+                    "UPDATE pending_compensations SET last_error = %s, next_attempt_at = %s "
+                    "WHERE reservation_id = %s",
+                    (str(error)[:255], datetime.now() + timedelta(seconds=delay), reservation_id)
+                )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ Could not update saga record {reservation_id}: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+
+    def compensate(self, reservation_id):
+        row = self._claim(reservation_id)
+        if row is None:
+            return
+        cafe_id, items, attempts = row
+        request = inventory_pb2.ReleaseItemsRequest(reservation_id=reservation_id, cafe_id=str(cafe_id))
+        for item_id, quantity in json.loads(items):
+            request.items.add(item_id=str(item_id), quantity=quantity)
+        try:
+            response = self.inventory.release_items(request)
+        except Exception as e:
+            print(f"❌ Release of reservation {reservation_id} failed (attempt {attempts}): {e}")
+            self._finish(reservation_id, attempts, error=e)
+            return
+        if response.status in DONE_STATUSES:
+            print(f"↩️ Reservation {reservation_id} compensated "
+                  f"({inventory_pb2.ReleaseStatus.Name(response.status)})")
+            self._finish(reservation_id, attempts)
+        else:
+            self._finish(reservation_id, attempts, error=response.message or "release failed")
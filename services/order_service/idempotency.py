@@ -0,0 +1,75 @@
+"""
+Clés d'idempotence des commandes (CreateOrder, CreateOrders, StreamOrders).
+
+Une commande envoyée avec idempotency_key est enregistrée avec sa clé
+(index unique orders (cafe_id, idempotency_key), migration 005). Un nouvel
+essai avec la même clé renvoie la commande déjà créée au lieu d'en créer une
+seconde et de décrémenter le stock deux fois :
+- d'abord depuis RecentOrders, cache LRU en mémoire des dernières commandes
+  créées par ce processus (aucune requête SQL)
+- sinon par une lecture de l'index unique (commande créée par une autre
+  instance, ou sortie du cache)
+Deux essais simultanés : l'index unique fait échouer le second à l'INSERT,
+sa réservation est compensée et il renvoie la commande du premier.
+
+- IDEMPOTENCY_CACHE_SIZE : nombre de clés gardées en mémoire
+"""
+import os
+import threading
+from collections import OrderedDict
+
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+# Clés par requête de recherche (un OR par clé sur l'index unique)
+LOOKUP_CHUNK = 200
+
+
+def check_key(key):
+    """Lève ValueError si la clé ne tient pas dans la colonne."""
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValueError(f"idempotency_key longer than {IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+
+
+class RecentOrders:
+    """LRU (cafe_id, clé) -> (order_id, total_price) des commandes validées."""
+
+    def __init__(self, size=IDEMPOTENCY_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cafe_id, key):
+        with self._lock:
+            entry = self._entries.get((cafe_id, key))
+            if entry is not None:
+                self._entries.move_to_end((cafe_id, key))
+            return entry
+
+    def put(self, cafe_id, key, order_id, total_price):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[(cafe_id, key)] = (order_id, total_price)
+            self._entries.move_to_end((cafe_id, key))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+def find_orders(cursor, keys):
+    """
+    Commandes déjà créées pour des clés [(cafe_id, clé)] :
+    {(cafe_id, clé): (order_id, total_price)}.
+    """
+    found = {}
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[start:start + LOOKUP_CHUNK]
+        cursor.execute(
+            "SELECT cafe_id, idempotency_key, order_id, total_price FROM orders WHERE "
+            + " OR ".join(["(cafe_id = %s AND idempotency_key = %s)"] * len(chunk)),
+            [value for key in chunk for value in key]
+        )
+        for cafe_id, key, order_id, total_price in cursor.fetchall():
+            found[(cafe_id, key)] = (order_id, float(total_price))
+    return found
@@ -0,0 +1,64 @@
+"""
+Prix du menu pour Order Service.
+
+Le prix des lignes et le total d'une commande sont calculés ici à partir de
+menu_items : le prix envoyé par le client est ignoré. Les prix sont gardés
+dans un dict en mémoire, chargé au démarrage et rechargé (une requête) quand
+la version de menu_items change : Menu Service appelle touch_tables() à
+chaque modification (voir database/query_cache.py), le changement est vu ici
+au plus DB_CACHE_VERSION_TTL secondes plus tard. Sans table_versions, les
+prix sont relus à chaque commande.
+"""
+import threading
+
+from database.db_connection import get_connection, stream_rows, table_versions
+
+
+class MenuPrices:
+    """Prix {item_id: prix} du menu, invalidés par la version de menu_items."""
+
+    def __init__(self):
+        self._prices = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Chargement au démarrage ; sans base, le premier appel s'en charge."""
+        conn = get_connection()
+        if conn is None:
+            return
+        try:
+            print(f"✅ Menu prices loaded ({len(self.prices(conn))} items)")
+        except Exception as e:
+            print(f"⚠️ Could not load menu prices: {e}")
+        finally:
+            conn.close()
+
+    def prices(self, conn):
+        version = table_versions(conn, "menu_items")
+        with self._lock:
+            if version is not None and version == self._version:
+                return self._prices
+        # Version lue avant les prix : au pire un rechargement de trop
+        prices = {
+            item_id: float(price)
+            for item_id, price in stream_rows(conn, "SELECT item_id, price FROM menu_items", dictionary=False)
+        }
+        with self._lock:
+            self._prices, self._version = prices, version
+        return prices
+
+
+def price_lines(lines, prices):
+    """
+    [(item_id, quantité, prix du menu)] des lignes [(item_id, quantité)] ;
+    ValueError si un article n'est pas au menu.
+    """
+    unknown = [str(item_id) for item_id, _ in lines if item_id not in prices]
+    if unknown:
+        raise ValueError(f"unknown item(s) {', '.join(unknown)}")
+    return [(item_id, quantity, prices[item_id]) for item_id, quantity in lines]
+
+
+def order_total(lines):
+    return round(sum(quantity * price for _, quantity, price in lines), 2)
@@ -0,0 +1,146 @@
+"""
+Outbox des événements de commande vers analytics_logs.
+
+CreateOrder n'écrit plus une ligne analytics_logs par article : la transaction
+de la commande insère un seul événement compact dans order_events
+(record_order_event). L'OutboxRelay, thread de fond du service, lit les
+événements par lots, les transforme en lignes analytics_logs (INSERT
+multi-lignes) et les supprime, dans une même transaction : chaque événement
+est appliqué une fois et une seule.
+La même transaction ajoute les commandes au cumul journalier daily_sales
+(database/daily_sales.py), lu par les tableaux de bord d'Analytics.
+
+- ANALYTICS_BATCH_SIZE : événements par transaction du relais
+- ANALYTICS_FLUSH_INTERVAL : délai max (s) avant qu'une commande n'apparaisse
+  dans analytics_logs ; le relais est réveillé plus tôt quand un lot est plein
+
+Plusieurs instances peuvent relayer ensemble (FOR UPDATE SKIP LOCKED).
+"""
+import os
+import json
+import threading
+
+from database.db_connection import get_connection, bulk_insert
+from database.daily_sales import add_daily_sales
+
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1"))
+
+ANALYTICS_COLUMNS = ("order_id", "cafe_id", "item_id", "quantity", "total_price", "timestamp")
+
+
+def record_order_event(cursor, order_id, cafe_id, created_at, lines):
+    """
+    Dans la transaction de la commande : un événement pour toute la commande.
+    lines : [(item_id, quantité, prix unitaire)]
+    """
+    record_order_events(cursor, [(order_id, cafe_id, created_at, lines)])
+
+
+def record_order_events(cursor, events):
+    """Événements de plusieurs commandes [(order_id, cafe_id, created_at, lines)], en un INSERT."""
+    bulk_insert(
+        cursor, "order_events", ("order_id", "cafe_id", "items", "created_at"),
+        [(order_id, cafe_id, json.dumps(lines), created_at)
+         for order_id, cafe_id, created_at, lines in events]
+    )
+
+
+def analytics_rows(order_id, cafe_id, lines, created_at):
+    """Lignes analytics_logs d'un événement (une par article)."""
+    return [
+        (order_id, cafe_id, item_id, quantity, price * quantity, created_at)
+        for item_id, quantity, price in lines
+    ]
+
+
+class OutboxRelay:
+    """Thread de fond qui vide order_events dans analytics_logs."""
+
+    def __init__(self, batch_size=ANALYTICS_BATCH_SIZE, interval=ANALYTICS_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self, count=1):
+        """Des commandes viennent d'être validées : relayer dès qu'un lot est plein."""
+        with self._lock:
+            self._pending += count
+            full = self._pending >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                self._pending = 0
+            try:
+                # Tant que des lots complets sont lus, on continue sans attendre
+                while self.relay_batch() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"⚠️ Analytics relay failed: {e}")
+
+    def relay_batch(self):
+        """Relaye au plus batch_size événements ; retourne leur nombre."""
+        conn = get_connection()
+        if conn is None:
+            return 0
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT event_id, order_id, cafe_id, items, created_at FROM order_events "
+                "ORDER BY event_id LIMIT %s FOR UPDATE SKIP LOCKED",
+                (self.batch_size,)
+            )
+            events = cursor.fetchall()
+            if not events:
+                conn.rollback()
+                return 0
+
+            # Commandes supprimées entre-temps (DeleteCafe) : événement ignoré
+            order_ids = sorted({event[1] for event in events})
+            cursor.execute(
+                "SELECT order_id FROM orders WHERE order_id IN (" + ", ".join(["%s"] * len(order_ids)) + ")",
+                order_ids
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+
+            rows, sales = [], []
+            for _, order_id, cafe_id, items, created_at in events:
+                if order_id in existing:
+                    lines = json.loads(items)
+                    rows.extend(analytics_rows(order_id, cafe_id, lines, created_at))
+                    sales.append((cafe_id, created_at, lines))
+            bulk_insert(cursor, "analytics_logs", ANALYTICS_COLUMNS, rows)
+            add_daily_sales(cursor, sales)
+
+            event_ids = [event[0] for event in events]
+            cursor.execute(
+                "DELETE FROM order_events WHERE event_id IN (" + ", ".join(["%s"] * len(event_ids)) + ")",
+                event_ids
+            )
+            conn.commit()
+            return len(events)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
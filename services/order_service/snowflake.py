@@ -0,0 +1,93 @@
+"""
+Identifiants 64 bits des commandes et de leurs lignes (order_id, order_item_id).
+
+Les identifiants sont générés dans le service au lieu de l'AUTO_INCREMENT de
+MySQL : plus de verrou auto-inc entre les INSERT, pas besoin de lastrowid,
+et plusieurs instances (ou bases) peuvent écrire sans se marcher dessus.
+
+    | 41 bits : ms depuis ORDER_ID_EPOCH | 10 bits : worker | 12 bits : séquence |
+
+- triés par date de création (à la milliseconde près)
+- 4096 identifiants par milliseconde et par worker
+- ORDER_WORKER_ID (0-1023) doit être unique par instance du service. Sans
+  lui, l'identifiant est dérivé du nom d'hôte (crc32 sur 10 bits) : deux
+  répliques peuvent tomber sur le même (environ 1 chance sur 1024 pour deux,
+  bien plus avec beaucoup de répliques) et produire des order_id en double,
+  refusés par la clé primaire. Avec plusieurs répliques, fixer ORDER_WORKER_ID
+  pour chacune ; ORDER_WORKER_ID_REQUIRED=1 refuse alors de démarrer sans lui.
+  L'identifiant utilisé est affiché au démarrage.
+
+Si l'horloge recule (NTP), le générateur continue sur sa dernière
+milliseconde au lieu de la suivre : les identifiants restent croissants et
+uniques, et rejoignent l'horloge quand elle la dépasse à nouveau.
+"""
+import os
+import time
+import zlib
+import socket
+import threading
+
+# 2025-01-01 00:00:00 UTC, en millisecondes
+ORDER_ID_EPOCH = 1735689600000
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+ORDER_WORKER_ID_REQUIRED = os.getenv("ORDER_WORKER_ID_REQUIRED", "0") == "1"
+
+
+def default_worker_id():
+    value = os.getenv("ORDER_WORKER_ID")
+    if value is not None:
+        return int(value)
+    if ORDER_WORKER_ID_REQUIRED:
+        raise RuntimeError("ORDER_WORKER_ID must be set (ORDER_WORKER_ID_REQUIRED=1)")
+    worker_id = zlib.crc32(socket.gethostname().encode()) & MAX_WORKER_ID
+    print(f"⚠️ ORDER_WORKER_ID not set: worker id {worker_id} derived from the host name, "
+          f"replicas may collide and generate duplicate order ids")
+    return worker_id
+
+
+class IdGenerator:
+    """Générateur d'identifiants snowflake, partagé par les threads du service."""
+
+    def __init__(self, worker_id=None, clock=time.time):
+        worker_id = default_worker_id() if worker_id is None else worker_id
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        print(f"🆔 Order ids generated with worker id {worker_id}")
+        self._clock = clock
+        self._last = -1
+        self._sequence = 0
+        self._behind = False
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return int(self._clock() * 1000) - ORDER_ID_EPOCH
+
+    def _next(self):
+        now = self._now()
+        if now > self._last:
+            self._last, self._sequence, self._behind = now, 0, False
+        else:
+            if now < self._last - 1000 and not self._behind:
+                self._behind = True
+                print(f"⚠️ Clock moved back {self._last - now} ms, order ids keep counting from the last one")
+            if self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                # Séquence épuisée (ou horloge en retard) : milliseconde suivante
+                self._last, self._sequence = self._last + 1, 0
+        return (self._last << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self):
+        with self._lock:
+            return self._next()
+
+    def next_ids(self, count):
+        """`count` identifiants croissants, sous un seul verrou (INSERT par lots)."""
+        with self._lock:
+            return [self._next() for _ in range(count)]
@@ -24,27 +24,45 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finventory.proto\x12\tinventory\"\x07\n\x05\x45mpty\"T\n\x16UpdateInventoryRequest\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x18\n\x10quantity_ordered\x18\x03 \x01(\x05\"d\n\x12RestockItemRequest\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x16\n\x0equantity_added\x18\x03 \x01(\x05\x12\x14\n\x0crestock_date\x18\x04 \x01(\t\";\n\x17UpdateInventoryResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"7\n\x13RestockItemResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x9b\x01\n\rInventoryItem\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x11\n\titem_name\x18\x03 \x01(\t\x12\x11\n\tcafe_name\x18\x04 \x01(\t\x12\x16\n\x0estock_quantity\x18\x05 \x01(\x05\x12\x14\n\x0crestock_date\x18\x06 \x01(\t\x12\x14\n\x0cis_low_stock\x18\x07 \x01(\x08\"@\n\x15InventoryListResponse\x12\'\n\x05items\x18\x01 \x03(\x0b\x32\x18.inventory.InventoryItem2\x8e\x02\n\x10InventoryService\x12H\n\x12GetInventoryByCafe\x12\x10.inventory.Empty\x1a .inventory.InventoryListResponse\x12\x62\n\x19UpdateInventoryAfterOrder\x12!.inventory.UpdateInventoryRequest\x1a\".inventory.UpdateInventoryResponse\x12L\n\x0bRestockItem\x12\x1d.inventory.RestockItemRequest\x1a\x1e.inventory.RestockItemResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finventory.proto\x12\tinventory\"\x07\n\x05\x45mpty\"T\n\x16UpdateInventoryRequest\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x18\n\x10quantity_ordered\x18\x03 \x01(\x05\"d\n\x12RestockItemRequest\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x16\n\x0equantity_added\x18\x03 \x01(\x05\x12\x14\n\x0crestock_date\x18\x04 \x01(\t\"4\n\x0fReserveItemLine\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\"\x82\x01\n\x13ReserveItemsRequest\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x01 \x01(\t\x12)\n\x05items\x18\x02 \x03(\x0b\x32\x1a.inventory.ReserveItemLine\x12\x16\n\x0ereservation_id\x18\x03 \x01(\t\x12\x17\n\x0fnew_reservation\x18\x04 \x01(\x08\"P\n\x18ReserveItemsBatchRequest\x12\x34\n\x0creservations\x18\x01 \x03(\x0b\x32\x1e.inventory.ReserveItemsRequest\"i\n\x13ReleaseItemsRequest\x12\x16\n\x0ereservation_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12)\n\x05items\x18\x03 \x03(\x0b\x32\x1a.inventory.ReserveItemLine\";\n\x17UpdateInventoryResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"7\n\x13RestockItemResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"B\n\tShortItem\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x11\n\trequested\x18\x02 \x01(\x05\x12\x11\n\tavailable\x18\x03 \x01(\x05\"c\n\x14ReserveItemsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12)\n\x0bshort_items\x18\x03 \x03(\x0b\x32\x14.inventory.ShortItem\"M\n\x19ReserveItemsBatchResponse\x12\x30\n\x07results\x18\x01 \x03(\x0b\x32\x1f.inventory.ReserveItemsResponse\"b\n\x14ReleaseItemsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12(\n\x06status\x18\x03 \x01(\x0e\x32\x18.inventory.ReleaseStatus\"\x9b\x01\n\rInventoryItem\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x11\n\titem_name\x18\x03 \x01(\t\x12\x11\n\tcafe_name\x18\x04 \x01(\t\x12\x16\n\x0estock_quantity\x18\x05 \x01(\x05\x12\x14\n\x0crestock_date\x18\x06 \x01(\t\x12\x14\n\x0cis_low_stock\x18\x07 \x01(\x08\"@\n\x15InventoryListResponse\x12\'\n\x05items\x18\x01 \x03(\x0b\x32\x18.inventory.InventoryItem*e\n\rReleaseStatus\x12\x1e\n\x1aRELEASE_STATUS_UNSPECIFIED\x10\x00\x12\x0c\n\x08RELEASED\x10\x01\x12\x14\n\x10\x41LREADY_RELEASED\x10\x02\x12\x10\n\x0cNOT_RESERVED\x10\x03\x32\x90\x04\n\x10InventoryService\x12H\n\x12GetInventoryByCafe\x12\x10.inventory.Empty\x1a .inventory.InventoryListResponse\x12\x62\n\x19UpdateInventoryAfterOrder\x12!.inventory.UpdateInventoryRequest\x1a\".inventory.UpdateInventoryResponse\x12L\n\x0bRestockItem\x12\x1d.inventory.RestockItemRequest\x1a\x1e.inventory.RestockItemResponse\x12O\n\x0cReserveItems\x12\x1e.inventory.ReserveItemsRequest\x1a\x1f.inventory.ReserveItemsResponse\x12^\n\x11ReserveItemsBatch\x12#.inventory.ReserveItemsBatchRequest\x1a$.inventory.ReserveItemsBatchResponse\x12O\n\x0cReleaseItems\x12\x1e.inventory.ReleaseItemsRequest\x1a\x1f.inventory.ReleaseItemsResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'inventory_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_RELEASESTATUS']._serialized_start=1293
+  _globals['_RELEASESTATUS']._serialized_end=1394
   _globals['_EMPTY']._serialized_start=30
   _globals['_EMPTY']._serialized_end=37
   _globals['_UPDATEINVENTORYREQUEST']._serialized_start=39
   _globals['_UPDATEINVENTORYREQUEST']._serialized_end=123
   _globals['_RESTOCKITEMREQUEST']._serialized_start=125
   _globals['_RESTOCKITEMREQUEST']._serialized_end=225
-  _globals['_UPDATEINVENTORYRESPONSE']._serialized_start=227
-  _globals['_UPDATEINVENTORYRESPONSE']._serialized_end=286
-  _globals['_RESTOCKITEMRESPONSE']._serialized_start=288
-  _globals['_RESTOCKITEMRESPONSE']._serialized_end=343
-  _globals['_INVENTORYITEM']._serialized_start=346
-  _globals['_INVENTORYITEM']._serialized_end=501
-  _globals['_INVENTORYLISTRESPONSE']._serialized_start=503
-  _globals['_INVENTORYLISTRESPONSE']._serialized_end=567
-  _globals['_INVENTORYSERVICE']._serialized_start=570
-  _globals['_INVENTORYSERVICE']._serialized_end=840
+  _globals['_RESERVEITEMLINE']._serialized_start=227
+  _globals['_RESERVEITEMLINE']._serialized_end=279
+  _globals['_RESERVEITEMSREQUEST']._serialized_start=282
+  _globals['_RESERVEITEMSREQUEST']._serialized_end=412
+  _globals['_RESERVEITEMSBATCHREQUEST']._serialized_start=414
+  _globals['_RESERVEITEMSBATCHREQUEST']._serialized_end=494
+  _globals['_RELEASEITEMSREQUEST']._serialized_start=496
+  _globals['_RELEASEITEMSREQUEST']._serialized_end=601
+  _globals['_UPDATEINVENTORYRESPONSE']._serialized_start=603
+  _globals['_UPDATEINVENTORYRESPONSE']._serialized_end=662
+  _globals['_RESTOCKITEMRESPONSE']._serialized_start=664
+  _globals['_RESTOCKITEMRESPONSE']._serialized_end=719
+  _globals['_SHORTITEM']._serialized_start=721
+  _globals['_SHORTITEM']._serialized_end=787
+  _globals['_RESERVEITEMSRESPONSE']._serialized_start=789
+  _globals['_RESERVEITEMSRESPONSE']._serialized_end=888
+  _globals['_RESERVEITEMSBATCHRESPONSE']._serialized_start=890
+  _globals['_RESERVEITEMSBATCHRESPONSE']._serialized_end=967
+  _globals['_RELEASEITEMSRESPONSE']._serialized_start=969
+  _globals['_RELEASEITEMSRESPONSE']._serialized_end=1067
+  _globals['_INVENTORYITEM']._serialized_start=1070
+  _globals['_INVENTORYITEM']._serialized_end=1225
+  _globals['_INVENTORYLISTRESPONSE']._serialized_start=1227
+  _globals['_INVENTORYLISTRESPONSE']._serialized_end=1291
+  _globals['_INVENTORYSERVICE']._serialized_start=1397
+  _globals['_INVENTORYSERVICE']._serialized_end=1925
 # @@protoc_insertion_point(module_scope)
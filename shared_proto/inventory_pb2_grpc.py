@@ -50,6 +50,21 @@ class InventoryServiceStub(object):
                 request_serializer=inventory__pb2.RestockItemRequest.SerializeToString,
                 response_deserializer=inventory__pb2.RestockItemResponse.FromString,
                 _registered_method=True)
+        self.ReserveItems = channel.unary_unary(
+                '/inventory.InventoryService/ReserveItems',
+                request_serializer=inventory__pb2.ReserveItemsRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ReserveItemsResponse.FromString,
+                _registered_method=True)
+        self.ReserveItemsBatch = channel.unary_unary(
+                '/inventory.InventoryService/ReserveItemsBatch',
+                request_serializer=inventory__pb2.ReserveItemsBatchRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ReserveItemsBatchResponse.FromString,
+                _registered_method=True)
+        self.ReleaseItems = channel.unary_unary(
+                '/inventory.InventoryService/ReleaseItems',
+                request_serializer=inventory__pb2.ReleaseItemsRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ReleaseItemsResponse.FromString,
+                _registered_method=True)
 
 
 class InventoryServiceServicer(object):
@@ -77,6 +92,29 @@ class InventoryServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ReserveItems(self, request, context):
+        """Réserve le stock de toutes les lignes d'une commande en une transaction
+        (tout ou rien, appel interne par Order Service)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReserveItemsBatch(self, request, context):
+        """Réserve plusieurs commandes en une transaction, chacune tout ou rien
+        (synchronisation en masse, appel interne par Order Service)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReleaseItems(self, request, context):
+        """Annule une réservation (compensation d'une commande échouée), idempotent
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_InventoryServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -95,6 +133,21 @@ def add_InventoryServiceServicer_to_server(servicer, server):
                     request_deserializer=inventory__pb2.RestockItemRequest.FromString,
                     response_serializer=inventory__pb2.RestockItemResponse.SerializeToString,
             ),
+            'ReserveItems': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReserveItems,
+                    request_deserializer=inventory__pb2.ReserveItemsRequest.FromString,
+                    response_serializer=inventory__pb2.ReserveItemsResponse.SerializeToString,
+            ),
+            'ReserveItemsBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReserveItemsBatch,
+                    request_deserializer=inventory__pb2.ReserveItemsBatchRequest.FromString,
+                    response_serializer=inventory__pb2.ReserveItemsBatchResponse.SerializeToString,
+            ),
+            'ReleaseItems': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReleaseItems,
+                    request_deserializer=inventory__pb2.ReleaseItemsRequest.FromString,
+                    response_serializer=inventory__pb2.ReleaseItemsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'inventory.InventoryService', rpc_method_handlers)
@@ -187,3 +240,84 @@ class InventoryService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ReserveItems(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/ReserveItems',
+            inventory__pb2.ReserveItemsRequest.SerializeToString,
+            inventory__pb2.ReserveItemsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReserveItemsBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/ReserveItemsBatch',
+            inventory__pb2.ReserveItemsBatchRequest.SerializeToString,
+            inventory__pb2.ReserveItemsBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReleaseItems(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/ReleaseItems',
+            inventory__pb2.ReleaseItemsRequest.SerializeToString,
+            inventory__pb2.ReleaseItemsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0border.proto\x12\x05order\"F\n\x12\x43reateOrderRequest\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x01 \x01(\t\x12\x1f\n\x05items\x18\x02 \x03(\x0b\x32\x10.order.OrderItem\"=\n\tOrderItem\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\x12\r\n\x05price\x18\x03 \x01(\x01\"^\n\x13\x43reateOrderResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x10\n\x08order_id\x18\x03 \x01(\t\x12\x13\n\x0btotal_price\x18\x04 \x01(\x01\"#\n\x10GetOrdersRequest\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x01 \x01(\t\"t\n\x05Order\x12\x10\n\x08order_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x13\n\x0btotal_price\x18\x03 \x01(\x01\x12\x12\n\ncreated_at\x18\x04 \x01(\t\x12\x1f\n\x05items\x18\x05 \x03(\x0b\x32\x10.order.OrderItem\".\n\x0eOrdersResponse\x12\x1c\n\x06orders\x18\x01 \x03(\x0b\x32\x0c.order.Order2\x97\x01\n\x0cOrderService\x12\x44\n\x0b\x43reateOrder\x12\x19.order.CreateOrderRequest\x1a\x1a.order.CreateOrderResponse\x12\x41\n\x0fGetOrdersByCafe\x12\x17.order.GetOrdersRequest\x1a\x15.order.OrdersResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0border.proto\x12\x05order\"_\n\x12\x43reateOrderRequest\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x01 \x01(\t\x12\x1f\n\x05items\x18\x02 \x03(\x0b\x32\x10.order.OrderItem\x12\x17\n\x0fidempotency_key\x18\x03 \x01(\t\"=\n\tOrderItem\x12\x0f\n\x07item_id\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\x12\r\n\x05price\x18\x03 \x01(\x01\"^\n\x13\x43reateOrderResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x10\n\x08order_id\x18\x03 \x01(\t\x12\x13\n\x0btotal_price\x18\x04 \x01(\x01\"@\n\x13\x43reateOrdersRequest\x12)\n\x06orders\x18\x01 \x03(\x0b\x32\x19.order.CreateOrderRequest\"d\n\x14\x43reateOrdersResponse\x12+\n\x07results\x18\x01 \x03(\x0b\x32\x1a.order.CreateOrderResponse\x12\x0f\n\x07\x63reated\x18\x02 \x01(\x05\x12\x0e\n\x06\x66\x61iled\x18\x03 \x01(\x05\"j\n\x10GetOrdersRequest\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x01 \x01(\t\x12\x11\n\tpage_size\x18\x02 \x01(\x05\x12\x0e\n\x06\x63ursor\x18\x03 \x01(\t\x12\x11\n\tfrom_date\x18\x04 \x01(\t\x12\x0f\n\x07to_date\x18\x05 \x01(\t\"^\n\x13\x45xportOrdersRequest\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x01 \x01(\t\x12\x11\n\tfrom_date\x18\x02 \x01(\t\x12\x0f\n\x07to_date\x18\x03 \x01(\t\x12\x12\n\nchunk_size\x18\x04 \x01(\x05\"t\n\x05Order\x12\x10\n\x08order_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63\x61\x66\x65_id\x18\x02 \x01(\t\x12\x13\n\x0btotal_price\x18\x03 \x01(\x01\x12\x12\n\ncreated_at\x18\x04 \x01(\t\x12\x1f\n\x05items\x18\x05 \x03(\x0b\x32\x10.order.OrderItem\"C\n\x0eOrdersResponse\x12\x1c\n\x06orders\x18\x01 \x03(\x0b\x32\x0c.order.Order\x12\x13\n\x0bnext_cursor\x18\x02 \x01(\t2\xf0\x02\n\x0cOrderService\x12\x44\n\x0b\x43reateOrder\x12\x19.order.CreateOrderRequest\x1a\x1a.order.CreateOrderResponse\x12G\n\x0c\x43reateOrders\x12\x1a.order.CreateOrdersRequest\x1a\x1b.order.CreateOrdersResponse\x12I\n\x0cStreamOrders\x12\x19.order.CreateOrderRequest\x1a\x1a.order.CreateOrderResponse(\x01\x30\x01\x12\x41\n\x0fGetOrdersByCafe\x12\x17.order.GetOrdersRequest\x1a\x15.order.OrdersResponse\x12\x43\n\x0c\x45xportOrders\x12\x1a.order.ExportOrdersRequest\x1a\x15.order.OrdersResponse0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,17 +32,23 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'order_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_CREATEORDERREQUEST']._serialized_start=22
-  _globals['_CREATEORDERREQUEST']._serialized_end=92
-  _globals['_ORDERITEM']._serialized_start=94
-  _globals['_ORDERITEM']._serialized_end=155
-  _globals['_CREATEORDERRESPONSE']._serialized_start=157
-  _globals['_CREATEORDERRESPONSE']._serialized_end=251
-  _globals['_GETORDERSREQUEST']._serialized_start=253
-  _globals['_GETORDERSREQUEST']._serialized_end=288
-  _globals['_ORDER']._serialized_start=290
-  _globals['_ORDER']._serialized_end=406
-  _globals['_ORDERSRESPONSE']._serialized_start=408
-  _globals['_ORDERSRESPONSE']._serialized_end=454
-  _globals['_ORDERSERVICE']._serialized_start=457
-  _globals['_ORDERSERVICE']._serialized_end=608
+  _globals['_CREATEORDERREQUEST']._serialized_end=117
+  _globals['_ORDERITEM']._serialized_start=119
+  _globals['_ORDERITEM']._serialized_end=180
+  _globals['_CREATEORDERRESPONSE']._serialized_start=182
+  _globals['_CREATEORDERRESPONSE']._serialized_end=276
+  _globals['_CREATEORDERSREQUEST']._serialized_start=278
+  _globals['_CREATEORDERSREQUEST']._serialized_end=342
+  _globals['_CREATEORDERSRESPONSE']._serialized_start=344
+  _globals['_CREATEORDERSRESPONSE']._serialized_end=444
+  _globals['_GETORDERSREQUEST']._serialized_start=446
+  _globals['_GETORDERSREQUEST']._serialized_end=552
+  _globals['_EXPORTORDERSREQUEST']._serialized_start=554
+  _globals['_EXPORTORDERSREQUEST']._serialized_end=648
+  _globals['_ORDER']._serialized_start=650
+  _globals['_ORDER']._serialized_end=766
+  _globals['_ORDERSRESPONSE']._serialized_start=768
+  _globals['_ORDERSRESPONSE']._serialized_end=835
+  _globals['_ORDERSERVICE']._serialized_start=838
+  _globals['_ORDERSERVICE']._serialized_end=1206
 # @@protoc_insertion_point(module_scope)
@@ -39,11 +39,26 @@ class OrderServiceStub(object):
                 request_serializer=order__pb2.CreateOrderRequest.SerializeToString,
                 response_deserializer=order__pb2.CreateOrderResponse.FromString,
                 _registered_method=True)
+        self.CreateOrders = channel.unary_unary(
+                '/order.OrderService/CreateOrders',
+                request_serializer=order__pb2.CreateOrdersRequest.SerializeToString,
+                response_deserializer=order__pb2.CreateOrdersResponse.FromString,
+                _registered_method=True)
+        self.StreamOrders = channel.stream_stream(
+                '/order.OrderService/StreamOrders',
+                request_serializer=order__pb2.CreateOrderRequest.SerializeToString,
+                response_deserializer=order__pb2.CreateOrderResponse.FromString,
+                _registered_method=True)
         self.GetOrdersByCafe = channel.unary_unary(
                 '/order.OrderService/GetOrdersByCafe',
                 request_serializer=order__pb2.GetOrdersRequest.SerializeToString,
                 response_deserializer=order__pb2.OrdersResponse.FromString,
                 _registered_method=True)
+        self.ExportOrders = channel.unary_stream(
+                '/order.OrderService/ExportOrders',
+                request_serializer=order__pb2.ExportOrdersRequest.SerializeToString,
+                response_deserializer=order__pb2.OrdersResponse.FromString,
+                _registered_method=True)
 
 
 class OrderServiceServicer(object):
@@ -55,12 +70,34 @@ class OrderServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def CreateOrders(self, request, context):
+        """Synchronisation en masse (caisse hors ligne) : une réponse par commande
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamOrders(self, request_iterator, context):
+        """Flux continu d'une caisse : commandes validées par micro-lots,
+        une réponse par commande dans l'ordre d'envoi
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetOrdersByCafe(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ExportOrders(self, request, context):
+        """Historique complet d'un café (rapprochement), envoyé par tranches
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_OrderServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -69,11 +106,26 @@ def add_OrderServiceServicer_to_server(servicer, server):
                     request_deserializer=order__pb2.CreateOrderRequest.FromString,
                     response_serializer=order__pb2.CreateOrderResponse.SerializeToString,
             ),
+            'CreateOrders': grpc.unary_unary_rpc_method_handler(
+                    servicer.CreateOrders,
+                    request_deserializer=order__pb2.CreateOrdersRequest.FromString,
+                    response_serializer=order__pb2.CreateOrdersResponse.SerializeToString,
+            ),
+            'StreamOrders': grpc.stream_stream_rpc_method_handler(
+                    servicer.StreamOrders,
+                    request_deserializer=order__pb2.CreateOrderRequest.FromString,
+                    response_serializer=order__pb2.CreateOrderResponse.SerializeToString,
+            ),
             'GetOrdersByCafe': grpc.unary_unary_rpc_method_handler(
                     servicer.GetOrdersByCafe,
                     request_deserializer=order__pb2.GetOrdersRequest.FromString,
                     response_serializer=order__pb2.OrdersResponse.SerializeToString,
             ),
+            'ExportOrders': grpc.unary_stream_rpc_method_handler(
+                    servicer.ExportOrders,
+                    request_deserializer=order__pb2.ExportOrdersRequest.FromString,
+                    response_serializer=order__pb2.OrdersResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'order.OrderService', rpc_method_handlers)
@@ -112,6 +164,60 @@ class OrderService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def CreateOrders(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/order.OrderService/CreateOrders',
+            order__pb2.CreateOrdersRequest.SerializeToString,
+            order__pb2.CreateOrdersResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamOrders(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/order.OrderService/StreamOrders',
+            order__pb2.CreateOrderRequest.SerializeToString,
+            order__pb2.CreateOrderResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def GetOrdersByCafe(request,
             target,
@@ -138,3 +244,30 @@ class OrderService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ExportOrders(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/order.OrderService/ExportOrders',
+            order__pb2.ExportOrdersRequest.SerializeToString,
+            order__pb2.OrdersResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
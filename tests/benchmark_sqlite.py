@@ -0,0 +1,263 @@
+"""
+Repeatable throughput benchmark of the gRPC services on a single machine.
+
+Every service runs in this process on a fresh SQLite database seeded from
+database/init.sql (DB_BACKEND=sqlite), so no MySQL container is needed:
+
+    python tests/benchmark_sqlite.py [requests_per_service] [concurrency]
+"""
+import os
+import sys
+import time
+import random
+import string
+import tempfile
+import importlib.util
+from concurrent import futures
+
+import grpc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+DB_FILE = os.path.join(tempfile.mkdtemp(prefix="coffee_bench_"), "coffee.db")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["DB_SQLITE_PATH"] = DB_FILE
+# Throughput of a single cafe: no per-cafe admission limit
+os.environ.setdefault("ORDER_MAX_IN_FLIGHT_PER_CAFE", "0")
+
+from shared_proto import (
+    order_pb2, order_pb2_grpc,
+    cafe_pb2, cafe_pb2_grpc,
+    login_pb2, login_pb2_grpc,
+    menu_pb2, menu_pb2_grpc,
+    inventory_pb2, inventory_pb2_grpc
+)
+
+NUM_REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+TEST_CAFE_ID = 3
+TEST_ITEM_ID = 1
+TEST_ITEM_PRICE = 18.0
+TEST_USER_ACCESS = "AG123"
+MULTI_ITEM_IDS = (2, 3, 4, 5, 6, 7)
+BULK_ORDERS = 100
+
+
+# ----------------------
+# IN-PROCESS SERVICES
+# ----------------------
+def load_service(name):
+    """Import services/<name>/app.py under a unique module name."""
+    service_dir = os.path.join(BASE_DIR, "services", name)
+    sys.path.insert(0, service_dir)
+    spec = importlib.util.spec_from_file_location(f"{name}_app", os.path.join(service_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_server(add_servicer, servicer):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    add_servicer(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+# ----------------------
+# HELPERS
+# ----------------------
+def random_string(length=6):
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def run(name, address, stub_class, request_func):
+    channel = grpc.insecure_channel(address)
+    stub = stub_class(channel)
+
+    def timed_call(_):
+        start = time.perf_counter()
+        try:
+            request_func(stub)
+            ok = True
+        except grpc.RpcError:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(timed_call, range(NUM_REQUESTS)))
+    elapsed = time.perf_counter() - start
+    channel.close()
+
+    times = sorted(t for t, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    print(f"{name:<28} {NUM_REQUESTS / elapsed:>9.1f} req/s   "
+          f"avg {sum(times) / len(times) * 1000:7.2f} ms   "
+          f"p50 {times[len(times) // 2] * 1000:7.2f} ms   "
+          f"p95 {times[int(len(times) * 0.95) - 1] * 1000:7.2f} ms   "
+          f"errors {errors}")
+
+
+# ----------------------
+# REQUESTS
+# ----------------------
+def create_order(stub):
+    req = order_pb2.CreateOrderRequest(cafe_id=str(TEST_CAFE_ID))
+    item = req.items.add()
+    item.item_id = str(TEST_ITEM_ID)
+    item.quantity = 1
+    item.price = TEST_ITEM_PRICE
+    return stub.CreateOrder(req)
+
+
+def create_multi_item_order(stub):
+    req = order_pb2.CreateOrderRequest(cafe_id=str(TEST_CAFE_ID))
+    for item_id in MULTI_ITEM_IDS:
+        req.items.add(item_id=str(item_id), quantity=1, price=TEST_ITEM_PRICE)
+    return stub.CreateOrder(req)
+
+
+def create_order_batch(stub):
+    """One CreateOrders call carrying BULK_ORDERS multi-item orders."""
+    req = order_pb2.CreateOrdersRequest()
+    for _ in range(BULK_ORDERS):
+        order = req.orders.add(cafe_id=str(TEST_CAFE_ID))
+        for item_id in MULTI_ITEM_IDS:
+            order.items.add(item_id=str(item_id), quantity=1, price=TEST_ITEM_PRICE)
+    response = stub.CreateOrders(req)
+    assert response.created == BULK_ORDERS, response.results[0].message
+    return response
+
+
+def stream_orders(address, count):
+    """Sustained throughput of one StreamOrders stream carrying `count` multi-item orders."""
+    channel = grpc.insecure_channel(address)
+    stub = order_pb2_grpc.OrderServiceStub(channel)
+
+    def orders():
+        for _ in range(count):
+            order = order_pb2.CreateOrderRequest(cafe_id=str(TEST_CAFE_ID))
+            for item_id in MULTI_ITEM_IDS:
+                order.items.add(item_id=str(item_id), quantity=1, price=TEST_ITEM_PRICE)
+            yield order
+
+    start = time.perf_counter()
+    acked = sum(1 for response in stub.StreamOrders(orders()) if response.success)
+    elapsed = time.perf_counter() - start
+    channel.close()
+    print(f"{'order.StreamOrders (1 stream)':<28} {count / elapsed:>9.1f} orders/s   "
+          f"acked {acked}/{count}")
+
+
+def restock_for_orders(address, orders_per_request=1):
+    """Enough stock of MULTI_ITEM_IDS for every multi-item order of the run."""
+    channel = grpc.insecure_channel(address)
+    stub = inventory_pb2_grpc.InventoryServiceStub(channel)
+    for item_id in MULTI_ITEM_IDS:
+        stub.RestockItem(inventory_pb2.RestockItemRequest(
+            item_id=str(item_id), cafe_id=str(TEST_CAFE_ID),
+            quantity_added=NUM_REQUESTS * orders_per_request, restock_date="2025-11-01"
+        ))
+    channel.close()
+
+
+def restock(stub):
+    return stub.RestockItem(inventory_pb2.RestockItemRequest(
+        item_id=str(TEST_ITEM_ID), cafe_id=str(TEST_CAFE_ID),
+        quantity_added=1, restock_date="2025-11-01"
+    ))
+
+
+def create_cafe(stub):
+    return stub.CreateCafe(cafe_pb2.CafeCreateRequest(
+        nom="Bench Cafe", localisation="Bench", code_acces=random_string(10)
+    ))
+
+
+def cafe_creation_vs_menu_size(cafe_address, menu_address, extra_items=(0, 100, 500, 2000), runs=20):
+    """Average CreateCafe time while the menu (seeded into the new inventory) grows."""
+    cafe_channel = grpc.insecure_channel(cafe_address)
+    menu_channel = grpc.insecure_channel(menu_address)
+    cafe_stub = cafe_pb2_grpc.CafeServiceStub(cafe_channel)
+    menu_stub = menu_pb2_grpc.MenuServiceStub(menu_channel)
+    added = 0
+    for extra in extra_items:
+        while added < extra:
+            menu_stub.AddMenuItem(menu_pb2.MenuItemRequest(name=f"Bench {added}", category="Bench", price=1.0))
+            added += 1
+        menu_size = len(menu_stub.GetMenuItems(menu_pb2.Empty()).items)
+        start = time.perf_counter()
+        for _ in range(runs):
+            create_cafe(cafe_stub)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"cafe.CreateCafe, menu of {menu_size:>5} items   avg {elapsed * 1000:7.2f} ms")
+    cafe_channel.close()
+    menu_channel.close()
+
+
+# ----------------------
+# MAIN
+# ----------------------
+if __name__ == "__main__":
+    print(f"SQLite benchmark: {NUM_REQUESTS} requests per RPC, concurrency {CONCURRENCY}")
+    print(f"Database: {DB_FILE}\n")
+
+    inventory_app = load_service("inventory_service")
+    inv_server, inv_addr = start_server(
+        inventory_pb2_grpc.add_InventoryServiceServicer_to_server,
+        inventory_app.InventoryServiceServicer()
+    )
+    os.environ["INVENTORY_SERVICE_ADDRESS"] = inv_addr
+
+    order_app = load_service("order_service")
+    order_server, order_addr = start_server(
+        order_pb2_grpc.add_OrderServiceServicer_to_server, order_app.OrderServiceServicer()
+    )
+    menu_app = load_service("menu_service")
+    menu_server, menu_addr = start_server(
+        menu_pb2_grpc.add_MenuServiceServicer_to_server, menu_app.MenuService()
+    )
+    cafe_app = load_service("cafe_service")
+    cafe_server, cafe_addr = start_server(
+        cafe_pb2_grpc.add_CafeServiceServicer_to_server, cafe_app.CafeService()
+    )
+    login_app = load_service("login_service")
+    login_server, login_addr = start_server(
+        login_pb2_grpc.add_LoginServiceServicer_to_server, login_app.LoginServicer()
+    )
+
+    run("inventory.RestockItem", inv_addr, inventory_pb2_grpc.InventoryServiceStub, restock)
+    run("inventory.GetInventory", inv_addr, inventory_pb2_grpc.InventoryServiceStub,
+        lambda stub: stub.GetInventoryByCafe(inventory_pb2.Empty()))
+    run("order.CreateOrder", order_addr, order_pb2_grpc.OrderServiceStub, create_order)
+    restock_for_orders(inv_addr)
+    run("order.CreateOrder (6 items)", order_addr, order_pb2_grpc.OrderServiceStub, create_multi_item_order)
+    restock_for_orders(inv_addr, BULK_ORDERS)
+    run(f"order.CreateOrders ({BULK_ORDERS} orders)", order_addr, order_pb2_grpc.OrderServiceStub,
+        create_order_batch)
+    restock_for_orders(inv_addr, BULK_ORDERS)
+    stream_orders(order_addr, NUM_REQUESTS * BULK_ORDERS)
+    run("order.GetOrdersByCafe", order_addr, order_pb2_grpc.OrderServiceStub,
+        lambda stub: stub.GetOrdersByCafe(order_pb2.GetOrdersRequest(cafe_id=str(TEST_CAFE_ID))))
+    run("menu.GetMenuItems", menu_addr, menu_pb2_grpc.MenuServiceStub,
+        lambda stub: stub.GetMenuItems(menu_pb2.Empty()))
+    run("cafe.CreateCafe", cafe_addr, cafe_pb2_grpc.CafeServiceStub, create_cafe)
+    run("cafe.GetAllCafes", cafe_addr, cafe_pb2_grpc.CafeServiceStub,
+        lambda stub: stub.GetAllCafes(cafe_pb2.Empty()))
+    run("login.AuthenticateCafe", login_addr, login_pb2_grpc.LoginServiceStub,
+        lambda stub: stub.AuthenticateCafe(
+            login_pb2.LoginRequest(cafe_id=TEST_CAFE_ID, access_code=TEST_USER_ACCESS)))
+
+    print()
+    cafe_creation_vs_menu_size(cafe_addr, menu_addr)
+
+    for server in (inv_server, order_server, menu_server, cafe_server, login_server):
+        server.stop(0)
+
+    from database.query_stats import query_report
+    print()
+    print(query_report())
+    print("\nBenchmark completed!")
@@ -242,6 +242,39 @@ def test_grpc_order_service_with_restock(order_stub, inventory_stub):
             print(f"Request {i+1}: {e.code()} - {e.details()}")
     print_stats("gRPC Order with Auto-Restock", response_times)
 
+def test_cafe_creation_vs_menu_size(cafe_stub, menu_stub, extra_items=(0, 100, 500), runs=5):
+    """
+    CreateCafe seeds one inventory row per menu item: time it while the menu
+    grows. With the INSERT ... SELECT seeding the time should stay flat.
+    The menu items and cafes created here are deleted at the end.
+    """
+    print("\n--- gRPC CreateCafe vs menu size ---")
+    added_items, created_cafes = [], []
+    try:
+        for extra in extra_items:
+            while len(added_items) < extra:
+                res = menu_stub.AddMenuItem(menu_pb2.MenuItemRequest(
+                    name=f"Perf Item {random_string()}", category="Perf", price=1.0
+                ))
+                added_items.append(res.id)
+            menu_size = len(menu_stub.GetMenuItems(menu_pb2.Empty()).items)
+
+            times = []
+            for _ in range(runs):
+                start_time = time.time()
+                res = grpc_cafe(cafe_stub)
+                times.append(time.time() - start_time)
+                if res.success:
+                    created_cafes.append(res.id)
+            print(f"Menu size {menu_size:>5}: {sum(times) / len(times):.4f} sec per CreateCafe")
+    except grpc.RpcError as e:
+        print(f"Error: {e.code()} - {e.details()}")
+    finally:
+        for cafe_id in created_cafes:
+            cafe_stub.DeleteCafe(cafe_pb2.CafeDeleteRequest(id=cafe_id))
+        for item_id in added_items:
+            menu_stub.DeleteMenuItem(menu_pb2.MenuItemRequest(id=item_id))
+
 # ----------------------
 # MAIN
 # ----------------------
@@ -272,6 +305,14 @@ if __name__ == "__main__":
     test_grpc_service(inventory_pb2_grpc.InventoryServiceStub, "inventory", grpc_inventory, GRPC_ADDRESSES["inventory"])
     test_grpc_service(menu_pb2_grpc.MenuServiceStub, "menu", grpc_menu, GRPC_ADDRESSES["menu"])
 
+    cafe_channel = grpc.insecure_channel(GRPC_ADDRESSES["cafe"])
+    menu_channel = grpc.insecure_channel(GRPC_ADDRESSES["menu"])
+    test_cafe_creation_vs_menu_size(
+        cafe_pb2_grpc.CafeServiceStub(cafe_channel), menu_pb2_grpc.MenuServiceStub(menu_channel)
+    )
+    cafe_channel.close()
+    menu_channel.close()
+
     # Close channels
     order_channel.close()
     inventory_channel.close()
@@ -1,3 +1,6 @@
+import time
+from datetime import date
+
 import requests
 
 BASE_URL = "http://localhost:5000"
@@ -80,3 +83,30 @@ def test_get_analytics_predictions():
         assert isinstance(first["predicted_sales"], (int, float))
         assert isinstance(first["growth_percent"], (int, float))
         assert isinstance(first["rank"], int)
+
+# ----------------------------
+# Daily sales rollup
+# ----------------------------
+
+def test_card_metrics_include_new_order():
+    """A committed order reaches the daily_sales rollup read by the cards"""
+    today = date.today()
+    url = f"{BASE_URL}/analytics?month={today.month}&year={today.year}"
+    before = requests.get(url).json()["total_sales"]
+
+    res = requests.post(f"{BASE_URL}/orders/create", json={
+        "cafe_id": "3", "items": [{"item_id": "1", "quantity": 1}]
+    })
+    assert res.status_code == 200
+    order = res.json()
+    assert order["success"] is True
+
+    # Relayed by the order service outbox (ANALYTICS_FLUSH_INTERVAL, 1s by default)
+    deadline = time.time() + 10
+    total = before
+    while time.time() < deadline:
+        total = requests.get(url).json()["total_sales"]
+        if total >= before + order["total_price"]:
+            break
+        time.sleep(0.5)
+    assert total >= before + order["total_price"]
@@ -1,6 +1,8 @@
+import uuid
 import pytest
 import grpc
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from shared_proto import inventory_pb2, inventory_pb2_grpc
 from google.protobuf.empty_pb2 import Empty
@@ -72,6 +74,113 @@ def test_update_inventory_after_order(grpc_stub):
     # Depending on stock, either success True or False
     assert isinstance(response.success, bool)
 
+def test_reserve_items_success(grpc_stub):
+    """Test reserving several lines of an order in one call"""
+    for item_id in ("1", "2"):
+        grpc_stub.RestockItem(inventory_pb2.RestockItemRequest(
+            item_id=item_id,
+            cafe_id="1",
+            quantity_added=2,
+            restock_date=datetime.now().strftime("%Y-%m-%d")
+        ))
+    request = inventory_pb2.ReserveItemsRequest(cafe_id="1")
+    request.items.add(item_id="1", quantity=1)
+    request.items.add(item_id="2", quantity=1)
+    response = grpc_stub.ReserveItems(request)
+    assert response.success is True
+    assert len(response.short_items) == 0
+
+def test_reserve_items_all_or_nothing(grpc_stub):
+    """A short line reserves nothing and is reported"""
+    def stock_of(item_id):
+        items = grpc_stub.GetInventoryByCafe(Empty()).items
+        return next(i.stock_quantity for i in items if i.item_id == item_id and i.cafe_id == "1")
+
+    before = stock_of("1")
+    request = inventory_pb2.ReserveItemsRequest(cafe_id="1")
+    request.items.add(item_id="1", quantity=1)
+    request.items.add(item_id="2", quantity=10**6)
+    response = grpc_stub.ReserveItems(request)
+    assert response.success is False
+    assert [short.item_id for short in response.short_items] == ["2"]
+    assert response.short_items[0].requested == 10**6
+    assert stock_of("1") == before
+
+def test_release_items_is_idempotent(grpc_stub):
+    """A reservation is released once, replays report ALREADY_RELEASED"""
+    reservation_id = uuid.uuid4().hex
+    grpc_stub.RestockItem(inventory_pb2.RestockItemRequest(
+        item_id="1",
+        cafe_id="1",
+        quantity_added=1,
+        restock_date=datetime.now().strftime("%Y-%m-%d")
+    ))
+    reserve = inventory_pb2.ReserveItemsRequest(cafe_id="1", reservation_id=reservation_id)
+    reserve.items.add(item_id="1", quantity=1)
+    assert grpc_stub.ReserveItems(reserve).success is True
+
+    release = inventory_pb2.ReleaseItemsRequest(cafe_id="1", reservation_id=reservation_id)
+    release.items.add(item_id="1", quantity=1)
+    assert grpc_stub.ReleaseItems(release).status == inventory_pb2.RELEASED
+    assert grpc_stub.ReleaseItems(release).status == inventory_pb2.ALREADY_RELEASED
+
+def test_concurrent_reservations_never_oversell(grpc_stub):
+    """Parallel orders of one item reserve exactly the available stock"""
+    def stock_of(item_id):
+        items = grpc_stub.GetInventoryByCafe(Empty()).items
+        return next(i.stock_quantity for i in items if i.item_id == item_id and i.cafe_id == "1")
+
+    grpc_stub.RestockItem(inventory_pb2.RestockItemRequest(
+        item_id="3",
+        cafe_id="1",
+        quantity_added=5,
+        restock_date=datetime.now().strftime("%Y-%m-%d")
+    ))
+    available = stock_of("3")
+
+    def reserve(_):
+        request = inventory_pb2.ReserveItemsRequest(cafe_id="1", reservation_id=uuid.uuid4().hex)
+        request.items.add(item_id="3", quantity=1)
+        return grpc_stub.ReserveItems(request).success
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(reserve, range(available + 10)))
+    assert results.count(True) == available
+    assert stock_of("3") == 0
+
+def test_release_unknown_reservation(grpc_stub):
+    """Releasing a reservation that never happened gives no stock back"""
+    release = inventory_pb2.ReleaseItemsRequest(cafe_id="1", reservation_id=uuid.uuid4().hex)
+    release.items.add(item_id="1", quantity=1)
+    response = grpc_stub.ReleaseItems(release)
+    assert response.success is False
+    assert response.status == inventory_pb2.NOT_RESERVED
+
+def test_reserve_after_release_reserves_nothing(grpc_stub):
+    """A ReserveItems arriving after its ReleaseItems (caller gave up) takes no stock"""
+    def stock_of(item_id):
+        items = grpc_stub.GetInventoryByCafe(Empty()).items
+        return next(i.stock_quantity for i in items if i.item_id == item_id and i.cafe_id == "1")
+
+    reservation_id = uuid.uuid4().hex
+    grpc_stub.RestockItem(inventory_pb2.RestockItemRequest(
+        item_id="1",
+        cafe_id="1",
+        quantity_added=1,
+        restock_date=datetime.now().strftime("%Y-%m-%d")
+    ))
+    before = stock_of("1")
+
+    release = inventory_pb2.ReleaseItemsRequest(cafe_id="1", reservation_id=reservation_id)
+    release.items.add(item_id="1", quantity=1)
+    assert grpc_stub.ReleaseItems(release).status == inventory_pb2.NOT_RESERVED
+
+    reserve = inventory_pb2.ReserveItemsRequest(cafe_id="1", reservation_id=reservation_id)
+    reserve.items.add(item_id="1", quantity=1)
+    assert grpc_stub.ReserveItems(reserve).success is False
+    assert stock_of("1") == before
+    assert grpc_stub.ReleaseItems(release).status == inventory_pb2.ALREADY_RELEASED
+
 # ----------------------------
 # REST API Integration Tests
 # ----------------------------
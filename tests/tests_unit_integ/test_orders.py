@@ -1,17 +1,23 @@
+import json
+import time
+import uuid
 import pytest
 import grpc
 import requests
-from shared_proto import order_pb2, order_pb2_grpc
+from concurrent.futures import ThreadPoolExecutor
+from shared_proto import order_pb2, order_pb2_grpc, inventory_pb2_grpc
+from google.protobuf.empty_pb2 import Empty
 
 # ============================
 # CONFIG
 # ============================
 GRPC_ORDER_PORT = "localhost:5002"
+GRPC_INVENTORY_PORT = "localhost:5006"
 REST_BASE_URL = "http://localhost:5000"
 
 TEST_CAFE_ID = "1"     
 TEST_ITEM_ID = "1"     
-TEST_ITEM_PRICE = 10.0
+TEST_ITEM_PRICE = 18.0  # Prix du menu (Espresso), appliqué par Order Service
 
 
 # ============================
@@ -50,6 +56,98 @@ def test_create_order_grpc(grpc_stub):
     assert response.total_price == pytest.approx(TEST_ITEM_PRICE)
 
 
+def test_create_order_uses_menu_price_grpc(grpc_stub):
+    request = order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID)
+    # Le prix envoyé par le client est ignoré
+    request.items.add(item_id=TEST_ITEM_ID, quantity=2, price=0.5)
+
+    response = grpc_stub.CreateOrder(request)
+
+    assert response.success is True
+    assert response.total_price == pytest.approx(2 * TEST_ITEM_PRICE)
+
+
+def test_create_order_unknown_item_grpc(grpc_stub):
+    request = order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID)
+    request.items.add(item_id="999999", quantity=1)
+
+    with pytest.raises(grpc.RpcError) as error:
+        grpc_stub.CreateOrder(request)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_create_order_without_items_grpc(grpc_stub):
+    with pytest.raises(grpc.RpcError) as error:
+        grpc_stub.CreateOrder(order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID))
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_create_order_short_line_reserves_nothing_grpc(grpc_stub):
+    """A multi-item order short on one line leaves the stock of the other lines untouched"""
+    channel = grpc.insecure_channel(GRPC_INVENTORY_PORT)
+    inventory = inventory_pb2_grpc.InventoryServiceStub(channel)
+
+    def stock_of(item_id):
+        items = inventory.GetInventoryByCafe(Empty()).items
+        return next(i.stock_quantity for i in items if i.item_id == item_id and i.cafe_id == TEST_CAFE_ID)
+
+    before = stock_of(TEST_ITEM_ID)
+    request = order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID)
+    request.items.add(item_id=TEST_ITEM_ID, quantity=1)
+    request.items.add(item_id="2", quantity=10**6)
+    with pytest.raises(grpc.RpcError) as error:
+        grpc_stub.CreateOrder(request)
+    assert error.value.code() == grpc.StatusCode.FAILED_PRECONDITION
+    assert stock_of(TEST_ITEM_ID) == before
+    channel.close()
+
+
+def test_create_order_idempotency_key_grpc(grpc_stub):
+    request = order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID, idempotency_key=uuid.uuid4().hex)
+    request.items.add(item_id=TEST_ITEM_ID, quantity=1, price=TEST_ITEM_PRICE)
+
+    first = grpc_stub.CreateOrder(request)
+    retry = grpc_stub.CreateOrder(request)
+
+    assert first.success is True
+    assert retry.success is True
+    assert retry.order_id == first.order_id
+
+
+def test_create_order_failed_insert_releases_stock_grpc(grpc_stub):
+    """Concurrent retries of one order: the losers' order INSERT fails and their stock comes back"""
+    channel = grpc.insecure_channel(GRPC_INVENTORY_PORT)
+    inventory = inventory_pb2_grpc.InventoryServiceStub(channel)
+
+    def stock_of(item_id):
+        items = inventory.GetInventoryByCafe(Empty()).items
+        return next(i.stock_quantity for i in items if i.item_id == item_id and i.cafe_id == TEST_CAFE_ID)
+
+    before = stock_of(TEST_ITEM_ID)
+    request = order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID, idempotency_key=uuid.uuid4().hex)
+    request.items.add(item_id=TEST_ITEM_ID, quantity=1)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda _: grpc_stub.CreateOrder(request), range(4)))
+    assert len({response.order_id for response in responses}) == 1
+
+    # Released in the background by the saga (compensation.py)
+    deadline = time.time() + 10
+    while stock_of(TEST_ITEM_ID) != before - 1 and time.time() < deadline:
+        time.sleep(0.2)
+    assert stock_of(TEST_ITEM_ID) == before - 1
+    channel.close()
+
+
+def test_order_ids_are_time_ordered_grpc(grpc_stub):
+    first = create_test_order_grpc(grpc_stub)
+    second = create_test_order_grpc(grpc_stub)
+
+    assert first.success is True
+    assert second.success is True
+    # Identifiants snowflake 64 bits, croissants
+    assert int(second.order_id) > int(first.order_id) > 2 ** 32
+
+
 def test_get_orders_by_cafe_grpc(grpc_stub):
     request = order_pb2.GetOrdersRequest(cafe_id=TEST_CAFE_ID)
     response = grpc_stub.GetOrdersByCafe(request)
@@ -62,6 +160,71 @@ def test_get_orders_by_cafe_grpc(grpc_stub):
     assert len(order.items) >= 1
 
 
+def test_get_orders_by_cafe_pagination_grpc(grpc_stub):
+    create_test_order_grpc(grpc_stub)
+    create_test_order_grpc(grpc_stub)
+
+    first = grpc_stub.GetOrdersByCafe(order_pb2.GetOrdersRequest(cafe_id=TEST_CAFE_ID, page_size=1))
+    assert len(first.orders) == 1
+    assert first.next_cursor
+
+    second = grpc_stub.GetOrdersByCafe(
+        order_pb2.GetOrdersRequest(cafe_id=TEST_CAFE_ID, page_size=1, cursor=first.next_cursor)
+    )
+    assert len(second.orders) == 1
+    assert second.orders[0].order_id != first.orders[0].order_id
+    assert second.orders[0].created_at <= first.orders[0].created_at
+
+
+def test_get_orders_by_cafe_invalid_cursor_grpc(grpc_stub):
+    request = order_pb2.GetOrdersRequest(cafe_id=TEST_CAFE_ID, cursor="not-a-cursor")
+    with pytest.raises(grpc.RpcError) as error:
+        grpc_stub.GetOrdersByCafe(request)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_export_orders_grpc(grpc_stub):
+    request = order_pb2.ExportOrdersRequest(cafe_id=TEST_CAFE_ID, chunk_size=2)
+    chunks = list(grpc_stub.ExportOrders(request))
+
+    assert len(chunks) >= 1
+    assert all(0 < len(chunk.orders) <= 2 for chunk in chunks)
+    order_ids = [order.order_id for chunk in chunks for order in chunk.orders]
+    assert len(order_ids) == len(set(order_ids))
+
+
+def test_create_orders_bulk_grpc(grpc_stub):
+    request = order_pb2.CreateOrdersRequest()
+    for _ in range(3):
+        order = request.orders.add(cafe_id=TEST_CAFE_ID)
+        order.items.add(item_id=TEST_ITEM_ID, quantity=1, price=TEST_ITEM_PRICE)
+    # Commande invalide : rejetée sans bloquer les autres
+    request.orders.add(cafe_id=TEST_CAFE_ID)
+
+    response = grpc_stub.CreateOrders(request)
+
+    assert len(response.results) == 4
+    assert response.created == 3
+    assert response.failed == 1
+    assert all(result.success for result in response.results[:3])
+    assert len({result.order_id for result in response.results[:3]}) == 3
+    assert response.results[3].success is False
+
+
+def test_stream_orders_grpc(grpc_stub):
+    def orders():
+        for quantity in (1, 2, 0, 1):
+            order = order_pb2.CreateOrderRequest(cafe_id=TEST_CAFE_ID)
+            order.items.add(item_id=TEST_ITEM_ID, quantity=quantity, price=TEST_ITEM_PRICE)
+            yield order
+
+    responses = list(grpc_stub.StreamOrders(orders()))
+
+    # Une réponse par commande, dans l'ordre d'envoi
+    assert [response.success for response in responses] == [True, True, False, True]
+    assert responses[1].total_price == pytest.approx(2 * TEST_ITEM_PRICE)
+
+
 # ============================
 # REST HELPERS
 # ============================
@@ -93,6 +256,19 @@ def test_create_order_rest():
     assert data["total_price"] == pytest.approx(TEST_ITEM_PRICE)
 
 
+def test_create_orders_bulk_rest():
+    order = {
+        "cafe_id": TEST_CAFE_ID,
+        "items": [{"item_id": TEST_ITEM_ID, "quantity": 1, "price": TEST_ITEM_PRICE}]
+    }
+    res = requests.post(f"{REST_BASE_URL}/orders/bulk", json={"orders": [order, order]})
+    res.raise_for_status()
+    data = res.json()
+
+    assert data["created"] == 2
+    assert [result["success"] for result in data["results"]] == [True, True]
+
+
 def test_get_orders_by_cafe_rest():
     res = requests.get(f"{REST_BASE_URL}/orders/{TEST_CAFE_ID}")
     res.raise_for_status()
@@ -105,3 +281,16 @@ def test_get_orders_by_cafe_rest():
     assert order["cafe_id"] == TEST_CAFE_ID
     assert order["total_price"] > 0
     assert len(order["items"]) >= 1
+
+
+def test_export_orders_rest():
+    res = requests.get(f"{REST_BASE_URL}/orders/{TEST_CAFE_ID}/export", params={"format": "ndjson"}, stream=True)
+    res.raise_for_status()
+
+    orders = [json.loads(line) for line in res.iter_lines() if line]
+    assert len(orders) >= 1
+    assert orders[0]["cafe_id"] == TEST_CAFE_ID
+
+    res = requests.get(f"{REST_BASE_URL}/orders/{TEST_CAFE_ID}/export", params={"format": "csv"})
+    res.raise_for_status()
+    assert res.text.splitlines()[0].startswith("order_id,cafe_id,created_at")